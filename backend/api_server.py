@@ -0,0 +1,441 @@
+"""
+Headless HTTP API for the chat pipeline.
+
+Endpoints:
+    POST /v1/chat           {"text": ..., "lang": optional, "tts": optional} -> JSON reply
+    POST /v1/chat/stream    Same body; the reply as server-sent events (meta, token, done)
+    GET  /v1/audio/{id}     Speech for a reply generated with "tts": true
+    GET  /v1/stats          Server, coalescing, rate-limit and model health counters
+    GET  /metrics           Per-stage latency histograms and counters in Prometheus text format
+    GET  /healthz           Liveness
+    GET  /readyz            Readiness (503 while draining, overloaded or without a usable model)
+
+Each process serves requests on a bounded worker pool and shares one pooled Groq
+client; scale out by running more processes behind a load balancer.
+
+Usage:
+    python backend/api_server.py --host 0.0.0.0 --port 8000 --processes 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from batch import process_record
+from detect_language import detect_language
+from translate import translate_to_english
+from translate_back import translate_back_to_user
+from groq_chat import (
+    GROQ_MODELS,
+    DIRECT_RESPONSE_LANGS,
+    ask_groq_stream,
+    get_coalescing_stats,
+    get_groq_client,
+    get_rate_limit_stats,
+    _is_fallback_reply,
+)
+from model_health import get_model_health_registry
+from audio_registry import AudioArtifact, get_audio_registry
+from rate_limiter import INTERACTIVE
+from text_segments import split_sentences
+import tracing
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Server settings (can be tuned through environment variables)
+# Requests processed at once by each process
+API_WORKERS = int(os.getenv('API_WORKERS', '16'))
+# Requests allowed to wait for a worker before new ones are turned away with a 503
+API_MAX_QUEUE = int(os.getenv('API_MAX_QUEUE', '64'))
+# Longest accepted message
+API_MAX_TEXT_CHARS = int(os.getenv('API_MAX_TEXT_CHARS', '4000'))
+# Seconds in-flight requests get to finish on shutdown
+API_SHUTDOWN_GRACE = float(os.getenv('API_SHUTDOWN_GRACE', '20'))
+# Seconds /readyz reports 503 on shutdown before the listener closes, so load balancers stop routing here
+API_DRAIN_DELAY = float(os.getenv('API_DRAIN_DELAY', '0'))
+
+class ServerState:
+    """
+    Admission control and counters for one server process.
+    At most `workers` requests run at once; up to `max_queue` more wait, and
+    anything beyond that is rejected right away so the load balancer can retry
+    another process instead of piling up latency here.
+    """
+
+    def __init__(self, workers=API_WORKERS, max_queue=API_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.draining = False
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {'requests': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'cancelled': 0}
+        self._slots = None
+
+    @property
+    def slots(self):
+        # Created lazily so it belongs to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    def overloaded(self):
+        return self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def admit(self):
+        """Wait for a worker slot; raises OverflowError if the queue is full or the server is draining"""
+        if self.draining or self.overloaded():
+            self.stats['rejected'] += 1
+            raise OverflowError("Server is busy")
+        self.stats['requests'] += 1
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    def snapshot(self):
+        return dict(self.stats, in_flight=self.in_flight, waiting=self.waiting, workers=self.workers,
+                    max_queue=self.max_queue, draining=self.draining)
+
+state = ServerState()
+
+def _error(status, message, headers=None):
+    return JSONResponse({'error': message}, status_code=status, headers=headers)
+
+def _busy():
+    return _error(503, "Server is busy, try again shortly", headers={'Retry-After': '1'})
+
+async def _read_request(request):
+    """
+    Parse and validate a chat request body.
+
+    Returns:
+        tuple: (body dict, None) or (None, error response)
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        return None, _error(400, "Body must be JSON")
+    if not isinstance(body, dict):
+        return None, _error(400, "Body must be a JSON object")
+    text = body.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return None, _error(400, "'text' must be a non-empty string")
+    if len(text) > API_MAX_TEXT_CHARS:
+        return None, _error(413, f"'text' is longer than {API_MAX_TEXT_CHARS} characters")
+    if body.get('lang') is not None and not isinstance(body['lang'], str):
+        return None, _error(400, "'lang' must be a language code")
+    return body, None
+
+def _register_audio(path):
+    """Make a synthesized reply downloadable and return its URL (None if the audio couldn't be read)"""
+    audio_id = uuid.uuid4().hex
+    if not get_audio_registry().register(audio_id, AudioArtifact(path)):
+        return None
+    return f"/v1/audio/{audio_id}"
+
+async def chat(request):
+    body, error = await _read_request(request)
+    if error is not None:
+        return error
+    record = {'id': body.get('id') or uuid.uuid4().hex, 'text': body['text'], 'lang': body.get('lang')}
+    try:
+        async with state.admit():
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(state.executor, process_record, record, bool(body.get('tts')),
+                                                INTERACTIVE)
+    except OverflowError:
+        return _busy()
+
+    if result['status'] != 'ok':
+        state.stats['failed'] += 1
+        return JSONResponse(result, status_code=502)
+    state.stats['completed'] += 1
+    if result.get('audio'):
+        result['audio_url'] = _register_audio(result.pop('audio'))
+    return JSONResponse(result)
+
+def _stream_turn(text, lang, tts, emit, cancelled):
+    """
+    Run the pipeline for one message, calling emit(event, data) as the reply comes in.
+    Languages Groq answers directly are streamed token by token; others are
+    translated back a sentence at a time as the English reply arrives.
+    Runs on a worker thread; stops reading from Groq once `cancelled` is set.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    def lap(stage, since):
+        timings[stage] = round((time.perf_counter() - since) * 1000, 2)
+
+    if not lang:
+        since = time.perf_counter()
+        with tracing.span("detect"):
+            lang = detect_language(text)
+        lap('detect', since)
+    direct = lang in DIRECT_RESPONSE_LANGS
+    emit('meta', {'language': lang})
+
+    chat_lang = lang if direct else 'en'
+    message = text
+    if not direct:
+        since = time.perf_counter()
+        with tracing.span("translate", lang=lang):
+            message = translate_to_english(text, lang) or text
+        lap('translate', since)
+
+    reply = ""
+    pending = ""
+    since = time.perf_counter()
+    with tracing.span("chat", streamed=True) as chat_span:
+        tokens = ask_groq_stream(message, lang=chat_lang, priority=INTERACTIVE)
+        try:
+            while True:
+                try:
+                    token = next(tokens)
+                except StopIteration as stop:
+                    finished = stop.value
+                    break
+                if cancelled.is_set():
+                    chat_span.set_status(tracing.CANCELLED)
+                    return
+                if 'first_token' not in timings:
+                    if _is_fallback_reply(token, chat_lang):
+                        # Every model failed; report it instead of streaming the apology as a reply
+                        chat_span.set_status(tracing.ERROR, token)
+                        emit('error', {'error': token})
+                        return False
+                    lap('first_token', start)
+                if direct:
+                    reply += token
+                    emit('token', {'text': token})
+                    continue
+                # Translate finished sentences while the rest of the reply streams in
+                pending += token
+                sentences = split_sentences(pending)
+                if len(sentences) > 1:
+                    # Keep the unfinished sentence as it is, whitespace included
+                    cut = pending.rfind(sentences[-1])
+                    done = pending[:cut].strip()
+                    pending = pending[cut:]
+                    with tracing.span("translate_back", lang=lang):
+                        translated = (translate_back_to_user(done, lang) or done) + " "
+                    reply += translated
+                    emit('token', {'text': translated})
+        finally:
+            tokens.close()
+        if not finished:
+            # The stream broke off mid-reply; don't pass the fragment off as the answer
+            chat_span.set_status(tracing.ERROR, "Reply broke off")
+            emit('error', {'error': "The reply broke off, please try again."})
+            return False
+        if pending.strip():
+            with tracing.span("translate_back", lang=lang):
+                translated = translate_back_to_user(pending.strip(), lang) or pending.strip()
+            reply += translated
+            emit('token', {'text': translated})
+    lap('chat', since)
+
+    reply = reply.strip()
+    done = {'language': lang, 'reply': reply}
+    if tts and not cancelled.is_set():
+        from speak import synthesize
+        since = time.perf_counter()
+        with tracing.span("tts", lang=lang):
+            done['audio_url'] = _register_audio(synthesize(reply, lang))
+        lap('tts', since)
+    lap('total', start)
+    done['timings_ms'] = timings
+    emit('done', done)
+    return True
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def chat_stream(request):
+    body, error = await _read_request(request)
+    if error is not None:
+        return error
+    if state.draining or state.overloaded():
+        state.stats['rejected'] += 1
+        return _busy()
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(event, data):
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+        def run():
+            try:
+                with tracing.span("turn", source="api", streamed=True) as turn:
+                    ok = _stream_turn(body['text'], body.get('lang'), bool(body.get('tts')), emit, cancelled)
+                    if ok is False:
+                        turn.set_status(tracing.ERROR)
+                    return ok
+            except Exception as e:
+                logger.error(f"Error in streamed chat: {str(e)}")
+                emit('error', {'error': "An error occurred while processing your message."})
+                return False
+            finally:
+                emit(None, None)
+
+        try:
+            async with state.admit():
+                worker = loop.run_in_executor(state.executor, run)
+                while True:
+                    event, data = await queue.get()
+                    if event is None:
+                        break
+                    yield _sse(event, data)
+                ok = await worker
+                state.stats['completed' if ok else 'failed'] += 1
+        except OverflowError:
+            yield _sse('error', {'error': "Server is busy, try again shortly"})
+        except asyncio.CancelledError:
+            # The client went away; let the worker stop reading from Groq
+            cancelled.set()
+            state.stats['cancelled'] += 1
+            raise
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+async def audio(request):
+    artifact = get_audio_registry().get(request.path_params['audio_id'])
+    if artifact is None:
+        return _error(404, "Audio not found")
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(None, lambda: artifact.data)
+    return Response(data, media_type=artifact.mime_type, headers={'Cache-Control': 'private, max-age=3600'})
+
+async def metrics(request):
+    return Response(tracing.render_metrics(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+async def healthz(request):
+    return JSONResponse({'status': 'ok'})
+
+async def readyz(request):
+    health = get_model_health_registry()
+    checks = {
+        'api_key': bool(get_groq_client().api_key),
+        'models_available': any(health.is_available(model) for model in GROQ_MODELS),
+        'accepting': not state.draining and not state.overloaded(),
+    }
+    ready = all(checks.values())
+    return JSONResponse({'status': 'ready' if ready else 'not ready', 'checks': checks},
+                        status_code=200 if ready else 503)
+
+async def stats(request):
+    return JSONResponse({
+        'server': state.snapshot(),
+        'coalescing': get_coalescing_stats(),
+        'rate_limit': get_rate_limit_stats(),
+        'models': get_model_health_registry().snapshot(),
+    })
+
+async def drain(delay=API_DRAIN_DELAY, grace=API_SHUTDOWN_GRACE):
+    """
+    Stop taking work and wait for the requests in flight to finish.
+    Readiness turns 503 right away, and new requests are turned away with a 503.
+    
+    Args:
+        delay (float): Seconds to keep reporting not ready before returning, even if idle
+        grace (float): Seconds requests in flight get to finish at most
+    """
+    state.draining = True
+    start = time.monotonic()
+    while time.monotonic() - start < delay or (state.in_flight or state.waiting):
+        if time.monotonic() - start >= max(delay, grace):
+            logger.warning(f"Shutting down with {state.in_flight + state.waiting} requests still in flight")
+            break
+        await asyncio.sleep(0.1)
+
+def _install_drain_handlers(loop):
+    """
+    Drain before uvicorn stops. uvicorn closes its sockets as soon as its own signal
+    handler runs and only then runs the lifespan shutdown, so its handlers are
+    wrapped: the first SIGINT/SIGTERM starts draining while the server still answers,
+    and is passed on to uvicorn once that is done. A second signal is passed on at once.
+    """
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        forward = signal.getsignal(sig)
+        if not callable(forward):
+            continue
+        
+        def handler(signum, frame, forward=forward):
+            if state.draining:
+                forward(signum, frame)
+                return
+            logger.info("Draining before shutdown...")
+            state.draining = True
+            
+            async def drain_then_forward():
+                await drain()
+                forward(signum, frame)
+            loop.call_soon_threadsafe(loop.create_task, drain_then_forward())
+        
+        signal.signal(sig, handler)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Open Groq connections before the first request arrives
+    get_groq_client().warmup(connections=min(API_WORKERS, 4), background=True)
+    # Signal handlers can only be set from the main thread (not e.g. under a test client)
+    if threading.current_thread() is threading.main_thread():
+        _install_drain_handlers(asyncio.get_running_loop())
+    yield
+    # Normally drained already by the signal handler; this covers any other way of stopping
+    if not state.draining:
+        await drain(delay=0)
+    state.executor.shutdown(wait=False, cancel_futures=True)
+
+app = Starlette(
+    routes=[
+        Route('/v1/chat', chat, methods=['POST']),
+        Route('/v1/chat/stream', chat_stream, methods=['POST']),
+        Route('/v1/audio/{audio_id}', audio, methods=['GET']),
+        Route('/v1/stats', stats, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/healthz', healthz, methods=['GET']),
+        Route('/readyz', readyz, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the chat pipeline HTTP API")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=1, help="Server processes (each with its own worker pool)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.processes,
+                app_dir=os.path.dirname(os.path.abspath(__file__)), log_level="info")
+
+if __name__ == "__main__":
+    main()
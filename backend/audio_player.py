@@ -0,0 +1,154 @@
+import logging
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def _player_command(filepath):
+    """Command line for playing an audio file on this OS (None if os.startfile has to be used)"""
+    system = platform.system()
+    if system == 'Windows':
+        return None
+    if system == 'Darwin':  # macOS
+        return ['afplay', filepath]
+    # Linux and others
+    for player in (['mpg123', '-q'], ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet']):
+        if shutil.which(player[0]):
+            return player + [filepath]
+    return ['mpg123', '-q', filepath]
+
+class PlaybackItem:
+    """A queued clip; `done` is set once it finished, failed or was cancelled"""
+
+    def __init__(self, filepath, on_complete=None):
+        self.filepath = filepath
+        self.on_complete = on_complete
+        self.done = threading.Event()
+        self.cancelled = False
+        self.returncode = None
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+class AudioPlayer:
+    """
+    Background audio playback.
+    Clips are queued and played one after another by a worker thread, so callers
+    don't block while speech plays. Playback can be stopped at any time (barge-in).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._process = None
+        self._current = None
+        self._worker = threading.Thread(target=self._run, name="audio-player", daemon=True)
+        self._worker.start()
+
+    def play(self, filepath, on_complete=None):
+        """
+        Queue an audio file for playback.
+
+        Args:
+            filepath (str): Path to the audio file
+            on_complete (callable): Called with the PlaybackItem once the clip has finished
+
+        Returns:
+            PlaybackItem: Handle to wait on the clip
+        """
+        item = PlaybackItem(filepath, on_complete)
+        self._queue.put(item)
+        return item
+
+    def stop(self):
+        """Stop the current clip and drop everything still queued"""
+        dropped = []
+        while True:
+            try:
+                dropped.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for item in dropped:
+            item.cancelled = True
+            self._finish(item)
+
+        with self._lock:
+            if self._current is not None:
+                self._current.cancelled = True
+            if self._process is not None and self._process.poll() is None:
+                logger.info("Stopping audio playback")
+                self._process.terminate()
+
+    def is_playing(self):
+        with self._lock:
+            return self._current is not None or not self._queue.empty()
+
+    def wait(self, timeout=None):
+        """Block until everything queued so far has been played"""
+        marker = self.play(None)
+        return marker.wait(timeout)
+
+    def _finish(self, item):
+        item.done.set()
+        if item.on_complete:
+            try:
+                item.on_complete(item)
+            except Exception as e:
+                logger.error(f"Error in playback callback: {str(e)}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item.filepath is None:
+                # Marker queued by wait()
+                self._finish(item)
+                continue
+            with self._lock:
+                self._current = item
+            try:
+                self._play(item)
+            except Exception as e:
+                logger.error(f"Error playing audio: {str(e)}")
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._process = None
+                self._finish(item)
+
+    def _play(self, item):
+        command = _player_command(item.filepath)
+        if command is None:
+            # Windows hands the file to the default player, which we can't wait on or stop
+            os.startfile(item.filepath)
+            logger.info(f"Playing audio: {item.filepath}")
+            return
+
+        with self._lock:
+            if item.cancelled:
+                return
+            self._process = subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        logger.info(f"Playing audio: {item.filepath}")
+        item.returncode = self._process.wait()
+
+_player = None
+_player_lock = threading.Lock()
+
+def get_audio_player():
+    """
+    Get the process-wide audio player, starting its worker on first use.
+
+    Returns:
+        AudioPlayer: The shared player
+    """
+    global _player
+    if _player is None:
+        with _player_lock:
+            if _player is None:
+                _player = AudioPlayer()
+    return _player
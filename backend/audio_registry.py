@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of message -> audio mappings kept in memory
+AUDIO_REGISTRY_MAX_ENTRIES = int(os.getenv('AUDIO_REGISTRY_MAX_ENTRIES', '1000'))
+# Maximum audio bytes those mappings hold in memory
+AUDIO_REGISTRY_MAX_BYTES = int(os.getenv('AUDIO_REGISTRY_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Bitrates in kbps for MPEG Layer III, indexed by the 4-bit bitrate field
+_MPEG1_L3_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+_MPEG2_L3_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]
+
+def _skip_id3(data):
+    """Offset of the first byte after an ID3v2 tag, if there is one"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+def mp3_duration(data):
+    """
+    Estimate the duration of constant-bitrate MP3 data (what gTTS produces) from its first frame header.
+
+    Args:
+        data (bytes): The MP3 file contents
+
+    Returns:
+        float: Duration in seconds, or None if no Layer III frame header was found
+    """
+    offset = _skip_id3(data)
+    end = min(len(data) - 3, offset + 64 * 1024)
+    for i in range(offset, end):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        version = (data[i + 1] >> 3) & 0x03  # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+        layer = (data[i + 1] >> 1) & 0x03  # 1 = Layer III
+        bitrate_index = data[i + 2] >> 4
+        if version == 1 or layer != 1:
+            continue
+        table = _MPEG1_L3_BITRATES if version == 3 else _MPEG2_L3_BITRATES
+        bitrate = table[bitrate_index] * 1000
+        if bitrate:
+            return (len(data) - i) * 8 / bitrate
+    return None
+
+class AudioArtifact:
+    """
+    Handle to a piece of synthesized speech.
+    Usable anywhere a path is expected (it implements os.PathLike); the bytes are read once on first use.
+
+    Args:
+        path (str): Path to the audio file
+        format (str): Audio format, e.g. 'mp3'
+    """
+
+    def __init__(self, path, format='mp3'):
+        self.path = path
+        self.format = format
+        self._data = None
+        self._duration = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def duration(self):
+        """Duration in seconds (None if it couldn't be determined)"""
+        if self._duration is None and self.format == 'mp3':
+            try:
+                self._duration = mp3_duration(self.data)
+            except OSError as e:
+                logger.error(f"Could not read audio file {self.path}: {str(e)}")
+        return self._duration
+
+    @property
+    def mime_type(self):
+        return 'audio/mpeg' if self.format == 'mp3' else f"audio/{self.format}"
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"AudioArtifact(path={self.path!r}, format={self.format!r})"
+
+class AudioRegistry:
+    """
+    Maps chat message IDs to their audio artifacts.
+    Shared by every session in the process; the oldest mappings are dropped past `max_entries`
+    or `max_bytes`. Each artifact's bytes are read when it is registered and kept with it,
+    because the file usually lives in the speech cache, which may evict it at any time.
+
+    Args:
+        max_entries (int): Maximum number of mappings to keep
+        max_bytes (int): Maximum audio bytes to keep in memory
+    """
+
+    def __init__(self, max_entries=AUDIO_REGISTRY_MAX_ENTRIES, max_bytes=AUDIO_REGISTRY_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._artifacts = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def register(self, message_id, artifact):
+        """
+        Map a message to its audio, reading the audio into memory.
+
+        Returns:
+            bool: False if the audio file couldn't be read, in which case nothing is registered
+        """
+        try:
+            size = len(artifact.data)
+        except OSError as e:
+            logger.error(f"Could not read audio file {artifact.path}: {str(e)}")
+            return False
+        with self._lock:
+            self._drop(message_id)
+            self._artifacts[message_id] = artifact
+            self._bytes += size
+            while len(self._artifacts) > 1 and (len(self._artifacts) > self.max_entries
+                                                or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._artifacts)))
+        return True
+
+    def _drop(self, message_id):
+        artifact = self._artifacts.pop(message_id, None)
+        if artifact is not None:
+            self._bytes -= len(artifact.data)
+
+    def get(self, message_id):
+        """
+        Look up the audio for a message.
+
+        Returns:
+            AudioArtifact: The artifact, or None if the message has no audio
+        """
+        with self._lock:
+            return self._artifacts.get(message_id)
+
+    def remove(self, message_id):
+        with self._lock:
+            self._drop(message_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._artifacts)
+
+_registry = AudioRegistry()
+
+def get_audio_registry():
+    """
+    Get the process-wide audio registry.
+
+    Returns:
+        AudioRegistry: The shared registry
+    """
+    return _registry
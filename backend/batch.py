@@ -0,0 +1,299 @@
+"""
+Batch mode: run many utterances through the assistant pipeline at once.
+
+Each input record is a text or the path to an audio file. It goes through
+detect -> translate -> Groq -> translate back -> optional TTS, and its result is
+written as one JSON line. Records already in the output are skipped with
+--resume, so an interrupted run picks up where it stopped.
+
+Usage:
+    python backend/main.py --batch prompts.jsonl --output results.jsonl --concurrency 8
+"""
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from detect_language import detect_language
+from translate import translate_to_english
+from groq_chat import ask_groq, DIRECT_RESPONSE_LANGS, _is_fallback_reply
+from translate_back import translate_back_to_user
+from rate_limiter import BATCH
+import tracing
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Utterances processed at once
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+# Seconds between progress reports
+BATCH_PROGRESS_INTERVAL = float(os.getenv('BATCH_PROGRESS_INTERVAL', '5'))
+
+STAGES = ('transcribe', 'detect', 'translate', 'chat', 'translate_back', 'tts')
+
+def read_records(path):
+    """
+    Read utterances from a JSONL or CSV file (by extension).
+    Each record needs a "text" or an "audio" path; "id" and "lang" are optional.
+    Records without an id are numbered by their position in the file.
+
+    Yields:
+        dict: The records, with an "id"
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for position, row in enumerate(rows):
+            record = {key: value for key, value in row.items() if value not in (None, '')}
+            record['id'] = str(record.get('id', position))
+            yield record
+
+def completed_ids(path):
+    """
+    Get the ids that already have a successful result in an output file.
+    A line cut off by a crash is ignored, and failed records are tried again.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get('status') == 'ok':
+                done.add(str(result['id']))
+    return done
+
+def _keep_completed(path):
+    """
+    Rewrite an output file so it only holds its successful results, one line per id.
+    Failed records and a line cut off by a crash are dropped: --resume runs those records
+    again and appends their new results, so no id ends up in the file twice.
+
+    Returns:
+        set: The ids that have a successful result
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    temporary = path + '.tmp'
+    with open(path, encoding='utf-8') as f, open(temporary, 'w', encoding='utf-8') as out:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get('status') != 'ok' or str(result['id']) in done:
+                continue
+            done.add(str(result['id']))
+            out.write(line if line.endswith('\n') else line + '\n')
+    os.replace(temporary, path)
+    return done
+
+def process_record(record, tts=False, priority=BATCH):
+    """
+    Run one utterance through the pipeline.
+
+    Args:
+        record (dict): The record, with "text" or "audio" and optionally "lang"
+        tts (bool): Also synthesize the reply
+        priority (str): Rate-limit queue priority for the Groq call
+
+    Returns:
+        dict: The result line: id, status, language, reply and stage timings in milliseconds
+    """
+    timings = {}
+    result = {'id': record['id']}
+
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with tracing.span(stage):
+                return fn(*args, **kwargs)
+        finally:
+            timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+    turn = tracing.start_span("turn", record=record['id'], priority=priority)
+    try:
+        text = record.get('text')
+        if not text and record.get('audio'):
+            # Imported here so text-only batches don't need the audio stack
+            from listen import recognition_locale, transcribe_file
+            text = timed('transcribe', transcribe_file, record['audio'], language=recognition_locale(record.get('lang')))
+            result['transcript'] = text
+        if not text:
+            raise ValueError("Record has no text and no recognizable audio")
+
+        lang = record.get('lang') or timed('detect', detect_language, text)
+        result['language'] = lang
+
+        if lang in DIRECT_RESPONSE_LANGS:
+            reply = timed('chat', ask_groq, text, lang=lang, priority=priority)
+            chat_lang = lang
+        else:
+            english_text = timed('translate', translate_to_english, text, lang) or text
+            result['english_text'] = english_text
+            reply = timed('chat', ask_groq, english_text, lang='en', priority=priority)
+            chat_lang = 'en'
+            result['english_reply'] = reply
+        if not reply or _is_fallback_reply(reply, chat_lang):
+            raise RuntimeError(reply or "Empty response from Groq API")
+
+        if chat_lang != lang:
+            reply = timed('translate_back', translate_back_to_user, reply, lang) or reply
+        result['reply'] = reply
+
+        if tts:
+            from speak import synthesize
+            result['audio'] = timed('tts', synthesize, reply, lang)
+
+        result['status'] = 'ok'
+    except Exception as e:
+        logger.error(f"Record {record['id']} failed: {str(e)}")
+        result['status'] = 'error'
+        result['error'] = str(e)
+        turn.record_error(e)
+    finally:
+        turn.end()
+    result['timings_ms'] = timings
+    return result
+
+class _Progress:
+    """Counts finished records and reports progress and throughput every few seconds"""
+
+    def __init__(self, total, skipped, interval):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+        self._stage_timings = {stage: [] for stage in STAGES}
+
+    def add(self, result):
+        self.done += 1
+        if result['status'] != 'ok':
+            self.errors += 1
+        for stage, ms in result['timings_ms'].items():
+            self._stage_timings[stage].append(ms)
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        rate = self.rate()
+        line = f"{self.done} processed, {self.errors} errors, {rate:.2f} records/s"
+        if self.total is not None:
+            remaining = self.total - self.skipped - self.done
+            eta = remaining / rate if rate > 0 else float('inf')
+            line = f"{self.done + self.skipped}/{self.total} records ({line}), ETA {eta:.0f}s"
+        print(line, file=sys.stderr, flush=True)
+
+    def summary(self):
+        stages = {}
+        for stage, values in self._stage_timings.items():
+            if not values:
+                continue
+            values = sorted(values)
+            stages[stage] = {
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+            }
+        return {
+            'processed': self.done,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'seconds': round(time.perf_counter() - self.start, 2),
+            'records_per_second': round(self.rate(), 2),
+            'stages': stages,
+        }
+
+def run_batch(input_path, output_path, concurrency=BATCH_CONCURRENCY, ordered=True, tts=False, resume=False,
+              progress_interval=BATCH_PROGRESS_INTERVAL):
+    """
+    Process every record of an input file and write the results to a JSONL file.
+
+    Args:
+        input_path (str): JSONL or CSV file of utterances
+        output_path (str): JSONL file the results are written to
+        concurrency (int): Records processed at once
+        ordered (bool): Write results in input order (otherwise as soon as they finish)
+        tts (bool): Also synthesize each reply
+        resume (bool): Skip records that already have a successful result in output_path, and
+            drop the other lines from it before their records are run again
+        progress_interval (float): Seconds between progress reports on stderr
+
+    Returns:
+        dict: Totals, throughput and p50/p95 latency per stage
+    """
+    try:
+        total = sum(1 for _ in read_records(input_path))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read {input_path}: {str(e)}")
+
+    done_ids = _keep_completed(output_path) if resume else set()
+    mode = 'a' if resume else 'w'
+
+    progress = _Progress(total, 0, progress_interval)
+    write_lock = threading.Lock()
+    pending_results = {}
+    next_to_write = 0
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    with open(output_path, mode, encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+
+        def write(result):
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            # Flushed line by line so a crash loses at most the records in flight
+            out.flush()
+
+        def finish(sequence, result):
+            nonlocal next_to_write
+            with write_lock:
+                progress.add(result)
+                if not ordered:
+                    write(result)
+                    return
+                pending_results[sequence] = result
+                while next_to_write in pending_results:
+                    write(pending_results.pop(next_to_write))
+                    next_to_write += 1
+
+        # Only a window of records is in flight or waiting for its turn to be written, so huge
+        # inputs aren't read into memory and one slow record can't make the ordered results pile up
+        in_flight = {}
+        window = concurrency * 2
+        sequence = 0
+        for record in read_records(input_path):
+            if record['id'] in done_ids:
+                progress.skipped += 1
+                continue
+            while len(in_flight) + len(pending_results) >= window:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(in_flight.pop(future), future.result())
+            in_flight[executor.submit(process_record, record, tts)] = sequence
+            sequence += 1
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                finish(in_flight.pop(future), future.result())
+
+    progress.report()
+    return progress.summary()
@@ -0,0 +1,70 @@
+"""
+Microbenchmark for detect_language.
+Compares the script fast path and memo against running langdetect on every call.
+
+Usage:
+    python backend/bench_detect_language.py --repeat 200
+"""
+import argparse
+import json
+import logging
+import re
+import time
+
+from langdetect import detect
+
+import detect_language as dl
+
+SAMPLES = {
+    'ja': "今日はとても良い天気ですね。散歩に行きましょう。",
+    'zh-cn': "今天天气很好，我们去公园散步吧。",
+    'ko': "오늘 날씨가 정말 좋네요. 산책하러 갈까요?",
+    'ar': "الطقس جميل اليوم، هل نذهب في نزهة؟",
+    'ru': "Сегодня отличная погода, пойдём гулять?",
+    'hi': "आज मौसम बहुत अच्छा है, चलो टहलने चलते हैं।",
+    'en': "The weather is lovely today, shall we go for a walk?",
+    'fr': "Il fait très beau aujourd'hui, on va se promener ?",
+}
+
+def legacy_detect(text):
+    """The previous implementation: compile the Devanagari regex, then always run langdetect"""
+    if re.compile(r'[\u0900-\u097F]').search(text):
+        return 'hi'
+    return dl.LANGUAGE_MAP.get(detect(text), dl.DEFAULT_LANGUAGE)
+
+def per_call_us(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detect_language")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per sample")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    # langdetect loads its language profiles on first use
+    detect("warm up")
+
+    results = {}
+    for lang, text in SAMPLES.items():
+        # Unique inputs defeat the memo, so this measures the detection path itself
+        unique = [f"{text} {i}" for i in range(args.repeat)]
+        legacy = per_call_us(legacy_detect, unique, 1)
+        dl._detect_language_cached.cache_clear()
+        uncached = per_call_us(dl.detect_language, unique, 1)
+        dl.detect_language(text)
+        memoized = per_call_us(dl.detect_language, [text], args.repeat)
+        results[lang] = {
+            'detected': dl.detect_language(text),
+            'legacy_us': round(legacy, 2),
+            'new_us': round(uncached, 2),
+            'memoized_us': round(memoized, 2),
+            'speedup': round(legacy / uncached, 1),
+            'memoized_speedup': round(legacy / memoized, 1),
+        }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
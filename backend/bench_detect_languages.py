@@ -0,0 +1,110 @@
+"""
+Throughput benchmark for the batch language detection API.
+Reports texts/sec for the single-call loop and for detect_languages, plus the
+accuracy of each run against the corpus labels, overall and per supported language.
+
+Usage:
+    python backend/bench_detect_languages.py --texts 20000 --duplicates 0.3
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import time
+
+import detect_language as dl
+
+# A few sentences per supported language; the corpus mixes and varies them
+SENTENCES = {
+    'en': ["What time does the store open tomorrow?", "I would like to book a table for two.",
+           "Can you explain how this works?"],
+    'hi': ["कल दुकान कितने बजे खुलेगी?", "मुझे दो लोगों के लिए टेबल बुक करनी है।", "क्या आप समझा सकते हैं?"],
+    'fr': ["À quelle heure ouvre le magasin demain ?", "Je voudrais réserver une table pour deux.",
+           "Pouvez-vous m'expliquer comment cela fonctionne ?"],
+    'es': ["¿A qué hora abre la tienda mañana?", "Me gustaría reservar una mesa para dos.",
+           "¿Puedes explicarme cómo funciona esto?"],
+    'de': ["Wann öffnet der Laden morgen?", "Ich möchte einen Tisch für zwei Personen reservieren.",
+           "Kannst du mir erklären, wie das funktioniert?"],
+    'ja': ["明日は何時に店が開きますか？", "二人分のテーブルを予約したいです。"],
+    'ko': ["내일 가게는 몇 시에 문을 여나요?", "두 명 자리를 예약하고 싶어요."],
+    'zh-cn': ["明天商店几点开门？", "我想预订一张两人桌。"],
+    'ar': ["متى يفتح المتجر غدا؟", "أود حجز طاولة لشخصين."],
+    'ru': ["Во сколько завтра открывается магазин?", "Я хотел бы забронировать столик на двоих."],
+}
+
+def make_corpus(rng, size, duplicate_share):
+    corpus = []
+    labels = []
+    for i in range(size):
+        if corpus and rng.random() < duplicate_share:
+            j = rng.randrange(len(corpus))
+            corpus.append(corpus[j])
+            labels.append(labels[j])
+            continue
+        lang = rng.choice(list(SENTENCES))
+        corpus.append(f"{rng.choice(SENTENCES[lang])} {rng.choice(SENTENCES[lang])} #{i}")
+        labels.append(lang)
+    return corpus, labels
+
+def accuracy(detected, labels, indexes=None):
+    """Share of texts whose detected language matches the language they were built from"""
+    if indexes is None:
+        indexes = range(len(labels))
+    return round(sum(detected[i] == labels[i] for i in indexes) / len(indexes), 4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch language detection")
+    parser.add_argument("--texts", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of repeated texts")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes for the parallel run")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    corpus, labels = make_corpus(rng, args.texts, args.duplicates)
+
+    # Single calls, with the memo cleared so every distinct text is really detected
+    dl._detect_language_cached.cache_clear()
+    start = time.perf_counter()
+    single = [dl.detect_language(text) for text in corpus]
+    single_seconds = time.perf_counter() - start
+
+    runs = {}
+    for name, processes in (('batch_in_process', 1), ('batch_parallel', args.processes)):
+        dl._detect_language_cached.cache_clear()
+        start = time.perf_counter()
+        batch = dl.detect_languages(corpus, processes=processes)
+        seconds = time.perf_counter() - start
+        runs[name] = {
+            'processes': processes,
+            'seconds': round(seconds, 2),
+            'texts_per_second': round(len(corpus) / seconds, 1),
+            'accuracy': accuracy(batch, labels),
+        }
+
+    # Per language for the parallel run, the last one above
+    per_language = {}
+    for lang in SENTENCES:
+        indexes = [i for i, label in enumerate(labels) if label == lang]
+        per_language[lang] = {
+            'texts': len(indexes),
+            'accuracy': accuracy(batch, labels, indexes),
+        }
+
+    results = {
+        'texts': len(corpus),
+        'distinct_texts': len(set(corpus)),
+        'single_call': {
+            'seconds': round(single_seconds, 2),
+            'texts_per_second': round(len(corpus) / single_seconds, 1),
+            'accuracy': accuracy(single, labels),
+        },
+        **runs,
+        'per_language': per_language,
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark for the FAQ near-duplicate index.
+Builds an index of synthetic questions and measures insert throughput and lookup latency.
+A small set of real FAQ questions measures what the index matches: paraphrases that use
+different words (which it should reuse a reply for, but mostly can't) and lookalikes that
+differ in one word (which it shouldn't).
+
+Usage:
+    python backend/bench_faq_index.py --entries 100000 --queries 2000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from faq_index import FaqIndex
+
+SYLLABLES = ["ka", "ri", "mo", "ten", "sa", "lu", "vo", "ne", "pra", "di", "ho", "gu", "mi", "zo", "be", "ta"]
+
+def make_vocabulary(rng, size):
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+def make_question(rng, vocabulary):
+    return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 10))) + "?"
+
+# Real FAQ questions and the same question asked in other words
+PARAPHRASES = [
+    ("What time does the store open?", "When does the store open?"),
+    ("What time are you open?", "What are your hours?"),
+    ("How do I reset my password?", "I forgot my password, how can I change it?"),
+    ("How much does shipping cost?", "What are the delivery charges?"),
+    ("Can I return an item I bought online?", "Is it possible to send back something I ordered on the website?"),
+    ("Do you ship to Canada?", "Do you deliver to Canada?"),
+    ("Where is my order?", "How can I track my order?"),
+    ("How do I cancel my subscription?", "How can I cancel my subscription?"),
+    ("What payment methods do you accept?", "Which payment methods do you take?"),
+    ("Is there a student discount?", "Do students get a discount?"),
+    ("How long does delivery take?", "How many days until my package arrives?"),
+    ("How do I contact customer support?", "How can I reach customer service?"),
+]
+
+# The same real questions next to a different question that shares most of its words
+LOOKALIKES = [
+    ("Do you ship to Canada?", "Do you ship to Mexico?"),
+    ("What time does the store open?", "What time does the store close?"),
+    ("How do I cancel my subscription?", "How do I renew my subscription?"),
+    ("Is there a student discount?", "Is there a senior discount?"),
+    ("How much does shipping cost?", "How much does express shipping cost?"),
+    ("Where is my order?", "Where is my refund?"),
+    ("How do I reset my password?", "How do I reset my username?"),
+]
+
+def reword(rng, question):
+    """Surface rewording: change case, drop the question mark and swap one word for a typo"""
+    words = question.rstrip("?").split()
+    i = rng.randrange(len(words))
+    words[i] = words[i][:-1] + rng.choice("aeiou")
+    return " ".join(words).capitalize()
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+def time_lookups(index, questions, lang):
+    latencies = []
+    hits = 0
+    for question in questions:
+        start = time.perf_counter()
+        reply = index.lookup(question, lang)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        hits += reply is not None
+    return {
+        'queries': len(questions),
+        'hit_rate': round(hits / len(questions), 4),
+        'p50_us': round(percentile(latencies, 50), 1),
+        'p95_us': round(percentile(latencies, 95), 1),
+        'p99_us': round(percentile(latencies, 99), 1),
+        'mean_us': round(statistics.mean(latencies), 1),
+    }
+
+def match_pairs(index, pairs, lang):
+    """Look up the second question of each pair, with the first one in the index"""
+    results = time_lookups(index, [asked for _, asked in pairs], lang)
+    similarities = [index.similarity(stored, asked) for stored, asked in pairs]
+    results['mean_similarity'] = round(sum(similarities) / len(similarities), 3)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FAQ near-duplicate index")
+    parser.add_argument("--entries", type=int, default=100000, help="Number of stored questions")
+    parser.add_argument("--queries", type=int, default=2000, help="Number of lookups per scenario")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Similarity threshold")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, 5000)
+    questions = [make_question(rng, vocabulary) for _ in range(args.entries)]
+
+    index = FaqIndex(threshold=args.threshold, db_path=None, max_entries=args.entries)
+    start = time.perf_counter()
+    index.add_many((question, 'en', f"reply {i}") for i, question in enumerate(questions))
+    build_seconds = time.perf_counter() - start
+    faq = sorted({stored for stored, _ in PARAPHRASES + LOOKALIKES})
+    index.add_many((question, 'en', f"faq reply {i}") for i, question in enumerate(faq))
+
+    sample = rng.sample(questions, min(args.queries, len(questions)))
+    results = {
+        'entries': args.entries,
+        'threshold': args.threshold,
+        'build_seconds': round(build_seconds, 2),
+        'inserts_per_second': round(args.entries / build_seconds, 1),
+        'exact': time_lookups(index, sample, 'en'),
+        'typo': time_lookups(index, [reword(rng, question) for question in sample], 'en'),
+        'unseen': time_lookups(index, [make_question(rng, vocabulary) for _ in sample], 'en'),
+        # Should hit, but a paraphrase shares few character n-grams with the original
+        'paraphrased': match_pairs(index, PARAPHRASES, 'en'),
+        # Should miss; any hit here is a wrong reply
+        'lookalike': match_pairs(index, LOOKALIKES, 'en'),
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+End-to-end load test of the chat pipeline.
+Simulated users each send a series of messages through the real pipeline
+(detect -> translate -> Groq -> translate back -> optional TTS) at the same time.
+Groq, LibreTranslate and the TTS server are local stand-ins (see local_standins.py)
+unless their URLs are given. Throughput and p50/p95/p99 latency per stage are
+printed as JSON; --compare checks them against an earlier run and exits with
+status 1 if a stage got slower than the tolerance allows.
+
+Usage:
+    python backend/bench_pipeline.py --users 20 --turns 10 --groq-latency 0.3 --tts
+    python backend/bench_pipeline.py --users 20 --stream --output bench.json --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from local_standins import GroqStandin, LibreTranslateStandin, TTSStandin
+
+# Messages per language; each turn adds a unique suffix so no reply is served from a cache or coalesced
+SENTENCES = {
+    'en': ["What time does the store open tomorrow?", "Can you explain how solar panels work?",
+           "I would like some ideas for a birthday dinner."],
+    'fr': ["À quelle heure ouvre le magasin demain ?", "Peux-tu m'expliquer comment fonctionnent les panneaux solaires ?",
+           "Je voudrais des idées pour un dîner d'anniversaire."],
+    'es': ["¿A qué hora abre la tienda mañana?", "¿Puedes explicarme cómo funcionan los paneles solares?",
+           "Me gustaría tener ideas para una cena de cumpleaños."],
+    'hi': ["कल दुकान कितने बजे खुलेगी?", "क्या आप समझा सकते हैं कि सौर पैनल कैसे काम करते हैं?",
+           "मुझे जन्मदिन के खाने के लिए कुछ सुझाव चाहिए।"],
+}
+
+def percentile(values, share):
+    """Nearest-rank percentile of sorted values"""
+    return values[max(0, math.ceil(share * len(values)) - 1)]
+
+def summarize(timings):
+    """p50/p95/p99 and mean per stage, from lists of milliseconds"""
+    stages = {}
+    for stage, values in timings.items():
+        if not values:
+            continue
+        values = sorted(values)
+        stages[stage] = {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 0.50), 2),
+            'p95_ms': round(percentile(values, 0.95), 2),
+            'p99_ms': round(percentile(values, 0.99), 2),
+            'mean_ms': round(sum(values) / len(values), 2),
+        }
+    return stages
+
+def compare(results, baseline, tolerance):
+    """
+    Compare the p95 of every stage with a baseline run.
+
+    Returns:
+        tuple: (per-stage comparison, stages whose p95 grew by more than `tolerance`)
+    """
+    comparison = {}
+    regressions = []
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or not previous.get('p95_ms'):
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms']
+        comparison[stage] = {'baseline_p95_ms': previous['p95_ms'], 'p95_ms': current['p95_ms'],
+                             'change': round(change, 4)}
+        if change > tolerance:
+            regressions.append(stage)
+    if baseline.get('turns_per_second'):
+        change = (results['turns_per_second'] - baseline['turns_per_second']) / baseline['turns_per_second']
+        comparison['throughput'] = {'baseline_turns_per_second': baseline['turns_per_second'],
+                                    'turns_per_second': results['turns_per_second'], 'change': round(change, 4)}
+        if change < -tolerance:
+            regressions.append('throughput')
+    return comparison, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat pipeline against local stand-ins")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=5, help="Messages sent by each user")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds each user waits between messages")
+    parser.add_argument("--languages", default="en,fr,es,hi", help="Comma-separated languages of the messages")
+    parser.add_argument("--stream", action="store_true", help="Stream replies (adds a first_token stage)")
+    parser.add_argument("--tts", action="store_true", help="Also synthesize every reply")
+    parser.add_argument("--caches", action="store_true", help="Leave the response and translation caches on")
+    parser.add_argument("--groq-url", help="Use this Groq API instead of a stand-in")
+    parser.add_argument("--translate-url", help="Use this LibreTranslate server instead of a stand-in")
+    parser.add_argument("--tts-url", help="Use this speech server instead of a stand-in")
+    parser.add_argument("--groq-latency", type=float, default=0.25, help="Stand-in Groq time to first byte")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="Stand-in Groq seconds between words")
+    parser.add_argument("--reply-words", type=int, default=40, help="Stand-in Groq reply length")
+    parser.add_argument("--groq-error-rate", type=float, default=0.0, help="Share of Groq requests that fail")
+    parser.add_argument("--groq-429-rate", type=float, default=0.0, help="Share of Groq requests that get a 429")
+    parser.add_argument("--groq-rpm", type=int, default=0, help="Stand-in requests per minute per key (0: unlimited)")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="Stand-in translation latency")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="Stand-in speech synthesis latency")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown before it's a regression")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    languages = [lang.strip() for lang in args.languages.split(',') if lang.strip() in SENTENCES]
+    if not languages:
+        parser.error(f"--languages must include one of {', '.join(SENTENCES)}")
+
+    standins = {}
+    if not args.groq_url:
+        standins['groq'] = GroqStandin(latency=args.groq_latency, error_rate=args.groq_error_rate, seed=args.seed,
+                                       token_interval=args.token_interval, reply_words=args.reply_words,
+                                       rate_limit_rate=args.groq_429_rate, rpm=args.groq_rpm).start()
+    if not args.translate_url:
+        standins['libretranslate'] = LibreTranslateStandin(latency=args.translate_latency, seed=args.seed).start()
+    if args.tts and not args.tts_url:
+        standins['tts'] = TTSStandin(latency=args.tts_latency, seed=args.seed).start()
+
+    # The pipeline reads its settings at import time, so they're set before importing it
+    os.environ['GROQ_BASE_URL'] = args.groq_url or standins['groq'].url
+    os.environ['LIBRETRANSLATE_URL'] = args.translate_url or standins['libretranslate'].url
+    # Speech goes to a throwaway cache so every reply is really synthesized
+    tts_cache_dir = tempfile.mkdtemp(prefix="bench-tts-")
+    if args.tts:
+        os.environ['TTS_URL'] = args.tts_url or standins['tts'].url
+        os.environ['TTS_CACHE_DIR'] = tts_cache_dir
+    if 'groq' in standins:
+        os.environ['GROQ_API_KEY'] = 'standin-key'
+        os.environ.pop('GROQ_API_KEYS', None)
+        # The scheduler starts unthrottled, so it only holds requests back if the stand-in enforces a quota
+        os.environ.pop('GROQ_RATE_LIMIT_RPM', None)
+        os.environ.pop('GROQ_RATE_LIMIT_TPM', None)
+    if not args.caches:
+        os.environ['GROQ_CACHE'] = '0'
+        os.environ['TRANSLATION_MEMORY'] = '0'
+
+    from batch import process_record
+    from groq_chat import get_coalescing_stats, get_groq_client, get_rate_limit_stats
+    from rate_limiter import INTERACTIVE
+
+    if args.stream:
+        import tracing
+        from api_server import _stream_turn
+
+    def run_turn(user, turn):
+        lang = languages[(user + turn) % len(languages)]
+        sentences = SENTENCES[lang]
+        text = f"{sentences[(user * 7 + turn) % len(sentences)]} #{args.seed}-{user}-{turn}"
+        start = time.perf_counter()
+        if args.stream:
+            events = {}
+            with tracing.span("turn", source="bench", streamed=True):
+                _stream_turn(text, None, args.tts, lambda event, data: events.setdefault(event, data),
+                             threading.Event())
+            ok = 'done' in events and 'error' not in events
+            timings = dict(events['done']['timings_ms']) if 'done' in events else {}
+            timings.pop('total', None)
+        else:
+            result = process_record({'id': f"{user}-{turn}", 'text': text}, tts=args.tts, priority=INTERACTIVE)
+            ok = result['status'] == 'ok'
+            timings = dict(result['timings_ms'])
+        timings['turn'] = round((time.perf_counter() - start) * 1000, 2)
+        return ok, timings
+
+    # One untimed turn loads the language profiles and opens the first connections
+    get_groq_client().warmup()
+    run_turn(0, 0)
+    for standin in standins.values():
+        standin.requests = 0
+
+    timings = {}
+    counts = {'turns': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def user_session(user):
+        for turn in range(args.turns):
+            ok, turn_timings = run_turn(user, turn + 1)
+            with lock:
+                counts['turns'] += 1
+                counts['errors'] += not ok
+                for stage, ms in turn_timings.items():
+                    timings.setdefault(stage, []).append(ms)
+            if args.think:
+                time.sleep(args.think)
+
+    start = time.perf_counter()
+    users = [threading.Thread(target=user_session, args=(user,)) for user in range(args.users)]
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    rate_limit = get_rate_limit_stats()
+    results = {
+        'config': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'turns': counts['turns'],
+        'errors': counts['errors'],
+        'seconds': round(seconds, 2),
+        'turns_per_second': round(counts['turns'] / seconds, 2),
+        'stages': summarize(timings),
+        'standins': {name: {'url': standin.url, 'requests': standin.requests,
+                            **({'rate_limited': standin.rate_limited} if name == 'groq' else {})}
+                     for name, standin in standins.items()},
+        'coalescing': get_coalescing_stats(),
+        'rate_limit': {name: value for name, value in (rate_limit or {}).items() if name != 'keys'},
+    }
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            results['comparison'], results['regressions'] = compare(results, json.load(f), args.tolerance)
+        exit_code = 1 if results['regressions'] else 0
+
+    for standin in standins.values():
+        standin.stop()
+    shutil.rmtree(tts_cache_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq_chat import (GROQ_MODELS, GROQ_MAX_TOKENS, get_groq_client, _api_error_details, _build_payload,
+                       _is_model_fault, _record_outcome_failure)
+from model_health import get_model_health_registry
+from rate_limiter import BATCH
+from text_segments import split_sentences
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Context window of each model, in tokens
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "mixtral-8x7b-32768-instruct": 32768,
+    "llama3-8b-8192": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Conversation memory settings (can be tuned through environment variables)
+# Most prompt tokens sent per turn, however long the conversation gets
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '3072'))
+# Most tokens the rolling summary of older turns may take
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', '384'))
+# Model used to write summaries (the fastest one by default)
+CONVERSATION_SUMMARY_MODEL = os.getenv('CONVERSATION_SUMMARY_MODEL', GROQ_MODELS[-1])
+
+# Tokens the chat format adds around each message, and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# Headroom for the difference between our estimate and the real tokenizer
+SAFETY_MARGIN_TOKENS = 256
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant. "
+    "Update the summary with the new exchanges. Keep names, facts, preferences and open questions; "
+    "drop small talk. Reply with the updated summary only, in at most {words} words."
+)
+
+# ASCII words, runs of digits, and any other single non-space character
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|\S")
+
+# Summaries are written off the request path
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+
+def count_tokens(text):
+    """
+    Estimate the number of tokens in a piece of text, without calling a tokenizer.
+    Errs on the high side: ASCII words count a token per 5 letters, numbers a token
+    per 3 digits, and every other character (CJK, Devanagari, accents, punctuation)
+    a token each.
+
+    Returns:
+        int: The estimated token count
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isascii() and piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 5)
+        elif piece[0].isdigit() and piece.isascii():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+def count_message_tokens(messages):
+    """Estimate the prompt tokens used by a list of chat messages"""
+    return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages) + REPLY_PRIMING_TOKENS
+
+def truncate_to_tokens(text, limit):
+    """Keep the end of `text` so that it fits in `limit` tokens"""
+    if count_tokens(text) <= limit:
+        return text
+    sentences = split_sentences(text, max_chars=400)
+    kept = []
+    used = 0
+    for sentence in reversed(sentences):
+        cost = count_tokens(sentence)
+        if used + cost > limit:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(reversed(kept))
+
+def token_budget(model=None):
+    """
+    Prompt tokens available for a model: its context window minus room for the
+    reply, capped at CONVERSATION_TOKEN_BUDGET.
+    Without a model, the budget that fits every model in GROQ_MODELS is returned,
+    so the same messages can fall back from one model to the next.
+
+    Returns:
+        int: The prompt token budget
+    """
+    models = [model] if model else GROQ_MODELS
+    window = min(MODEL_CONTEXT_WINDOWS.get(name, DEFAULT_CONTEXT_WINDOW) for name in models)
+    return min(CONVERSATION_TOKEN_BUDGET, window - GROQ_MAX_TOKENS - SAFETY_MARGIN_TOKENS)
+
+def extractive_summary(summary, turns, limit):
+    """
+    Summarize turns without a model call: the first sentence of each side of every exchange.
+    Used when the summary model isn't available.
+    """
+    lines = [summary] if summary else []
+    for user, assistant in turns:
+        user_first = (split_sentences(user) or [""])[0]
+        assistant_first = (split_sentences(assistant) or [""])[0]
+        lines.append(f"User: {user_first} Assistant: {assistant_first}")
+    return truncate_to_tokens(" ".join(lines), limit)
+
+def groq_summarizer(summary, turns, limit):
+    """
+    Fold older turns into the running summary with CONVERSATION_SUMMARY_MODEL.
+    Falls back to an extractive summary if the model can't be reached.
+
+    Args:
+        summary (str): The summary so far ("" for none)
+        turns (list): (user, assistant) pairs to add to it
+        limit (int): Maximum tokens for the new summary
+
+    Returns:
+        str: The updated summary
+    """
+    client = get_groq_client()
+    model = CONVERSATION_SUMMARY_MODEL
+    health = get_model_health_registry()
+    if not client.api_key or not health.allow_request(model):
+        return extractive_summary(summary, turns, limit)
+
+    exchanges = "\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in turns)
+    messages = [
+        {"role": "system", "content": SUMMARY_PROMPT.format(words=int(limit * 0.6))},
+        {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew exchanges:\n{exchanges}"},
+    ]
+    data = _build_payload(model, messages)
+    data["max_tokens"] = limit
+    data["temperature"] = 0.2
+    start = time.perf_counter()
+    try:
+        # Summaries aren't waited on, so they queue behind interactive requests
+        response = client.post_chat(data, priority=BATCH)
+        if response.status_code == 200:
+            health.record_success(model, time.perf_counter() - start)
+            text = response.json()['choices'][0]['message']['content'].strip()
+            return truncate_to_tokens(text, limit)
+        logger.error(f"Summary request failed with model {model}: {response.status_code} - {_api_error_details(response)}")
+        model_fault = _is_model_fault(status_code=response.status_code)
+    except Exception as e:
+        logger.error(f"Summary request failed with model {model}: {str(e)}")
+        model_fault = _is_model_fault(e)
+    _record_outcome_failure(health, model, time.perf_counter() - start, model_fault)
+    return extractive_summary(summary, turns, limit)
+
+class Conversation:
+    """
+    Token-budgeted memory of a multi-turn conversation.
+    Recent turns are replayed verbatim; once they outgrow their share of the budget
+    the oldest are folded, in the background, into a rolling summary. The prompt
+    built for each turn therefore stays within the budget however long the
+    conversation runs.
+
+    Args:
+        budget (int): Prompt token budget (defaults to token_budget() for GROQ_MODELS)
+        summary_tokens (int): Maximum tokens for the rolling summary
+        summarizer (callable): summarizer(summary, turns, limit) -> new summary
+        background (bool): Summarize on a worker thread instead of inside add_turn
+    """
+
+    def __init__(self, budget=None, summary_tokens=CONVERSATION_SUMMARY_TOKENS, summarizer=groq_summarizer,
+                 background=True):
+        self.budget = budget or token_budget()
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.background = background
+        self.summary = ""
+        self._turns = []  # (user, assistant, tokens)
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self._stats = {'turns': 0, 'summaries': 0, 'summarized_turns': 0, 'dropped_turns': 0}
+
+    def _history_budget(self):
+        # Half of what the summary doesn't use goes to verbatim turns, the rest is for the new message
+        return (self.budget - self.summary_tokens) // 2
+
+    def add_turn(self, user, assistant):
+        """Record a finished exchange, summarizing older turns if they no longer fit"""
+        tokens = count_tokens(user) + count_tokens(assistant) + 2 * MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._turns.append((user, assistant, tokens))
+            self._stats['turns'] += 1
+            if self._summarizing or sum(turn[2] for turn in self._turns) <= self._history_budget():
+                return
+            self._summarizing = True
+        if self.background:
+            _summary_executor.submit(self._summarize)
+        else:
+            self._summarize()
+
+    def _summarize(self):
+        """Fold the oldest turns into the summary until the rest take at most half the history budget"""
+        try:
+            with self._lock:
+                target = self._history_budget() // 2
+                remaining = sum(turn[2] for turn in self._turns)
+                count = 0
+                while count < len(self._turns) - 1 and remaining > target:
+                    remaining -= self._turns[count][2]
+                    count += 1
+                old = self._turns[:count]
+                summary = self.summary
+            if not old:
+                return
+
+            new_summary = self.summarizer(summary, [(user, assistant) for user, assistant, _ in old], self.summary_tokens)
+
+            with self._lock:
+                # Turns may have been cleared while we were summarizing
+                if self._turns[:count] == old:
+                    self.summary = truncate_to_tokens(new_summary, self.summary_tokens)
+                    del self._turns[:count]
+                    self._stats['summaries'] += 1
+                    self._stats['summarized_turns'] += count
+            logger.info(f"Summarized {count} older conversation turns")
+        except Exception as e:
+            logger.error(f"Error summarizing conversation: {str(e)}")
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+    def with_context(self, messages):
+        """
+        Add the conversation to the system + user messages of a new request.
+        The summary is appended to the system prompt and as many recent turns as
+        fit in the budget go between the system prompt and the new message.
+
+        Args:
+            messages (list): The system message followed by the user message
+
+        Returns:
+            list: The messages to send
+        """
+        system, user = dict(messages[0]), messages[-1]
+        with self._lock:
+            summary = self.summary
+            turns = list(self._turns)
+        if summary:
+            system['content'] = f"{system['content']}\n\nSummary of the conversation so far: {summary}"
+
+        available = self.budget - count_message_tokens([system, user])
+        history = []
+        for user_text, assistant_text, tokens in reversed(turns):
+            if tokens > available:
+                # Older turns that don't fit yet are waiting to be summarized
+                with self._lock:
+                    self._stats['dropped_turns'] += 1
+                break
+            history[:0] = [
+                {"role": "user", "content": user_text},
+                {"role": "assistant", "content": assistant_text},
+            ]
+            available -= tokens
+        return [system] + history + [user]
+
+    @property
+    def empty(self):
+        """True if nothing has been said yet"""
+        with self._lock:
+            return not self._turns and not self.summary
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self.summary = ""
+
+    def stats(self):
+        """
+        Get the size of the conversation memory.
+
+        Returns:
+            dict: Turn and summary counters, the tokens held in verbatim turns and the summary, and the budget
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['verbatim_turns'] = len(self._turns)
+            stats['verbatim_tokens'] = sum(turn[2] for turn in self._turns)
+            stats['summary_tokens'] = count_tokens(self.summary)
+        stats['budget'] = self.budget
+        return stats
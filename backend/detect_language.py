@@ -1,5 +1,10 @@
-from langdetect import detect, DetectorFactory, LangDetectException
+from langdetect import DetectorFactory, LangDetectException
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from langdetect import detector_factory
+from langdetect.detector_factory import init_factory
 import logging
+import os
 import re
 
 # Configure logging
@@ -20,40 +25,139 @@ LANGUAGE_MAP = {
     'fr': 'fr',  # French
     'es': 'es',  # Spanish
     'de': 'de',  # German
+    # Languages written in a non-Latin script (see SCRIPT_CANDIDATES)
+    'ja': 'ja',  # Japanese
+    'ko': 'ko',  # Korean
+    'zh-cn': 'zh-cn',  # Chinese (Simplified)
+    'zh-tw': 'zh-cn',  # Chinese (Traditional)
+    'ar': 'ar',  # Arabic
+    'fa': 'fa',  # Persian
+    'ur': 'ur',  # Urdu
+    'ru': 'ru',  # Russian
+    'uk': 'uk',  # Ukrainian
+    'bg': 'bg',  # Bulgarian
 }
 
 # Default language if detection fails
 DEFAULT_LANGUAGE = 'en'
 
+# Number of recent inputs whose detected language is remembered
+DETECT_CACHE_SIZE = int(os.getenv('DETECT_CACHE_SIZE', '4096'))
+
+# Batches with at least this many distinct texts are spread over a process pool
+DETECT_PARALLEL_THRESHOLD = int(os.getenv('DETECT_PARALLEL_THRESHOLD', '5000'))
+
+# Unicode range for Hindi (Devanagari)
+HINDI_PATTERN = re.compile(r'[\u0900-\u097F]')
+
+# One alternation per script; the index of the matching group tells which script a character is in
+SCRIPT_PATTERN = re.compile(
+    r'([\u3040-\u30FF\u31F0-\u31FF\uFF66-\uFF9F])'  # 1: Japanese kana
+    r'|([\uAC00-\uD7AF\u1100-\u11FF\u3130-\u318F])'  # 2: Korean Hangul
+    r'|([\u4E00-\u9FFF\u3400-\u4DBF])'  # 3: CJK ideographs
+    r'|([\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF])'  # 4: Arabic
+    r'|([\u0400-\u04FF])'  # 5: Cyrillic
+)
+LATIN_PATTERN = re.compile(r'[A-Za-z\u00C0-\u024F]')
+
+# Kana, Hangul, Han, Arabic, Cyrillic: the language when the script alone settles it
+SCRIPT_LANGUAGES = [None, 'ja', 'ko', None, None, None]
+
+# ... and otherwise the languages langdetect chooses between, as several languages share the script
+SCRIPT_CANDIDATES = [None, None, None, ('zh-cn', 'zh-tw', 'ja'), ('ar', 'fa', 'ur'), ('ru', 'uk', 'bg')]
+
 def contains_hindi_characters(text):
     """Check if text contains Hindi characters (Unicode range)"""
-    # Unicode range for Hindi (Devanagari)
-    hindi_pattern = re.compile(r'[\u0900-\u097F]')
-    return bool(hindi_pattern.search(text))
+    return bool(HINDI_PATTERN.search(text))
+
+def _dominant_script(text):
+    """Index of the non-Latin script the text is written in (see SCRIPT_PATTERN), or None"""
+    counts = [0] * len(SCRIPT_LANGUAGES)
+    for match in SCRIPT_PATTERN.finditer(text):
+        counts[match.lastindex] += 1
+    if not any(counts):
+        return None
+    
+    # Any kana means Japanese, even when most characters are kanji
+    if counts[1]:
+        script = 1
+    else:
+        script = max(range(2, len(counts)), key=counts.__getitem__)
+    
+    # Mostly-Latin text with a few foreign characters is left to langdetect
+    if counts[script] + (counts[3] if script == 1 else 0) < len(LATIN_PATTERN.findall(text)):
+        return None
+    return script
+
+def classify_script(text):
+    """
+    Work out the language from the script alone, when the script settles it.
+    Only Devanagari (Hindi), kana (Japanese) and Hangul (Korean) do; Han, Arabic
+    and Cyrillic are each written by several languages.
+    
+    Args:
+        text (str): The text to classify
+        
+    Returns:
+        str: The language code, or None if the text needs statistical detection
+    """
+    if contains_hindi_characters(text):
+        return 'hi'
+    script = _dominant_script(text)
+    return SCRIPT_LANGUAGES[script] if script is not None else None
+
+def script_candidates(text):
+    """
+    Get the languages written in the text's script, for langdetect to choose between.
+    
+    Args:
+        text (str): The text to classify
+        
+    Returns:
+        tuple: Language codes, or None if any language is possible (e.g. Latin script)
+    """
+    script = _dominant_script(text)
+    return SCRIPT_CANDIDATES[script] if script is not None else None
+
+def _detect(text, candidates=None):
+    """Run langdetect on text, only choosing between `candidates` if they are given"""
+    init_factory()
+    detector = detector_factory._factory.create()
+    if candidates:
+        # Languages without a prior are never picked
+        detector.set_prior_map({lang: 1.0 for lang in candidates})
+    detector.append(text)
+    return detector.detect()
+
+@lru_cache(maxsize=DETECT_CACHE_SIZE)
+def _detect_language_cached(text):
+    # First check the script, which settles Hindi, Japanese and Korean text
+    script_lang = classify_script(text)
+    if script_lang:
+        logger.info(f"Detected {script_lang} from script")
+        return script_lang
+        
+    # Then try language detection, among the languages written in the text's script
+    detected_lang = _detect(text, script_candidates(text))
+    
+    # Map to supported languages
+    mapped_lang = LANGUAGE_MAP.get(detected_lang, DEFAULT_LANGUAGE)
+    
+    # If detected language is not in our map, use English
+    if mapped_lang != detected_lang:
+        logger.info(f"Mapped detected language {detected_lang} to {mapped_lang}")
+    
+    logger.info(f"Detected Language: {mapped_lang}")
+    return mapped_lang
 
 def detect_language(text):
     try:
         if not text or not isinstance(text, str):
             logger.error("Invalid input text")
             return DEFAULT_LANGUAGE
-            
-        # First check for Hindi characters
-        if contains_hindi_characters(text):
-            logger.info("Detected Hindi characters in text")
-            return 'hi'
-            
-        # Then try language detection
-        detected_lang = detect(text)
-        
-        # Map to supported languages
-        mapped_lang = LANGUAGE_MAP.get(detected_lang, DEFAULT_LANGUAGE)
         
-        # If detected language is not in our map, use English
-        if mapped_lang != detected_lang:
-            logger.info(f"Mapped detected language {detected_lang} to {mapped_lang}")
-        
-        logger.info(f"Detected Language: {mapped_lang}")
-        return mapped_lang
+        # Repeated inputs are answered from the memo
+        return _detect_language_cached(text)
         
     except LangDetectException as e:
         logger.error(f"Language detection exception: {str(e)}")
@@ -61,3 +165,42 @@ def detect_language(text):
     except Exception as e:
         logger.error(f"Error in language detection: {str(e)}")
         return DEFAULT_LANGUAGE
+
+def _init_worker():
+    """Load the langdetect profiles once per worker process instead of on its first text"""
+    init_factory()
+
+def _detect_chunk(texts):
+    return [detect_language(text) for text in texts]
+
+def detect_languages(texts, processes=None, chunksize=1000):
+    """
+    Detect the language of many texts at once.
+    Identical texts are only detected once, and large batches are spread
+    over a process pool. Codes are the same as detect_language returns.
+    
+    Args:
+        texts (list): The texts to classify
+        processes (int): Worker processes to use (None picks by batch size, 1 stays in-process)
+        chunksize (int): Texts sent to a worker at a time
+        
+    Returns:
+        list: A language code for each text, in the same order
+    """
+    texts = list(texts)
+    unique = list(dict.fromkeys(text for text in texts if text and isinstance(text, str)))
+    
+    if processes is None:
+        processes = os.cpu_count() if len(unique) >= DETECT_PARALLEL_THRESHOLD else 1
+    
+    if processes > 1 and len(unique) > chunksize:
+        chunks = [unique[i:i + chunksize] for i in range(0, len(unique), chunksize)]
+        logger.info(f"Detecting {len(unique)} distinct texts on {processes} processes")
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            detected = [lang for chunk in pool.map(_detect_chunk, chunks) for lang in chunk]
+    else:
+        init_factory()
+        detected = _detect_chunk(unique)
+    
+    languages = dict(zip(unique, detected))
+    return [languages.get(text, DEFAULT_LANGUAGE) if isinstance(text, str) else DEFAULT_LANGUAGE for text in texts]
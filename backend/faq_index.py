@@ -0,0 +1,299 @@
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Index settings (can be tuned through environment variables)
+FAQ_INDEX_ENABLED = os.getenv('FAQ_INDEX', '0').lower() in ('1', 'true', 'yes')
+FAQ_INDEX_THRESHOLD = float(os.getenv('FAQ_INDEX_THRESHOLD', '0.8'))
+FAQ_INDEX_PATH = os.getenv('FAQ_INDEX_PATH')
+# Entries kept across all languages; the least recently used go first
+FAQ_INDEX_MAX_ENTRIES = int(os.getenv('FAQ_INDEX_MAX_ENTRIES', '10000'))
+
+# MinHash/LSH parameters: 64 hashes split into 16 bands of 4 rows
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+NGRAM = 3
+
+# Universal hashing modulo a Mersenne prime; a * h stays below 2**62, so uint64 never overflows
+_PRIME = np.uint64((1 << 31) - 1)
+
+class MinHasher:
+    """Computes MinHash signatures over the character n-grams of a text"""
+
+    def __init__(self, num_perm=NUM_PERM, ngram=NGRAM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.ngram = ngram
+        self.a = rng.randint(1, (1 << 31) - 1, size=num_perm).astype(np.uint64)[:, None]
+        self.b = rng.randint(0, (1 << 31) - 1, size=num_perm).astype(np.uint64)[:, None]
+
+    def shingles(self, text):
+        text = f" {normalize_question(text)} "
+        if len(text) <= self.ngram:
+            return {text}
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) & 0x7FFFFFFF for shingle in self.shingles(text)),
+            dtype=np.uint64
+        )
+        return ((self.a * hashes[None, :] + self.b) % _PRIME).min(axis=1).astype(np.uint32)
+
+def normalize_question(text):
+    """Normalize a question for matching: case-folded, punctuation dropped, whitespace collapsed"""
+    cleaned = "".join(ch if ch.isalnum() or ch.isspace() else " " for ch in text.casefold())
+    return " ".join(cleaned.split())
+
+class _LangIndex:
+    """LSH index over the MinHash signatures of one language"""
+
+    def __init__(self):
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        # Slots in use; slots of removed entries are reused
+        self.slots = 0
+        self.size = 0
+        self.free = []
+        self.replies = []
+        self.questions = []
+        self.row_ids = []
+        self.buckets = [{} for _ in range(BANDS)]
+
+    def add(self, question, reply, signature, row_id=None):
+        if self.free:
+            entry_id = self.free.pop()
+            self.questions[entry_id] = question
+            self.replies[entry_id] = reply
+            self.row_ids[entry_id] = row_id
+        else:
+            if self.slots == len(self.signatures):
+                grown = np.empty((max(1024, 2 * len(self.signatures)), NUM_PERM), dtype=np.uint32)
+                grown[:self.slots] = self.signatures[:self.slots]
+                self.signatures = grown
+            entry_id = self.slots
+            self.slots += 1
+            self.questions.append(question)
+            self.replies.append(reply)
+            self.row_ids.append(row_id)
+        self.signatures[entry_id] = signature
+        self.size += 1
+        for band, bucket in enumerate(self.buckets):
+            bucket.setdefault(signature[band * ROWS:(band + 1) * ROWS].tobytes(), []).append(entry_id)
+        return entry_id
+
+    def remove(self, entry_id):
+        """Drop an entry; returns its database row id"""
+        signature = self.signatures[entry_id]
+        for band, bucket in enumerate(self.buckets):
+            key = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+            ids = bucket.get(key)
+            if ids is not None:
+                ids.remove(entry_id)
+                if not ids:
+                    del bucket[key]
+        row_id = self.row_ids[entry_id]
+        self.questions[entry_id] = self.replies[entry_id] = self.row_ids[entry_id] = None
+        self.free.append(entry_id)
+        self.size -= 1
+        return row_id
+
+    def query(self, signature):
+        candidates = set()
+        for band, bucket in enumerate(self.buckets):
+            candidates.update(bucket.get(signature[band * ROWS:(band + 1) * ROWS].tobytes(), ()))
+        if not candidates:
+            return None, 0.0
+        ids = np.fromiter(candidates, dtype=np.int64)
+        similarities = (self.signatures[ids] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        return int(ids[best]), float(similarities[best])
+
+class FaqIndex:
+    """
+    Near-duplicate question index, so reworded FAQ questions can reuse an earlier reply.
+    Questions are compared by MinHash over character n-grams, with one LSH index per language.
+    Beyond `max_entries`, the least recently added or reused entries are evicted.
+
+    Only surface rewordings match: case, punctuation, typos and a few added or dropped words.
+    A paraphrase in other words does not ("What are your hours?" scores about 0.36 against
+    "What time are you open?"), while a different question that shares most of its words can
+    ("How much does express shipping cost?" scores 0.81 against "How much does shipping cost?").
+    Lowering the threshold therefore buys wrong replies before it buys paraphrases; see
+    bench_faq_index.py.
+
+    Args:
+        threshold (float): Estimated Jaccard similarity needed to reuse a reply
+        db_path (str): SQLite file the index is persisted to (None keeps it in memory only)
+        max_entries (int): Entries kept across all languages
+    """
+
+    def __init__(self, threshold=FAQ_INDEX_THRESHOLD, db_path=FAQ_INDEX_PATH, max_entries=FAQ_INDEX_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hasher = MinHasher()
+        self._indexes = {}
+        # (lang, entry id) of every entry, least recently used first
+        self._recency = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'added': 0, 'evicted': 0}
+        self._db = None
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS faq_entries "
+                    "(id INTEGER PRIMARY KEY, lang TEXT NOT NULL, question TEXT NOT NULL, "
+                    "reply TEXT NOT NULL, signature BLOB NOT NULL)"
+                )
+                self._db.commit()
+                self._load()
+            except sqlite3.Error as e:
+                logger.error(f"Could not open FAQ index database {db_path}: {str(e)}")
+                self._db = None
+
+    def _load(self):
+        count = 0
+        for row_id, lang, question, reply, blob in self._db.execute(
+                "SELECT id, lang, question, reply, signature FROM faq_entries ORDER BY id").fetchall():
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            self._insert(question, lang, reply, signature, row_id)
+            count += 1
+        self._evict()
+        logger.info(f"Loaded {count} FAQ index entries")
+
+    def _insert(self, question, lang, reply, signature, row_id=None):
+        entry_id = self._indexes.setdefault(lang, _LangIndex()).add(question, reply, signature, row_id)
+        self._recency[(lang, entry_id)] = None
+
+    def _evict(self):
+        """Drop the least recently used entries beyond max_entries, also from the database"""
+        row_ids = []
+        while len(self._recency) > self.max_entries:
+            (lang, entry_id), _ = self._recency.popitem(last=False)
+            row_id = self._indexes[lang].remove(entry_id)
+            self._stats['evicted'] += 1
+            if row_id is not None:
+                row_ids.append((row_id,))
+        if row_ids and self._db is not None:
+            try:
+                self._db.executemany("DELETE FROM faq_entries WHERE id = ?", row_ids)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"FAQ index eviction failed: {str(e)}")
+
+    def _write(self, lang, question, reply, signature):
+        """Persist an entry; returns its row id, or None without a database"""
+        if self._db is None:
+            return None
+        try:
+            return self._db.execute(
+                "INSERT INTO faq_entries (lang, question, reply, signature) VALUES (?, ?, ?, ?)",
+                (lang, question, reply, signature.tobytes())
+            ).lastrowid
+        except sqlite3.Error as e:
+            logger.error(f"FAQ index write failed: {str(e)}")
+            return None
+
+    def add(self, question, lang, reply):
+        """
+        Add a question and its reply to the index for `lang`.
+
+        Args:
+            question (str): The user's question
+            lang (str): The language code of the question
+            reply (str): The reply to reuse for similar questions
+        """
+        self.add_many([(question, lang, reply)])
+
+    def add_many(self, entries):
+        """
+        Add many (question, lang, reply) entries in one go.
+
+        Args:
+            entries (iterable): Tuples of question, language code and reply
+        """
+        with self._lock:
+            for question, lang, reply in entries:
+                signature = self.hasher.signature(question)
+                self._insert(question, lang, reply, signature, self._write(lang, question, reply, signature))
+                self._stats['added'] += 1
+            if self._db is not None:
+                try:
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"FAQ index write failed: {str(e)}")
+            self._evict()
+
+    def lookup(self, question, lang):
+        """
+        Find a stored reply for a question similar to `question`.
+
+        Args:
+            question (str): The user's question
+            lang (str): The language code of the question
+
+        Returns:
+            str: The stored reply, or None if nothing is similar enough
+        """
+        signature = self.hasher.signature(question)
+        with self._lock:
+            self._stats['lookups'] += 1
+            index = self._indexes.get(lang)
+            if index is None:
+                return None
+            entry_id, similarity = index.query(signature)
+            if entry_id is None or similarity < self.threshold:
+                return None
+            self._stats['hits'] += 1
+            self._recency.move_to_end((lang, entry_id))
+            logger.info(f"FAQ index hit ({similarity:.2f}) for '{question}' -> '{index.questions[entry_id]}'")
+            return index.replies[entry_id]
+
+    def similarity(self, first, second):
+        """
+        Estimate how similar two questions look to the index.
+
+        Returns:
+            float: Estimated Jaccard similarity of their character n-grams, from 0 to 1
+        """
+        return float(np.mean(self.hasher.signature(first) == self.hasher.signature(second)))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = {lang: index.size for lang, index in self._indexes.items()}
+        stats['hit_ratio'] = round(stats['hits'] / stats['lookups'], 4) if stats['lookups'] else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_faq_index():
+    """
+    Get the process-wide FAQ index, creating (and loading) it on first use.
+
+    Returns:
+        FaqIndex: The shared index
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FaqIndex()
+    return _index
@@ -1,12 +1,10 @@
 import streamlit as st
 import os
-import base64
 import sys
 import logging
 import time
 import uuid
 from datetime import datetime
-import glob
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,10 +17,14 @@ sys.path.append(current_dir)
 # Import dependencies
 try:
     from detect_language import detect_language
-    from groq_chat import process_chat
+    from groq_chat import process_chat_stream, get_groq_client, DIRECT_RESPONSE_LANGS
     from translate import translate_to_english
     from translate_back import translate_back_to_user
     from speak import speak
+    from audio_registry import get_audio_registry
+    from job_executor import get_job_executor, DONE, FAILED
+    from conversation_memory import Conversation
+    import tracing
 except ImportError as e:
     st.error(f"Import error: {e}")
     st.stop()
@@ -35,45 +37,103 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Shared Groq client for all sessions, warmed up once per process
+@st.cache_resource
+def get_shared_groq_client():
+    client = get_groq_client()
+    client.warmup(background=True)
+    return client
+
+get_shared_groq_client()
+
+# Worker pool shared by all sessions, so chat turns don't block the script thread
+@st.cache_resource
+def get_shared_job_executor():
+    return get_job_executor()
+
+job_executor = get_shared_job_executor()
+
+# Per-stage metrics for Prometheus, served once per process if TRACE_METRICS_PORT is set
+tracing.start_metrics_server()
+
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
-if 'audio_files' not in st.session_state:
-    st.session_state.audio_files = {}
 if 'audio_enabled' not in st.session_state:
     st.session_state.audio_enabled = True
+if 'pending_turns' not in st.session_state:
+    st.session_state.pending_turns = []
+if 'conversation' not in st.session_state:
+    # Context sent to Groq, kept within a token budget however long the chat gets
+    st.session_state.conversation = Conversation()
 
-# Directory for audio files
-output_dir = os.path.join(os.getcwd(), "output")
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Function to autoplay audio
-def autoplay_audio(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-        b64 = base64.b64encode(data).decode()
-        md = f"""
-            <audio autoplay>
-            <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-            </audio>
-            """
-        st.markdown(md, unsafe_allow_html=True)
+# Audio for each assistant message, shared by all sessions in this process
+audio_registry = get_audio_registry()
 
-# Function to create a play button for saved audio
-def get_audio_player(file_path):
+# Function to show a play button for saved audio; the artifact keeps its bytes in memory and
+# st.audio hands them to Streamlit's media server, so the page only carries a URL
+# and the browser caches the file
+def show_audio_player(artifact):
     try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            return f"""
-                <audio controls style="width:100%; margin-top:12px; height:40px;">
-                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-                </audio>
-                """
+        st.audio(artifact.data, format=artifact.mime_type)
+        return True
     except Exception as e:
         logger.error(f"Error creating audio player: {str(e)}")
-        return ""
+        return False
+
+# Chat pipeline for one user message, run on the shared worker pool.
+# A job discarded by "Clear Chat" stops at the next check_cancelled(), and its
+# exchange is never added to the conversation.
+def run_chat_turn(job, user_input, audio_enabled, conversation):
+    # One trace per turn, with a span for each stage
+    with tracing.span("turn", source="web") as turn:
+        # Detect the language; Groq answers some languages directly, the rest go through English
+        with tracing.span("detect"):
+            detected_lang = detect_language(user_input)
+        turn.set_attribute('lang', detected_lang)
+        need_translation = detected_lang not in DIRECT_RESPONSE_LANGS
+        chat_lang = 'en' if need_translation else detected_lang
+        
+        # Translate to English if needed
+        message = user_input
+        if need_translation:
+            job.check_cancelled()
+            job.update(stage="Translating...", language=detected_lang)
+            with tracing.span("translate", lang=detected_lang):
+                message = translate_to_english(user_input, detected_lang) or user_input
+        
+        # Stream the AI response, publishing the text so far as tokens arrive
+        job.check_cancelled()
+        job.update(stage="Thinking...", language=detected_lang)
+        ai_response = ""
+        with tracing.span("chat", streamed=True):
+            tokens = process_chat_stream(message, chat_lang, history=conversation)
+            try:
+                for token in tokens:
+                    # Stopping mid-stream also keeps the exchange out of the conversation
+                    job.check_cancelled()
+                    ai_response += token
+                    job.update(partial_response=ai_response)
+            finally:
+                tokens.close()
+        
+        # Translate response back if needed
+        final_response = ai_response
+        if need_translation:
+            job.check_cancelled()
+            job.update(stage="Translating...")
+            with tracing.span("translate_back", lang=detected_lang):
+                final_response = translate_back_to_user(ai_response, detected_lang) or ai_response
+        
+        # Generate and play audio if enabled
+        artifact = None
+        if audio_enabled:
+            job.check_cancelled()
+            job.update(stage="Generating audio...", partial_response=final_response)
+            with tracing.span("tts", lang=detected_lang):
+                artifact = speak(final_response, detected_lang, chunked=True)
+        
+        return {"language": detected_lang, "response": final_response, "artifact": artifact}
 
 # Custom CSS for Google-like UI
 st.markdown("""
@@ -264,7 +324,7 @@ for i, message in enumerate(st.session_state.messages):
         st.markdown(f"""
         <div class="chat-message {message['role']}">
             <div class="language-label">
-                {lang_names.get(message['language'], message['language'])}
+                {lang_names.get(message['language'], message['language'] or '…')}
             </div>
             <div class="chat-text">
                 {message['content']}
@@ -273,10 +333,10 @@ for i, message in enumerate(st.session_state.messages):
         """, unsafe_allow_html=True)
         
         # If this is an assistant message and has associated audio, show the player
-        if message['role'] == 'assistant' and str(i) in st.session_state.audio_files:
-            audio_path = st.session_state.audio_files[str(i)]
-            if os.path.exists(audio_path):
-                st.markdown(get_audio_player(audio_path), unsafe_allow_html=True)
+        if message['role'] == 'assistant' and 'id' in message:
+            artifact = audio_registry.get(message['id'])
+            if artifact is not None:
+                show_audio_player(artifact)
 
 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -306,27 +366,21 @@ user_input = st.chat_input("Type a message in any language...")
 
 # Process user input
 if user_input:
-    # Clean up old audio files if too many
-    if len(st.session_state.audio_files) > 10:
-        # Get files that aren't in the current chat history
-        current_files = set(st.session_state.audio_files.values())
-        all_files = set(glob.glob(os.path.join(output_dir, "*.mp3")))
-        to_delete = all_files - current_files
-        
-        # Delete unused files
-        for file_path in to_delete:
-            try:
-                os.remove(file_path)
-                logger.info(f"Cleaned up unused audio file: {file_path}")
-            except Exception as e:
-                logger.error(f"Error cleaning up audio file: {str(e)}")
+    # Start the chat pipeline in the background so the page stays responsive
+    user_message_id = uuid.uuid4().hex
+    job_id = job_executor.submit(run_chat_turn, user_input, st.session_state.audio_enabled,
+                                 st.session_state.conversation, name="chat_turn")
     
-    # Add user message to chat history
-    detected_lang = detect_language(user_input)
+    # Add user message to chat history (the language is filled in once it's detected)
     st.session_state.messages.append({
+        "id": user_message_id,
         "role": "user",
         "content": user_input,
-        "language": detected_lang
+        "language": None
+    })
+    st.session_state.pending_turns.append({
+        "job_id": job_id,
+        "user_message_id": user_message_id
     })
     
     # Display user message
@@ -334,87 +388,96 @@ if user_input:
         st.markdown(f"""
         <div class="chat-message user">
             <div class="language-label">
-                {lang_names.get(detected_lang, detected_lang)}
+                …
             </div>
             <div class="chat-text">
                 {user_input}
             </div>
         </div>
         """, unsafe_allow_html=True)
-    
-    # Create a placeholder for the AI response
-    response_placeholder = st.empty()
-    
-    # Show a spinner while processing
-    with st.spinner("Thinking..."):
-        # Translate to English if needed
-        english_message = translate_to_english(user_input, detected_lang)
+
+# Show replies that are still being generated, refreshing as the jobs make progress.
+# The fragment only polls while it is drawn, and it is only drawn while a reply is pending
+@st.fragment(run_every=0.5)
+def show_pending_turns():
+    finished = False
+    for turn in list(st.session_state.pending_turns):
+        job = job_executor.poll(turn["job_id"])
         
-        # Get AI response
-        ai_response = process_chat(english_message, detected_lang)
+        if job is None or job["status"] in (DONE, FAILED):
+            # Move the finished reply into the chat history
+            st.session_state.pending_turns.remove(turn)
+            job_executor.discard(turn["job_id"])
+            finished = True
+            
+            if job is not None and job["status"] == DONE:
+                result = job["result"]
+            else:
+                result = {
+                    "language": (job or {}).get("progress", {}).get("language", "en"),
+                    "response": "I apologize, but I encountered an error while processing your message.",
+                    "artifact": None
+                }
+            
+            for message in st.session_state.messages:
+                if message.get("id") == turn["user_message_id"]:
+                    message["language"] = result["language"]
+            
+            # Add AI response to chat history
+            message_id = uuid.uuid4().hex
+            st.session_state.messages.append({
+                "id": message_id,
+                "role": "assistant",
+                "content": result["response"],
+                "language": result["language"]
+            })
+            
+            # Remember the audio for this message
+            if result["artifact"]:
+                audio_registry.register(message_id, result["artifact"])
+            continue
         
-        # Translate response back if needed
-        final_response = translate_back_to_user(ai_response, detected_lang)
-    
-    # Add AI response to chat history
-    message_index = len(st.session_state.messages)
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": final_response,
-        "language": detected_lang
-    })
-    
-    # Display AI response
-    with st.container():
-        st.markdown(f"""
-        <div class="chat-message assistant">
-            <div class="language-label">
-                {lang_names.get(detected_lang, detected_lang)}
-            </div>
-            <div class="chat-text">
-                {final_response}
+        # Display the AI response so far
+        progress = job["progress"]
+        language = progress.get("language")
+        partial_response = progress.get("partial_response")
+        if partial_response:
+            st.markdown(f"""
+            <div class="chat-message assistant">
+                <div class="language-label">
+                    {lang_names.get(language, language)}
+                </div>
+                <div class="chat-text">
+                    {partial_response}
+                </div>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
+        st.caption(progress.get("stage", "Thinking..."))
     
-    # Generate and play audio if enabled
-    if st.session_state.audio_enabled:
-        with st.spinner("Generating audio..."):
-            # Generate the audio file
-            speak_success = speak(final_response, detected_lang)
-            
-            if speak_success:
-                # Find the latest audio file
-                audio_files = [f for f in os.listdir(output_dir) if f.endswith('.mp3')]
-                if audio_files:
-                    latest_file = max(audio_files, key=lambda x: os.path.getmtime(os.path.join(output_dir, x)))
-                    latest_file_path = os.path.join(output_dir, latest_file)
-                    
-                    # Store in session state with message index as key
-                    st.session_state.audio_files[str(message_index)] = latest_file_path
-                    
-                    # Display the audio player with better error handling
-                    audio_html = get_audio_player(latest_file_path)
-                    if audio_html:
-                        st.markdown(audio_html, unsafe_allow_html=True)
-                    else:
-                        st.warning("Could not load audio player. Please try again.")
+    # Redraw the whole page so finished replies show up in the history
+    if finished:
+        st.rerun()
+
+# A full rerun without the fragment stops its timer; the last finished reply triggers one
+if st.session_state.pending_turns:
+    show_pending_turns()
 
 # Controls
 col1, col2 = st.columns([1, 5])
 with col1:
     if st.button("Clear Chat", use_container_width=True):
-        # Delete all audio files
-        for audio_path in st.session_state.audio_files.values():
-            if os.path.exists(audio_path):
-                try:
-                    os.remove(audio_path)
-                except Exception as e:
-                    logger.warning(f"Error removing audio file: {str(e)}")
+        # Audio files stay in the shared TTS cache, which evicts them by itself
+        for message in st.session_state.messages:
+            if 'id' in message:
+                audio_registry.remove(message['id'])
         
-        # Clear session state
+        # Clear session state (replies still being generated are dropped)
+        for turn in st.session_state.pending_turns:
+            job_executor.discard(turn["job_id"])
         st.session_state.messages = []
-        st.session_state.audio_files = {}
+        st.session_state.pending_turns = []
+        # A fresh conversation, so dropped replies can't land in the new one
+        st.session_state.conversation = Conversation()
         st.rerun()
 
 # Footer
@@ -1,9 +1,21 @@
+import asyncio
+import hashlib
 import logging
 import requests
 import json
 import os
+import threading
 import time
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from model_health import get_model_health_registry, backoff_delay
+from tiered_cache import TieredCache
+from faq_index import FAQ_INDEX_ENABLED, get_faq_index
+from single_flight import SingleFlight
+from rate_limiter import INTERACTIVE, RateLimitScheduler, RateLimitTimeout, estimate_tokens
+import tracing
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,109 +37,796 @@ LANGUAGE_PROMPTS = {
     'default': "You are a helpful multilingual AI assistant. Provide clear, concise, and accurate responses."
 }
 
-def ask_groq(text, retry_count=2, lang='en'):
+# Languages Groq answers in directly (no translation needed)
+DIRECT_RESPONSE_LANGS = ['en', 'hi']
+
+# Reply used when no API key is configured
+NO_API_KEY_MESSAGE = "I'm sorry, but I don't have access to the Groq API at the moment. Please check your API key."
+
+# HTTP client settings (can be tuned through environment variables)
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', "https://api.groq.com/openai/v1")
+GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', '30'))
+GROQ_POOL_CONNECTIONS = int(os.getenv('GROQ_POOL_CONNECTIONS', '4'))
+GROQ_POOL_MAXSIZE = int(os.getenv('GROQ_POOL_MAXSIZE', '16'))
+
+# Hedging: race the models in ask_groq instead of trying them strictly in order (see groq_hedge)
+GROQ_HEDGE_ENABLED = os.getenv('GROQ_HEDGE', '0').lower() in ('1', 'true', 'yes')
+
+# Rate limiting: queue requests against each key's quota instead of running into 429s
+GROQ_RATE_LIMIT_ENABLED = os.getenv('GROQ_RATE_LIMIT', '1').lower() in ('1', 'true', 'yes')
+# Times a request that got a 429 is re-queued (honoring Retry-After) before giving up on the model
+GROQ_RATE_LIMIT_RETRIES = int(os.getenv('GROQ_RATE_LIMIT_RETRIES', '2'))
+
+# Sampling parameters sent with every request
+GROQ_TEMPERATURE = 0.7
+GROQ_MAX_TOKENS = 1024
+
+# Response cache settings (the cache is opt-in)
+GROQ_CACHE_ENABLED = os.getenv('GROQ_CACHE', '0').lower() in ('1', 'true', 'yes')
+GROQ_CACHE_TTL = float(os.getenv('GROQ_CACHE_TTL', '86400'))
+GROQ_CACHE_MAX_ENTRIES = int(os.getenv('GROQ_CACHE_MAX_ENTRIES', '1024'))
+GROQ_CACHE_DB = os.getenv('GROQ_CACHE_DB')
+GROQ_CACHE_MAX_DB_ENTRIES = int(os.getenv('GROQ_CACHE_MAX_DB_ENTRIES', '100000'))
+
+# Request coalescing: identical requests in flight at the same time share one upstream call
+GROQ_COALESCE_ENABLED = os.getenv('GROQ_COALESCE', '1').lower() in ('1', 'true', 'yes')
+GROQ_COALESCE_TIMEOUT = float(os.getenv('GROQ_COALESCE_TIMEOUT', str(GROQ_TIMEOUT)))
+
+# Time spent opening new connections, tracked per thread
+_connect_timing = threading.local()
+
+def _record_connect_time(seconds):
+    _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0.0) + seconds
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect_time(time.perf_counter() - start)
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect_time(time.perf_counter() - start)
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long the TCP+TLS handshake took"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+class GroqAPIError(Exception):
+    """Raised when the Groq API answers with an error status"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+class GroqClient:
     """
-    Send a request to Groq API and get a response.
-    Will try multiple models if the first one fails.
+    Long-lived HTTP client for the Groq API.
+    Keeps a pool of keep-alive connections so chat turns reuse an open
+    TCP+TLS connection instead of paying a new handshake every time.
+    With rate limiting on, requests go through a RateLimitScheduler that spreads
+    them over the API keys and waits for quota instead of running into 429s.
     
     Args:
-        text (str): The user's input
-        retry_count (int): Number of retries if all models fail
-        lang (str): The language code for response
+        api_key (str): Groq API key (defaults to GROQ_API_KEY)
+        base_url (str): Base URL of the OpenAI-compatible Groq API
+        pool_connections (int): Number of connection pools to cache
+        pool_maxsize (int): Maximum number of connections kept per pool
+        timeout (float): Default request timeout in seconds
+        api_keys (list): Several API keys to round-robin over (defaults to GROQ_API_KEYS, comma-separated)
+        rate_limit (bool): Schedule requests against the keys' rate limits (defaults to GROQ_RATE_LIMIT)
     """
-    try:
-        if not text or not isinstance(text, str):
-            logger.error("Invalid input text for Groq")
-            return None
+
+    def __init__(self, api_key=None, base_url=GROQ_BASE_URL, pool_connections=GROQ_POOL_CONNECTIONS,
+                 pool_maxsize=GROQ_POOL_MAXSIZE, timeout=GROQ_TIMEOUT, api_keys=None, rate_limit=None):
+        if api_keys is None:
+            api_keys = [key.strip() for key in os.getenv('GROQ_API_KEYS', '').split(',') if key.strip()]
+        self.api_keys = list(api_keys) or [key for key in [api_key or os.getenv('GROQ_API_KEY')] if key]
+        self.api_key = self.api_keys[0] if self.api_keys else None
+        self.base_url = base_url.rstrip('/')
+        self.url = f"{self.base_url}/chat/completions"
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        
+        if rate_limit is None:
+            rate_limit = GROQ_RATE_LIMIT_ENABLED
+        self.scheduler = RateLimitScheduler(self.api_keys) if rate_limit and self.api_keys else None
+        
+        self.session = requests.Session()
+        adapter = _TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def post_chat(self, payload, timeout=None, stream=False, priority=INTERACTIVE):
+        """
+        Send a chat/completions request over the pooled session.
+        
+        Args:
+            payload (dict): The request body
+            timeout (float): Request timeout in seconds (defaults to the client timeout)
+            stream (bool): If True, return as soon as the headers arrive and leave the body unread
+            priority (str): Scheduling priority, rate_limiter.INTERACTIVE or rate_limiter.BATCH
             
-        # Get API key from environment variable
-        api_key = os.getenv('GROQ_API_KEY')
-        if not api_key:
-            logger.error("GROQ_API_KEY not found in environment variables")
-            return "I'm sorry, but I don't have access to the Groq API at the moment. Please check your API key."
+        Returns:
+            requests.Response: The response, with a `timings` dict of queue, connect, TTFB and total milliseconds
+            
+        Raises:
+            GroqAPIError: If no API key had rate-limit capacity in time (status 429)
+        """
+        queued = 0.0
+        for attempt in range(GROQ_RATE_LIMIT_RETRIES + 1):
+            # One span per HTTP request, so rate-limit re-queues show up in the trace
+            with tracing.span("groq.request", model=payload.get('model'), priority=priority) as span:
+                headers = None
+                lease = None
+                if self.scheduler is not None:
+                    try:
+                        lease = self.scheduler.acquire(payload.get('model'), estimate_tokens(payload), priority)
+                    except RateLimitTimeout as e:
+                        raise GroqAPIError(429, str(e))
+                    queued += lease.waited
+                    span.set_attribute('queue_ms', round(lease.waited * 1000, 2))
+                    headers = {"Authorization": f"Bearer {lease.api_key}"}
+                
+                _connect_timing.seconds = 0.0
+                start = time.perf_counter()
+                try:
+                    response = self.session.post(self.url, json=payload, headers=headers,
+                                                 timeout=timeout or self.timeout, stream=True)
+                except Exception:
+                    if lease is not None:
+                        self.scheduler.release(lease)
+                    raise
+                ttfb = time.perf_counter() - start
+                span.set_attributes(**{'http.status_code': response.status_code,
+                                       'ttfb_ms': round(ttfb * 1000, 2)})
+                if response.status_code != 200:
+                    span.set_status(tracing.ERROR, f"HTTP {response.status_code}")
+                if lease is not None:
+                    self.scheduler.record(lease, response)
+                if response.status_code == 429 and lease is not None and attempt < GROQ_RATE_LIMIT_RETRIES:
+                    # The scheduler now knows when this key frees up, so queue again
+                    logger.warning(f"Groq rate limit for {payload.get('model')}, re-queueing the request")
+                    response.close()
+                    continue
+            break
+        
+        if not stream:
+            # Read the body now so the connection goes back to the pool
+            response.content
+        total = time.perf_counter() - start
+        response.timings = {
+            'queue_ms': round(queued * 1000, 2),
+            'connect_ms': round(getattr(_connect_timing, 'seconds', 0.0) * 1000, 2),
+            'ttfb_ms': round(ttfb * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        logger.info(f"Groq request timings for {payload.get('model')}: {response.timings}")
+        return response
+
+    def stream_chat(self, payload, timeout=None, priority=INTERACTIVE):
+        """
+        Send a streaming chat/completions request and yield the content deltas.
         
-        # Get the appropriate system prompt for the language
-        system_prompt = LANGUAGE_PROMPTS.get(lang, LANGUAGE_PROMPTS['default'])
+        Args:
+            payload (dict): The request body (should include "stream": True)
+            timeout (float): Request timeout in seconds (defaults to the client timeout)
+            priority (str): Scheduling priority, rate_limiter.INTERACTIVE or rate_limiter.BATCH
+            
+        Yields:
+            str: Pieces of the reply as they arrive
+            
+        Raises:
+            GroqAPIError: If Groq answers with a non-200 status
+            requests.exceptions.ChunkedEncodingError: If the stream ends before Groq finished the reply
+        """
+        response = self.post_chat(payload, timeout=timeout, stream=True, priority=priority)
+        try:
+            if response.status_code != 200:
+                response.content
+                raise GroqAPIError(response.status_code, _api_error_details(response))
+            
+            # SSE bodies are UTF-8, whatever the content-type header says
+            response.encoding = 'utf-8'
+            first_token = None
+            finished = False
+            start = time.perf_counter()
+            for line in response.iter_lines(decode_unicode=True):
+                # Server-sent events: "data: {...}" lines, ending with "data: [DONE]"
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    finished = True
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                        logger.info(f"Groq first token for {payload.get('model')} after "
+                                    f"{response.timings['ttfb_ms'] + first_token * 1000:.2f} ms")
+                    yield content
+            if not finished:
+                raise requests.exceptions.ChunkedEncodingError("Groq stream ended before [DONE]")
+        finally:
+            response.close()
+
+    def warmup(self, connections=1, background=False):
+        """
+        Open connections to the Groq API ahead of the first chat turn.
         
-        # Add language-specific instructions
-        if lang == 'hi':
-            # Add specific instructions for Hindi
-            text = f"{text}\n\nPlease respond in Hindi. Use a mix of Hindi script and Roman script where appropriate."
+        Args:
+            connections (int): Number of connections to open in parallel
+            background (bool): If True, warm up in a daemon thread and return immediately
+        """
+        if background:
+            thread = threading.Thread(target=self.warmup, args=(connections,), daemon=True)
+            thread.start()
+            return thread
         
-        # Try each model in sequence
-        for model in GROQ_MODELS:
+        def _open():
+            _connect_timing.seconds = 0.0
             try:
-                logger.info(f"Trying Groq model: {model}")
-                
-                # Groq API endpoint
-                url = "https://api.groq.com/openai/v1/chat/completions"
-                
-                # Headers
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Request body with system prompt
-                data = {
-                    "model": model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": text
-                        }
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 1024
-                }
-                
-                # Make the API request
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                response = self.session.get(f"{self.base_url}/models", timeout=self.timeout)
+                response.close()
+                logger.info(f"Warmed up Groq connection in {getattr(_connect_timing, 'seconds', 0.0) * 1000:.2f} ms")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Groq connection warmup failed: {str(e)}")
+        
+        connections = max(1, min(connections, self.pool_maxsize))
+        threads = [threading.Thread(target=_open, daemon=True) for _ in range(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_groq_client():
+    """
+    Get the process-wide Groq client, creating it on first use.
+    
+    Returns:
+        GroqClient: The shared client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GroqClient()
+    return _client
+
+def _build_messages(text, lang, history=None):
+    """
+    Build the messages for a chat request in the given language.
+    With a history (a conversation_memory.Conversation), earlier turns and their
+    summary are included within the conversation's token budget.
+    """
+    # Get the appropriate system prompt for the language
+    system_prompt = LANGUAGE_PROMPTS.get(lang, LANGUAGE_PROMPTS['default'])
+    
+    # Add language-specific instructions
+    if lang == 'hi':
+        # Add specific instructions for Hindi
+        text = f"{text}\n\nPlease respond in Hindi. Use a mix of Hindi script and Roman script where appropriate."
+    
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": text
+        }
+    ]
+    if history is not None:
+        messages = history.with_context(messages)
+    return messages
+
+def _build_payload(model, messages, stream=False):
+    """Build the chat/completions request body for a model"""
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": GROQ_TEMPERATURE,
+        "max_tokens": GROQ_MAX_TOKENS
+    }
+    if stream:
+        data["stream"] = True
+    return data
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Get the process-wide Groq response cache, creating it on first use.
+    
+    Returns:
+        TieredCache: The shared cache
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = TieredCache(
+                    max_entries=GROQ_CACHE_MAX_ENTRIES,
+                    ttl=GROQ_CACHE_TTL,
+                    db_path=GROQ_CACHE_DB,
+                    max_db_entries=GROQ_CACHE_MAX_DB_ENTRIES,
+                    table='groq_responses'
+                )
+    return _response_cache
+
+def _normalize_text(text):
+    """Normalize text for cache keys: case-folded with whitespace collapsed"""
+    return " ".join(text.casefold().split())
+
+def _cache_key(model, messages, lang):
+    """Cache key for a reply from `model` to `messages`, covering the prompt and sampling params"""
+    parts = [
+        model,
+        lang,
+        [(message['role'], _normalize_text(message['content'])) for message in messages],
+        GROQ_TEMPERATURE,
+        GROQ_MAX_TOKENS,
+    ]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _cached_reply(messages, lang):
+    """Return a cached reply from any of the models, in order of preference"""
+    keys = {_cache_key(model, messages, lang): model for model in GROQ_MODELS}
+    # One lookup however many models there are, so the hit ratio counts questions rather than models
+    key, reply = get_response_cache().get_first(keys)
+    if reply is not None:
+        logger.info(f"Groq response cache hit for model {keys[key]}")
+    return reply
+
+def _store_reply(model, messages, lang, reply):
+    get_response_cache().set(_cache_key(model, messages, lang), reply)
+
+def _failure_message(lang):
+    """Language-specific message used when every model failed"""
+    if lang == 'hi':
+        return "मुझे खेद है, मैं इस समय AI से जवाब नहीं ले पा रहा हूँ। कृपया बाद में पुनः प्रयास करें।"
+    return "I'm sorry, but I couldn't get a response from the AI at this time. Please try again later."
+
+def _error_message(lang):
+    """Language-specific message used when an unexpected error occurred"""
+    if lang == 'hi':
+        return "क्षमा करें, आपके अनुरोध को संसाधित करते समय एक त्रुटि हुई।"
+    return "I'm sorry, but an error occurred while processing your request."
+
+def _is_fallback_reply(reply, lang):
+    """Check whether a reply is one of our canned failure messages rather than a model answer"""
+    return reply in (NO_API_KEY_MESSAGE, _failure_message(lang), _error_message(lang))
+
+def _api_error_details(response):
+    """Extract the error message from a failed Groq response"""
+    try:
+        return response.json().get('error', {}).get('message', 'Unknown error')
+    except ValueError:
+        return response.text or 'Unknown error'
+
+def _is_model_fault(error=None, status_code=None):
+    """
+    Tell whether a failed request counts against the model's health.
+    Only server errors (5xx), timeouts and connection failures do; a 4xx, a 429 or a request
+    that never got rate-limit capacity says nothing about the model.
+    
+    Args:
+        error (Exception): The exception the request raised, if any
+        status_code (int): The HTTP status of the response, if one arrived
+        
+    Returns:
+        bool: True if the failure should count toward the circuit breaker
+    """
+    if status_code is None and isinstance(error, GroqAPIError):
+        status_code = error.status_code
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                              requests.exceptions.ChunkedEncodingError))
+
+def _record_outcome_failure(health, model, latency, model_fault):
+    """Record a failed attempt, counting it toward the breaker only if it was the model's fault"""
+    if model_fault:
+        health.record_failure(model, latency)
+    else:
+        health.record_client_error(model)
+
+def ask_model(client, model, messages, lang='en', use_cache=False, priority=INTERACTIVE, attempt=1, on_response=None,
+              cancelled=None):
+    """
+    Ask one model once, logging and tracing the attempt and recording its outcome in the model's health.
+    This is the single attempt behind both the sequential loop in ask_groq and the hedged races in groq_hedge.
+    
+    Args:
+        client (GroqClient): Client to send the request with
+        model (str): The model to ask
+        messages (list): The chat messages, system prompt included
+        lang (str): The language code for response (part of the cache key)
+        use_cache (bool): Store a good reply in the response cache
+        priority (str): Rate-limit queue priority, rate_limiter.INTERACTIVE or rate_limiter.BATCH
+        attempt (int): Round of retries this attempt belongs to, for the trace
+        on_response (callable): Called with the response as soon as its headers arrive, before the body is read
+        cancelled (threading.Event): Set by a caller that gave up on the attempt (e.g. by closing the response);
+            its failure then isn't held against the model
+        
+    Returns:
+        str: The model's reply, or None if it failed
+    """
+    health = get_model_health_registry()
+    start = time.perf_counter()
+    model_fault = False
+    with tracing.span("groq.attempt", model=model, attempt=attempt) as span:
+        try:
+            logger.info(f"Trying Groq model: {model}")
+            
+            # Request body with system prompt
+            data = _build_payload(model, messages)
+            
+            # Make the API request over the pooled connection
+            response = client.post_chat(data, stream=on_response is not None, priority=priority)
+            try:
+                if on_response is not None:
+                    on_response(response)
                 
                 if response.status_code == 200:
                     result = response.json()
                     reply = result['choices'][0]['message']['content']
+                    health.record_success(model, time.perf_counter() - start)
                     logger.info(f"Groq response success with model {model}")
+                    if use_cache:
+                        _store_reply(model, messages, lang, reply)
                     return reply
                 else:
-                    error_details = response.json().get('error', {}).get('message', 'Unknown error')
+                    error_details = _api_error_details(response)
                     logger.error(f"Groq API error with model {model}: {response.status_code} - {error_details}")
-                    # Continue to next model
-                    continue
-                    
-            except requests.exceptions.Timeout:
-                logger.error(f"Timeout error with model {model}")
+                    span.set_status(tracing.ERROR, f"HTTP {response.status_code}: {error_details}")
+                    model_fault = _is_model_fault(status_code=response.status_code)
+            finally:
+                response.close()
+                
+        except GroqAPIError as e:
+            logger.error(f"Groq API error with model {model}: {e.status_code} - {str(e)}")
+            span.record_error(e)
+            model_fault = _is_model_fault(e)
+        except requests.exceptions.Timeout as e:
+            logger.error(f"Timeout error with model {model}")
+            span.record_error(e)
+            model_fault = True
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request exception with model {model}: {str(e)}")
+            span.record_error(e)
+            model_fault = _is_model_fault(e)
+        except Exception as e:
+            logger.error(f"Unexpected error with model {model}: {str(e)}")
+            span.record_error(e)
+        
+        if cancelled is not None and cancelled.is_set():
+            span.set_status(tracing.CANCELLED)
+            return None
+    
+    _record_outcome_failure(health, model, time.perf_counter() - start, model_fault)
+    return None
+
+def _ask_models(client, messages, lang, retry_count, use_cache, priority=INTERACTIVE):
+    """
+    Ask each healthy model in turn, retrying with backoff.
+    
+    Returns:
+        str: The first model reply, or None if every model failed
+    """
+    health = get_model_health_registry()
+    
+    for attempt in range(retry_count + 1):
+        # If we've tried all models and none worked, back off before trying again
+        if attempt > 0:
+            delay = backoff_delay(attempt - 1)
+            logger.info(f"All models failed. Retrying in {delay:.2f} seconds. Retries left: {retry_count - attempt + 1}")
+            with tracing.span("groq.backoff", attempt=attempt):
+                time.sleep(delay)
+        
+        # Try each healthy model in sequence
+        for model in GROQ_MODELS:
+            if not health.allow_request(model):
+                logger.info(f"Skipping Groq model {model}: circuit open")
+                continue
+            
+            reply = ask_model(client, model, messages, lang, use_cache, priority, attempt=attempt + 1)
+            if reply is not None:
+                return reply
+            # Continue to next model
+    
+    return None
+
+def _stream_models(client, messages, lang, retry_count, use_cache, priority=INTERACTIVE):
+    """
+    Stream from each healthy model in turn, retrying with backoff.
+    Falls back to the next model only while nothing has been yielded yet.
+    
+    Yields:
+        str: Pieces of the reply
+        
+    Returns:
+        bool: True if a model finished its reply
+    """
+    health = get_model_health_registry()
+    
+    for attempt in range(retry_count + 1):
+        if attempt > 0:
+            delay = backoff_delay(attempt - 1)
+            logger.info(f"All models failed. Retrying in {delay:.2f} seconds. Retries left: {retry_count - attempt + 1}")
+            with tracing.span("groq.backoff", attempt=attempt):
+                time.sleep(delay)
+        
+        for model in GROQ_MODELS:
+            if not health.allow_request(model):
+                logger.info(f"Skipping Groq model {model}: circuit open")
                 continue
+            
+            started = False
+            reply = ""
+            model_fault = False
+            start = time.perf_counter()
+            # Not made current: it stays open across yields, and would otherwise leak into the caller
+            span = tracing.start_span("groq.attempt", activate=False, model=model, attempt=attempt + 1, streamed=True)
+            try:
+                logger.info(f"Streaming from Groq model: {model}")
+                for token in client.stream_chat(_build_payload(model, messages, stream=True), priority=priority):
+                    if not started:
+                        span.set_attribute('first_token_ms', span.duration_ms)
+                    started = True
+                    reply += token
+                    yield token
+                if started:
+                    health.record_success(model, time.perf_counter() - start)
+                    logger.info(f"Groq stream finished with model {model}")
+                    if use_cache:
+                        _store_reply(model, messages, lang, reply)
+                    return True
+                logger.error(f"Empty stream from model {model}")
+                span.set_status(tracing.ERROR, "Empty stream")
+            except GroqAPIError as e:
+                logger.error(f"Groq API error with model {model}: {e.status_code} - {str(e)}")
+                span.record_error(e)
+                model_fault = _is_model_fault(e)
+            except requests.exceptions.Timeout as e:
+                logger.error(f"Timeout error with model {model}")
+                span.record_error(e)
+                model_fault = True
             except requests.exceptions.RequestException as e:
                 logger.error(f"Request exception with model {model}: {str(e)}")
-                continue
+                span.record_error(e)
+                model_fault = _is_model_fault(e)
+            except GeneratorExit:
+                # The caller stopped reading, which says nothing about the model
+                health.record_cancelled(model)
+                span.set_status(tracing.CANCELLED)
+                raise
             except Exception as e:
                 logger.error(f"Unexpected error with model {model}: {str(e)}")
-                continue
+                span.record_error(e)
+            finally:
+                span.end()
+            _record_outcome_failure(health, model, time.perf_counter() - start, model_fault)
+            if started:
+                # Part of the reply is already on screen, so don't mix in another model
+                logger.error(f"Groq stream from model {model} broke off mid-response")
+                return False
+    
+    return False
+
+_flights = SingleFlight(timeout=GROQ_COALESCE_TIMEOUT)
+
+def _event_loop_running():
+    """Check whether this thread is running an asyncio event loop"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+def _flight_key(messages, lang, priority):
+    """Identical requests share a key: same prompt and conversation, language, model list, sampling params and priority"""
+    return _cache_key(f"{','.join(GROQ_MODELS)}|{priority}", messages, lang)
+
+def ask_groq(text, retry_count=2, lang='en', use_cache=None, history=None, coalesce=None, priority=INTERACTIVE,
+             hedge=None):
+    """
+    Send a request to Groq API and get a response.
+    Will try multiple models if the first one fails.
+    
+    Args:
+        text (str): The user's input
+        retry_count (int): Number of retries if all models fail
+        lang (str): The language code for response
+        use_cache (bool): Serve repeated questions from the response cache (defaults to GROQ_CACHE)
+        history (Conversation): Conversation to answer in context of; the exchange is added to it
+        coalesce (bool): Share the upstream call with identical requests in flight (defaults to GROQ_COALESCE)
+        priority (str): Rate-limit queue priority, rate_limiter.INTERACTIVE or rate_limiter.BATCH
+        hedge (bool): Fire the next model too when one is slow to answer (defaults to GROQ_HEDGE); a
+            groq_hedge.HedgePolicy also sets the latency budget and parallelism. Ignored when called
+            from a thread with a running event loop
+    """
+    try:
+        if not text or not isinstance(text, str):
+            logger.error("Invalid input text for Groq")
+            return None
+            
+        # Shared client with the API key and pooled connections
+        client = get_groq_client()
+        if not client.api_key:
+            logger.error("GROQ_API_KEY not found in environment variables")
+            return NO_API_KEY_MESSAGE
+        
+        messages = _build_messages(text, lang, history)
+        if use_cache is None:
+            use_cache = GROQ_CACHE_ENABLED
+        if use_cache:
+            reply = _cached_reply(messages, lang)
+            if reply is not None:
+                if history is not None:
+                    history.add_turn(text, reply)
+                return reply
+        
+        if coalesce is None:
+            coalesce = GROQ_COALESCE_ENABLED
+        if hedge is None:
+            hedge = GROQ_HEDGE_ENABLED
+        if hedge and _event_loop_running():
+            # The races run on an event loop of their own, and one can't be started inside another
+            logger.warning("ask_groq called from a running event loop, trying the models one at a time instead")
+            hedge = False
+        if hedge:
+            # Imported here because groq_hedge builds on this module
+            from groq_hedge import ask_models_hedged
+            policy = None if hedge is True else hedge
+            ask = lambda: ask_models_hedged(client, messages, lang, retry_count, use_cache, priority, policy)
+        else:
+            ask = lambda: _ask_models(client, messages, lang, retry_count, use_cache, priority)
+        reply = _flights.do(_flight_key(messages, lang, priority), ask) if coalesce else ask()
         
-        # If we've tried all models and none worked, try one more time after a delay
-        if retry_count > 0:
-            logger.info(f"All models failed. Retrying in 2 seconds. Retries left: {retry_count}")
-            time.sleep(2)
-            return ask_groq(text, retry_count - 1, lang)
-        
-        # All models failed after retries, return language-specific message
-        logger.error("All Groq models failed after retries")
-        if lang == 'hi':
-            return "मुझे खेद है, मैं इस समय AI से जवाब नहीं ले पा रहा हूँ। कृपया बाद में पुनः प्रयास करें।"
-        return "I'm sorry, but I couldn't get a response from the AI at this time. Please try again later."
+        if reply is None:
+            # All models failed after retries, return language-specific message
+            logger.error("All Groq models failed after retries")
+            return _failure_message(lang)
+        if history is not None:
+            history.add_turn(text, reply)
+        return reply
             
     except Exception as e:
         logger.error(f"Error in Groq chat: {str(e)}")
-        if lang == 'hi':
-            return "क्षमा करें, आपके अनुरोध को संसाधित करते समय एक त्रुटि हुई।"
-        return "I'm sorry, but an error occurred while processing your request."
+        return _error_message(lang)
+
+def ask_groq_stream(text, retry_count=2, lang='en', use_cache=None, history=None, coalesce=None,
+                    priority=INTERACTIVE):
+    """
+    Stream a response from the Groq API token by token.
+    Works like ask_groq, but yields pieces of the reply as soon as Groq sends them.
+    Falls back to the next model only while nothing has been yielded yet.
+    
+    Args:
+        text (str): The user's input
+        retry_count (int): Number of retries if all models fail
+        lang (str): The language code for response
+        use_cache (bool): Serve repeated questions from the response cache (defaults to GROQ_CACHE)
+        history (Conversation): Conversation to answer in context of; the exchange is added to it
+            once the whole reply has been read (not if the caller stops reading early)
+        coalesce (bool): Share the upstream stream with identical requests in flight (defaults to GROQ_COALESCE)
+        priority (str): Rate-limit queue priority, rate_limiter.INTERACTIVE or rate_limiter.BATCH
+        
+    Yields:
+        str: Pieces of the AI's response
+        
+    Returns:
+        bool: True if the reply is complete; False if the stream broke off mid-reply or
+        only a failure message was yielded
+    """
+    try:
+        if not text or not isinstance(text, str):
+            logger.error("Invalid input text for Groq")
+            return False
+            
+        client = get_groq_client()
+        if not client.api_key:
+            logger.error("GROQ_API_KEY not found in environment variables")
+            yield NO_API_KEY_MESSAGE
+            return False
+        
+        messages = _build_messages(text, lang, history)
+        if use_cache is None:
+            use_cache = GROQ_CACHE_ENABLED
+        if use_cache:
+            reply = _cached_reply(messages, lang)
+            if reply is not None:
+                yield reply
+                if history is not None:
+                    history.add_turn(text, reply)
+                return True
+        
+        if coalesce is None:
+            coalesce = GROQ_COALESCE_ENABLED
+        stream = lambda: _stream_models(client, messages, lang, retry_count, use_cache, priority)
+        tokens = _flights.stream(_flight_key(messages, lang, priority), stream) if coalesce else stream()
+        
+        reply = ""
+        try:
+            while True:
+                try:
+                    token = next(tokens)
+                except StopIteration as stop:
+                    finished = stop.value
+                    break
+                reply += token
+                yield token
+        finally:
+            # Stops the upstream stream (or leaves the shared one) if our caller stopped reading
+            tokens.close()
+        
+        if finished:
+            if history is not None:
+                history.add_turn(text, reply)
+        elif not reply:
+            logger.error("All Groq models failed after retries")
+            yield _failure_message(lang)
+        return bool(finished)
+        
+    except Exception as e:
+        logger.error(f"Error in Groq chat stream: {str(e)}")
+        yield _error_message(lang)
+        return False
 
-def process_chat(message, lang='en'):
+def get_rate_limit_stats():
+    """
+    Get the rate-limit scheduler's counters and per-key quotas.
+    
+    Returns:
+        dict: Scheduler stats, or None if rate limiting is off
+    """
+    scheduler = get_groq_client().scheduler
+    return scheduler.stats() if scheduler is not None else None
+
+def get_coalescing_stats():
+    """
+    Get the request coalescing counters.
+    
+    Returns:
+        dict: Upstream calls issued, requests that shared another's call, and the coalesced ratio
+    """
+    return _flights.stats()
+
+def process_chat(message, lang='en', use_cache=None, use_faq=None, history=None):
     """
     Process a chat message through the Groq API.
     This is a wrapper around the ask_groq function for easier use in the frontend and main application.
@@ -135,6 +834,9 @@ def process_chat(message, lang='en'):
     Args:
         message (str): The user's message to process
         lang (str): The language code for the response
+        use_cache (bool): Serve repeated questions from the response cache (defaults to GROQ_CACHE)
+        use_faq (bool): Reuse replies to near-duplicate questions from the FAQ index (defaults to FAQ_INDEX)
+        history (Conversation): Conversation to answer in context of; the exchange is added to it
         
     Returns:
         str: The AI's response
@@ -143,13 +845,29 @@ def process_chat(message, lang='en'):
         if not message or not isinstance(message, str):
             logger.error("Invalid message for processing")
             return "I'm sorry, I couldn't process that message."
+        
+        # Reworded versions of earlier questions don't need an LLM call; follow-ups
+        # depend on the conversation, so the FAQ only answers opening questions
+        if use_faq is None:
+            use_faq = FAQ_INDEX_ENABLED
+        if history is not None and not history.empty:
+            use_faq = False
+        if use_faq:
+            reply = get_faq_index().lookup(message, lang)
+            if reply is not None:
+                if history is not None:
+                    history.add_turn(message, reply)
+                return reply
             
         # Process through Groq API
-        response = ask_groq(message, retry_count=2, lang=lang)
+        response = ask_groq(message, retry_count=2, lang=lang, use_cache=use_cache, history=history)
         
         if not response:
             logger.error("Empty response from Groq API")
             return "I'm sorry, I couldn't generate a response. Please try again."
+        
+        if use_faq and not _is_fallback_reply(response, lang):
+            get_faq_index().add(message, lang, response)
             
         return response
         
@@ -157,3 +875,67 @@ def process_chat(message, lang='en'):
         logger.error(f"Error in process_chat: {str(e)}")
         return "I apologize, but I encountered an error while processing your message."
 
+def process_chat_stream(message, lang='en', use_cache=None, use_faq=None, history=None):
+    """
+    Streaming version of process_chat.
+    
+    Args:
+        message (str): The user's message to process
+        lang (str): The language code for the response
+        use_cache (bool): Serve repeated questions from the response cache (defaults to GROQ_CACHE)
+        use_faq (bool): Reuse replies to near-duplicate questions from the FAQ index (defaults to FAQ_INDEX)
+        history (Conversation): Conversation to answer in context of; the exchange is added to it
+            once the whole reply has been read (not if the caller stops reading early)
+        
+    Yields:
+        str: Pieces of the AI's response
+        
+    Returns:
+        bool: True if the reply is complete (see ask_groq_stream)
+    """
+    try:
+        if not message or not isinstance(message, str):
+            logger.error("Invalid message for processing")
+            yield "I'm sorry, I couldn't process that message."
+            return False
+        
+        if use_faq is None:
+            use_faq = FAQ_INDEX_ENABLED
+        if history is not None and not history.empty:
+            use_faq = False
+        if use_faq:
+            reply = get_faq_index().lookup(message, lang)
+            if reply is not None:
+                yield reply
+                if history is not None:
+                    history.add_turn(message, reply)
+                return True
+        
+        response = ""
+        tokens = ask_groq_stream(message, retry_count=2, lang=lang, use_cache=use_cache, history=history)
+        try:
+            while True:
+                try:
+                    token = next(tokens)
+                except StopIteration as stop:
+                    finished = stop.value
+                    break
+                response += token
+                yield token
+        finally:
+            tokens.close()
+        
+        if not response:
+            logger.error("Empty response from Groq API")
+            yield "I'm sorry, I couldn't generate a response. Please try again."
+            return False
+        # A reply that broke off mid-stream must not be served to every similar question
+        if finished and use_faq and not _is_fallback_reply(response, lang):
+            get_faq_index().add(message, lang, response)
+        return bool(finished)
+            
+    except Exception as e:
+        logger.error(f"Error in process_chat_stream: {str(e)}")
+        yield "I apologize, but I encountered an error while processing your message."
+        return False
+
@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq_chat import GROQ_MODELS, GROQ_POOL_MAXSIZE, ask_groq, ask_model
+from model_health import get_model_health_registry, backoff_delay
+from rate_limiter import INTERACTIVE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default hedging settings (can be tuned through environment variables)
+GROQ_HEDGE_BUDGET = float(os.getenv('GROQ_HEDGE_BUDGET', '2.0'))
+GROQ_HEDGE_MAX_PARALLEL = int(os.getenv('GROQ_HEDGE_MAX_PARALLEL', '2'))
+
+# Blocking HTTP calls run here so the event loop never waits on a socket
+_executor = ThreadPoolExecutor(max_workers=GROQ_POOL_MAXSIZE, thread_name_prefix="groq-hedge")
+
+class HedgePolicy:
+    """
+    Settings for hedged requests across the Groq models.
+
+    Args:
+        budget (float): Seconds to wait for a first byte before firing the next model
+        max_parallel (int): Maximum number of models in flight at once
+        models (list): Models to try, in order of preference (defaults to GROQ_MODELS)
+        retry_count (int): Number of retries if all models fail
+        enabled (bool): If False, models are only tried one after another
+    """
+
+    def __init__(self, budget=GROQ_HEDGE_BUDGET, max_parallel=GROQ_HEDGE_MAX_PARALLEL, models=None,
+                 retry_count=2, enabled=True):
+        self.budget = budget
+        self.max_parallel = max(1, max_parallel)
+        self.models = list(models or GROQ_MODELS)
+        self.retry_count = retry_count
+        self.enabled = enabled
+
+DEFAULT_POLICY = HedgePolicy()
+
+# Counters for how hedged requests were resolved
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'hedges_fired': 0,
+    'primary_wins': 0,
+    'hedge_wins': 0,
+    'fallback_wins': 0,
+    'failures': 0,
+    'cancelled': 0,
+}
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def get_hedge_stats():
+    """
+    Get the hedging counters.
+
+    Returns:
+        dict: Counter values plus the share of requests won by a hedge
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    won = stats['primary_wins'] + stats['hedge_wins'] + stats['fallback_wins']
+    stats['hedge_win_rate'] = stats['hedge_wins'] / won if won else 0.0
+    return stats
+
+def reset_hedge_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+async def _attempt(client, model, messages, lang, use_cache, first_byte, priority=INTERACTIVE):
+    """
+    Ask a single model with groq_chat.ask_model in a worker thread, setting `first_byte` as soon as
+    its response headers arrive.
+    If cancelled while the body is being read, the response is closed, which aborts the read.
+    If cancelled before the headers arrive, the request can't be interrupted: its worker thread
+    keeps waiting (up to the client timeout) and the response is closed as soon as it comes back.
+    Either way the cancelled attempt doesn't count as a failure of the model.
+
+    Returns:
+        str: The model's reply, or None if it failed
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    responses = []
+
+    def on_response(response):
+        responses.append(response)
+        if cancelled.is_set():
+            response.close()
+        else:
+            loop.call_soon_threadsafe(first_byte.set)
+
+    # The worker thread joins the caller's trace
+    context = contextvars.copy_context()
+    attempt = _executor.submit(context.run, functools.partial(ask_model, client, model, messages, lang, use_cache,
+                                                              priority, on_response=on_response, cancelled=cancelled))
+    try:
+        return await asyncio.wrap_future(attempt)
+    except asyncio.CancelledError:
+        cancelled.set()
+        for response in responses:
+            response.close()
+        raise
+
+async def _race(client, messages, lang, policy, use_cache, priority=INTERACTIVE):
+    """
+    Run one round over the policy's models, hedging slow ones.
+
+    Returns:
+        tuple: The first good reply and the model that gave it, or (None, None) if every model failed
+    """
+    health = get_model_health_registry()
+    pending = {}
+    next_index = 0
+
+    def launch(as_hedge):
+        nonlocal next_index
+        # Skip models whose circuit is open
+        while next_index < len(policy.models) and not health.allow_request(policy.models[next_index]):
+            logger.info(f"Skipping Groq model {policy.models[next_index]}: circuit open")
+            next_index += 1
+        if next_index >= len(policy.models):
+            return False
+        model = policy.models[next_index]
+        next_index += 1
+        first_byte = asyncio.Event()
+        task = asyncio.ensure_future(_attempt(client, model, messages, lang, use_cache, first_byte, priority))
+        pending[task] = (model, first_byte, as_hedge, time.perf_counter())
+        if as_hedge:
+            logger.info(f"Hedging with Groq model: {model}")
+        return True
+
+    if not launch(False):
+        return None, None
+    try:
+        while pending:
+            can_hedge = policy.enabled and next_index < len(policy.models) and len(pending) < policy.max_parallel
+            got_first_byte = any(first_byte.is_set() for _, first_byte, _, _ in pending.values())
+            timeout = policy.budget if can_hedge and not got_first_byte else None
+
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Nobody has answered within the budget, so fire the next model too
+                if not any(first_byte.is_set() for _, first_byte, _, _ in pending.values()) and launch(True):
+                    _count('hedges_fired')
+                continue
+
+            for task in done:
+                model, _, as_hedge, started = pending.pop(task)
+                reply = task.result()
+                if reply is None:
+                    # Already logged and counted against the model by ask_model
+                    continue
+
+                logger.info(f"Hedged request won by model {model} in {time.perf_counter() - started:.2f}s")
+                if as_hedge:
+                    _count('hedge_wins')
+                elif model == policy.models[0]:
+                    _count('primary_wins')
+                else:
+                    _count('fallback_wins')
+                return reply, model
+
+            # Every attempt in flight failed, fall back to the next model right away
+            if not pending:
+                launch(False)
+        return None, None
+    finally:
+        for task, (model, _, _, _) in pending.items():
+            task.cancel()
+            health.record_cancelled(model)
+        if pending:
+            _count('cancelled', len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def _hedged_reply(client, messages, lang, policy, use_cache, priority=INTERACTIVE):
+    """
+    Race the policy's models, retrying whole rounds with backoff.
+
+    Returns:
+        str: The first good reply, or None if every model failed
+    """
+    _count('requests')
+
+    for attempt in range(policy.retry_count + 1):
+        if attempt > 0:
+            delay = backoff_delay(attempt - 1)
+            logger.info(f"All models failed. Retrying in {delay:.2f} seconds. Retries left: {policy.retry_count - attempt + 1}")
+            await asyncio.sleep(delay)
+        reply, _ = await _race(client, messages, lang, policy, use_cache, priority)
+        if reply is not None:
+            return reply
+
+    logger.error("All Groq models failed after retries")
+    _count('failures')
+    return None
+
+async def ask_groq_hedged(text, lang='en', policy=None, use_cache=None, history=None):
+    """
+    Get a response from Groq, racing the models instead of trying them strictly in order.
+    If the primary model hasn't sent a first byte within the policy's latency budget,
+    the next model is fired as well; the first good answer wins and the rest are cancelled.
+    A cancelled model that hasn't sent its headers yet keeps its worker thread busy
+    until Groq answers or the client timeout passes; see _attempt.
+    The races run on an event loop of their own, so ask_groq does the work in a worker
+    thread while this coroutine waits for it.
+
+    Args:
+        text (str): The user's input
+        lang (str): The language code for response
+        policy (HedgePolicy): Hedging settings (defaults to DEFAULT_POLICY)
+        use_cache (bool): Serve repeated questions from the response cache (defaults to GROQ_CACHE)
+        history (Conversation): Conversation to answer in context of; the exchange is added to it
+
+    Returns:
+        str: The AI's response
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(ask_groq_hedged_sync, text, lang, policy, use_cache,
+                                                              history))
+
+def ask_groq_hedged_sync(text, lang='en', policy=None, use_cache=None, history=None):
+    """
+    Blocking version of ask_groq_hedged, i.e. ask_groq with hedging on.
+    Called from a thread that runs an event loop, it tries the models one at a time instead;
+    await ask_groq_hedged there.
+    """
+    policy = policy or DEFAULT_POLICY
+    return ask_groq(text, retry_count=policy.retry_count, lang=lang, use_cache=use_cache, history=history,
+                    hedge=policy)
+
+def ask_models_hedged(client, messages, lang, retry_count, use_cache, priority=INTERACTIVE, policy=None):
+    """
+    Blocking stand-in for groq_chat._ask_models that races the models with the policy's settings.
+    This is what ask_groq uses when GROQ_HEDGE is on. It runs its own event loop, so it must be
+    called from a thread without one; ask_groq checks this.
+
+    Args:
+        policy (HedgePolicy): Hedging settings (defaults to DEFAULT_POLICY); retry_count overrides its retry count
+
+    Returns:
+        str: The first good reply, or None if every model failed
+
+    Raises:
+        RuntimeError: If called from a thread with a running event loop
+    """
+    policy = policy or DEFAULT_POLICY
+    policy = HedgePolicy(policy.budget, policy.max_parallel, policy.models, retry_count, policy.enabled)
+    return asyncio.run(_hedged_reply(client, messages, lang, policy, use_cache, priority))
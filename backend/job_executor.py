@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Worker threads shared by every session in the process
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '8'))
+# Seconds a finished job is kept around for polling
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', '600'))
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+class JobCancelled(Exception):
+    """Raised by Job.check_cancelled() once nobody wants the job's result any more"""
+
+class Job:
+    """
+    A unit of background work.
+    The job function receives the Job as its first argument and can publish
+    partial results with update(), which pollers see through snapshot().
+    A long job should call check_cancelled() between its stages, so a discarded
+    job stops instead of running to the end.
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, **progress):
+        """Publish partial results, e.g. job.update(stage='translating', partial_text='...')"""
+        with self._lock:
+            self.progress.update(progress)
+
+    def cancel(self):
+        """Ask the job to stop at its next check_cancelled()"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        """
+        Stop the job if it was cancelled.
+
+        Raises:
+            JobCancelled: If cancel() was called
+        """
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Job {self.name} ({self.id}) was cancelled")
+
+    def snapshot(self):
+        """
+        Get a consistent copy of the job's state.
+
+        Returns:
+            dict: id, name, status, progress, result and error
+        """
+        with self._lock:
+            return {
+                'id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'result': self.result,
+                'error': self.error,
+                'elapsed': (self.finished_at or time.time()) - self.submitted_at,
+            }
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+class JobExecutor:
+    """
+    Shared worker pool with a submit/poll API.
+    Lets callers (like Streamlit sessions) start slow work and check on it later
+    instead of blocking on it.
+
+    Args:
+        max_workers (int): Maximum number of jobs running at once across the process
+        retention (float): Seconds finished jobs are kept for polling
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, name=None, **kwargs):
+        """
+        Run fn(job, *args, **kwargs) on the worker pool.
+
+        Returns:
+            str: The job ID to poll
+        """
+        job = Job(name or getattr(fn, '__name__', 'job'))
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        with job._lock:
+            job.status = RUNNING
+        try:
+            # Discarded while it was still queued
+            job.check_cancelled()
+            result = fn(job, *args, **kwargs)
+            with job._lock:
+                job.result = result
+                job.status = DONE
+        except JobCancelled:
+            logger.info(f"Job {job.name} ({job.id}) stopped after it was cancelled")
+            with job._lock:
+                job.status = CANCELLED
+        except Exception as e:
+            logger.error(f"Job {job.name} ({job.id}) failed: {str(e)}")
+            with job._lock:
+                job.error = str(e)
+                job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def poll(self, job_id):
+        """
+        Get the current state of a job.
+
+        Returns:
+            dict: The job snapshot, or None if the job is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def discard(self, job_id):
+        """Forget a job once its result has been collected, cancelling it if it is still running"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None and not job.finished:
+            job.cancel()
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        for job in jobs:
+            counts[job.status] += 1
+        counts['max_workers'] = self.max_workers
+        return counts
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_job_executor():
+    """
+    Get the process-wide job executor, creating it on first use.
+
+    Returns:
+        JobExecutor: The shared executor
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = JobExecutor()
+    return _executor
@@ -1,8 +1,16 @@
 import speech_recognition as sr
 import logging
+import math
+import queue
+import threading
 import time
 import sys
 import os
+from collections import deque
+
+import numpy as np
+
+import tracing
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,10 +26,411 @@ except ImportError:
     logger.warning("On Mac: pip install pyaudio")
     logger.warning("On Linux: sudo apt-get install python3-pyaudio")
 
-def listen():
+# Listener settings (can be tuned through environment variables)
+# Seconds of ambient noise measured once, when the microphone is first opened
+LISTEN_CALIBRATION_SECONDS = float(os.getenv('LISTEN_CALIBRATION_SECONDS', '1'))
+# Seconds listen() waits for the user to start speaking
+LISTEN_TIMEOUT = float(os.getenv('LISTEN_TIMEOUT', '8'))
+# Longest phrase, in seconds; longer speech is cut into several phrases
+LISTEN_PHRASE_LIMIT = float(os.getenv('LISTEN_PHRASE_LIMIT', '15'))
+# Seconds of silence that end a phrase
+LISTEN_PAUSE_SECONDS = float(os.getenv('LISTEN_PAUSE_SECONDS', '0.8'))
+# Seconds a recognition request to Google may take before it's given up
+LISTEN_RECOGNITION_TIMEOUT = float(os.getenv('LISTEN_RECOGNITION_TIMEOUT', '10'))
+# Ignore the microphone while a reply is playing, so the assistant doesn't hear itself
+LISTEN_MUTE_WHILE_SPEAKING = os.getenv('LISTEN_MUTE_WHILE_SPEAKING', '1').lower() in ('1', 'true', 'yes')
+# Recognize phrases chunk by chunk while the user is still speaking (see speech_stream.py)
+LISTEN_STREAMING = os.getenv('LISTEN_STREAMING', '0').lower() in ('1', 'true', 'yes')
+
+# Recognition locales for our language codes (Google assumes US English unless told otherwise)
+RECOGNITION_LOCALES = {
+    'en': 'en-US',
+    'hi': 'hi-IN',
+    'fr': 'fr-FR',
+    'es': 'es-ES',
+    'de': 'de-DE',
+    'ja': 'ja-JP',
+    'ko': 'ko-KR',
+    'zh-cn': 'zh-CN',
+    'zh-tw': 'zh-TW',
+    'ar': 'ar-SA',
+    'ru': 'ru-RU',
+}
+
+def frame_energy(frame, sample_width):
+    """RMS energy of a buffer of signed little-endian PCM samples (8-bit samples are unsigned)"""
+    if sample_width == 1:
+        samples = np.frombuffer(frame, dtype=np.uint8).astype(np.float64) - 128
+    else:
+        dtype = {2: np.int16, 4: np.int32}.get(sample_width)
+        if dtype is None:
+            raise ValueError(f"Unsupported sample width: {sample_width}")
+        samples = np.frombuffer(frame[:len(frame) - len(frame) % sample_width], dtype=dtype).astype(np.float64)
+        if sample_width == 4:
+            # Scale 32-bit samples to the 16-bit range the thresholds are tuned for
+            samples /= 65536
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+class PhraseSegmenter:
+    """
+    Energy-based voice activity detection that cuts a stream of audio into phrases.
+    Audio is judged in short windows, whatever size the chunks fed to push() are.
+    A window is speech if its energy is well above the noise floor. The floor is
+    measured once by calibrate() and then follows the ambient noise: it tracks
+    windows without speech, and jumps up when every window for `steady_seconds`
+    was above the threshold, which speech, with its pauses between syllables,
+    never is (a fan switched on mid-phrase doesn't keep the phrase open).
+
+    Args:
+        sample_rate (int): Samples per second
+        sample_width (int): Bytes per sample
+        pause_seconds (float): Silence that ends a phrase
+        phrase_time_limit (float): Longest phrase; longer speech is cut
+        min_speech_seconds (float): Speech needed to start a phrase (shorter clicks are ignored)
+        pre_roll_seconds (float): Audio kept from before the speech started, so onsets aren't clipped
+        threshold_ratio (float): How far above the noise floor speech must be
+        min_energy (float): Lowest energy ever counted as speech
+        adapt_seconds (float): Time constant of the noise floor
+        steady_seconds (float): Unbroken sound after which it's taken for noise
+        window_seconds (float): Length of the analysis windows
+    """
+
+    def __init__(self, sample_rate, sample_width, pause_seconds=LISTEN_PAUSE_SECONDS,
+                 phrase_time_limit=LISTEN_PHRASE_LIMIT, min_speech_seconds=0.15, pre_roll_seconds=0.3,
+                 threshold_ratio=2.5, min_energy=100.0, adapt_seconds=2.0, steady_seconds=2.0, window_seconds=0.03):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.pause_seconds = pause_seconds
+        self.phrase_time_limit = phrase_time_limit
+        self.min_speech_seconds = min_speech_seconds
+        self.pre_roll_seconds = pre_roll_seconds
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.adapt_seconds = adapt_seconds
+        self.window_bytes = max(1, int(sample_rate * window_seconds)) * sample_width
+        self.window_seconds = self.seconds(b'\0' * self.window_bytes)
+        self.noise_floor = min_energy / threshold_ratio
+        self._recent = deque(maxlen=max(1, round(steady_seconds / self.window_seconds)))
+        self._buffer = b''
+        self.reset()
+
+    @property
+    def threshold(self):
+        return max(self.noise_floor * self.threshold_ratio, self.min_energy)
+
+    @property
+    def in_phrase(self):
+        return self._phrase is not None
+
+    def seconds(self, frame):
+        return len(frame) / (self.sample_rate * self.sample_width)
+
+    def reset(self):
+        """Drop the phrase in progress"""
+        # (window, is speech) pairs from before the phrase; speech starts once enough of the
+        # onset span is voiced, so a click is ignored but the gaps between syllables are not
+        self._onset_windows = max(1, round(2 * self.min_speech_seconds / self.window_seconds))
+        self._pre_roll = deque(maxlen=max(self._onset_windows,
+                                          round(self.pre_roll_seconds / self.window_seconds) + self._onset_windows))
+        self._phrase = None
+        self._silence_seconds = 0.0
+
+    def calibrate(self, frames):
+        """Set the noise floor from frames of ambient noise"""
+        energies = [frame_energy(frame, self.sample_width) for frame in frames if frame]
+        if energies:
+            self.noise_floor = float(np.median(energies))
+        logger.info(f"Noise floor calibrated to {self.noise_floor:.1f} (speech threshold {self.threshold:.1f})")
+
+    def _track_noise(self, energy, speech):
+        self._recent.append(energy)
+        if not speech:
+            weight = 1 - math.exp(-self.window_seconds / self.adapt_seconds)
+            self.noise_floor += (energy - self.noise_floor) * weight
+        elif len(self._recent) == self._recent.maxlen and min(self._recent) > self.threshold:
+            # Unbroken sound: a new background noise, not speech
+            self.noise_floor = min(self._recent)
+            logger.info(f"Noise floor raised to {self.noise_floor:.1f}")
+            return True
+        return False
+
+    def push(self, frame):
+        """
+        Feed the next chunk of audio.
+
+        Returns:
+            list: The audio (bytes) of each phrase that ended within this chunk
+        """
+        phrases = []
+        self._buffer += frame
+        while len(self._buffer) >= self.window_bytes:
+            window, self._buffer = self._buffer[:self.window_bytes], self._buffer[self.window_bytes:]
+            phrase = self._push_window(window)
+            if phrase:
+                phrases.append(phrase)
+        return phrases
+
+    def _push_window(self, window):
+        energy = frame_energy(window, self.sample_width)
+        speech = energy > self.threshold
+        if self._track_noise(energy, speech):
+            # What looked like speech was the new noise
+            self.reset()
+            return None
+
+        if self._phrase is None:
+            self._pre_roll.append((window, speech))
+            onset = list(self._pre_roll)[-self._onset_windows:]
+            if not speech or sum(voiced for _, voiced in onset) * self.window_seconds < self.min_speech_seconds:
+                return None
+            # Speech started; keep what led up to it
+            self._phrase = [frame for frame, _ in self._pre_roll]
+            self._pre_roll.clear()
+            self._silence_seconds = 0.0
+            return None
+
+        return self._extend(window, speech)
+
+    def _extend(self, window, speech):
+        """Add a window to the phrase in progress; returns the phrase if that ended it"""
+        self._phrase.append(window)
+        self._silence_seconds = 0.0 if speech else self._silence_seconds + self.window_seconds
+        if self._silence_seconds >= self.pause_seconds or len(self._phrase) * self.window_seconds >= self.phrase_time_limit:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """
+        End the phrase in progress, e.g. when the stream ends.
+
+        Returns:
+            bytes: Its audio, or None if no phrase was in progress
+        """
+        phrase = b''.join(self._phrase) if self._phrase else None
+        self.reset()
+        return phrase
+
+class BackgroundListener:
+    """
+    Long-lived microphone listener.
+    The microphone is opened and the ambient noise measured once; after that a
+    background thread keeps capturing, cuts the audio into phrases with a
+    PhraseSegmenter and puts each phrase on a queue as sr.AudioData. Speech is
+    therefore captured as soon as the user starts talking, with no per-turn
+    calibration or microphone start-up.
+
+    Args:
+        source (sr.AudioSource): Where to capture from (defaults to the default microphone);
+            an sr.AudioFile works too, which is handy for offline tests
+        calibration_seconds (float): Ambient noise measured once at start
+        mute_while (callable): While it returns True, captured audio is dropped (e.g. while a reply plays)
+        max_queued (int): Phrases kept waiting before the oldest is dropped
+        **segmenter_options: Passed on to PhraseSegmenter
+    """
+
+    def __init__(self, source=None, calibration_seconds=LISTEN_CALIBRATION_SECONDS, mute_while=None, max_queued=8,
+                 **segmenter_options):
+        self.source = source
+        self.calibration_seconds = calibration_seconds
+        self.mute_while = mute_while
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = LISTEN_RECOGNITION_TIMEOUT
+        self.phrases = queue.Queue(maxsize=max_queued)
+        self.segmenter = None
+        self._segmenter_options = segmenter_options
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'phrases': 0, 'dropped': 0, 'stale': 0, 'muted_seconds': 0.0}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _read(self):
+        return self.source.stream.read(self.source.CHUNK)
+
+    def start(self):
+        """Open the source, measure the ambient noise and start capturing in the background"""
+        if self.source is None:
+            self.source = sr.Microphone()
+        self.source.__enter__()
+        try:
+            self.segmenter = self._make_segmenter()
+            frames = []
+            seconds = 0.0
+            while seconds < self.calibration_seconds:
+                frame = self._read()
+                if not frame:
+                    break
+                frames.append(frame)
+                seconds += self.segmenter.seconds(frame)
+            self.segmenter.calibrate(frames)
+        except Exception:
+            self.source.__exit__(None, None, None)
+            raise
+        self._thread = threading.Thread(target=self._run, name="listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def _make_segmenter(self):
+        return PhraseSegmenter(self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH, **self._segmenter_options)
+
+    def _drop_phrase(self):
+        """Forget the phrase in progress, e.g. because playback started"""
+        self.segmenter.reset()
+
+    def _put(self, item):
+        while True:
+            try:
+                self.phrases.put_nowait(item)
+                return
+            except queue.Full:
+                # Nobody is collecting phrases; the newest speech matters most
+                try:
+                    self.phrases.get_nowait()
+                    self._stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+
+    def _emit(self, data):
+        self._put(sr.AudioData(data, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH))
+        self._stats['phrases'] += 1
+        logger.info(f"Captured a {len(data) / (self.source.SAMPLE_RATE * self.source.SAMPLE_WIDTH):.2f}s phrase")
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                frame = self._read()
+                if not frame:
+                    # End of a recorded source
+                    break
+                if self.mute_while is not None and self.mute_while():
+                    if self.segmenter.in_phrase:
+                        self._drop_phrase()
+                    self._stats['muted_seconds'] += self.segmenter.seconds(frame)
+                    continue
+                for phrase in self.segmenter.push(frame):
+                    self._emit(phrase)
+            phrase = self.segmenter.flush()
+            if phrase and not self._stop.is_set():
+                self._emit(phrase)
+        except Exception as e:
+            logger.error(f"Error capturing audio: {str(e)}")
+        finally:
+            try:
+                self.source.__exit__(None, None, None)
+            except Exception as e:
+                logger.error(f"Error closing audio source: {str(e)}")
+            # Wake up anyone waiting for a phrase that will now never come
+            self._put(None)
+
+    def next_phrase(self, timeout=None):
+        """
+        Get the next captured phrase, waiting for the user to speak if there is none yet.
+
+        Args:
+            timeout (float): Seconds to wait at most (None waits until capture stops)
+
+        Returns:
+            sr.AudioData: The phrase, or None on timeout or once capturing has stopped
+        """
+        try:
+            phrase = self.phrases.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if phrase is None:
+            # Leave the marker for later callers
+            self.phrases.put(None)
+        return phrase
+
+    def clear(self):
+        """
+        Drop phrases that are already over, e.g. ones said while the last reply played.
+        A phrase the user is still speaking is kept.
+        """
+        kept = []
+        while True:
+            try:
+                phrase = self.phrases.get_nowait()
+            except queue.Empty:
+                break
+            if phrase is None or self._in_progress(phrase):
+                kept.append(phrase)
+            else:
+                self._stats['stale'] += 1
+        for phrase in kept:
+            self._put(phrase)
+
+    def _in_progress(self, phrase):
+        """Whether a queued phrase is still being spoken; phrases are only queued once they end"""
+        return False
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def stats(self):
+        """
+        Get the listener's counters.
+
+        Returns:
+            dict: Phrases captured, dropped and cleared as stale, seconds muted, and the current noise floor and speech threshold
+        """
+        # The end-of-capture marker isn't a phrase
+        stats = dict(self._stats, queued=max(0, self.phrases.qsize() - (self._thread is not None and not self.running)))
+        if self.segmenter is not None:
+            stats['noise_floor'] = round(self.segmenter.noise_floor, 1)
+            stats['threshold'] = round(self.segmenter.threshold, 1)
+        return stats
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def get_listener():
+    """
+    Get the process-wide microphone listener, opening the microphone and calibrating on first use.
+
+    Returns:
+        BackgroundListener: The running listener
+
+    Raises:
+        Exception: If the microphone can't be opened
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.running:
+            mute_while = None
+            if LISTEN_MUTE_WHILE_SPEAKING:
+                from audio_player import get_audio_player
+                mute_while = get_audio_player().is_playing
+            logger.info("Opening the microphone and measuring ambient noise...")
+            if LISTEN_STREAMING:
+                # Imported here because speech_stream builds on this module
+                from speech_stream import StreamingListener
+                _listener = StreamingListener(mute_while=mute_while).start()
+            else:
+                _listener = BackgroundListener(mute_while=mute_while).start()
+    return _listener
+
+def stop_listener():
+    """Stop capturing and release the microphone"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def listen(on_partial=None):
     """
     Listen for voice input and convert to text.
     Falls back to text input if voice recognition fails or PyAudio is not available.
+    
+    Args:
+        on_partial (callable): With streaming recognition, called with the partial transcript
+            each time it grows while the user is still speaking
     """
     # Check if PyAudio is available
     if not PYAUDIO_AVAILABLE:
@@ -33,35 +442,10 @@ def listen():
         return None
     
     try:
-        # Initialize recognizer
-        recognizer = sr.Recognizer()
-        
-        # Set up microphone with automatic energy threshold
+        # The microphone stays open between turns and is only calibrated the first time
         try:
-            with sr.Microphone() as source:
-                logger.info("Adjusting for ambient noise...")
-                # Longer adjustment for better accuracy
-                recognizer.adjust_for_ambient_noise(source, duration=2)
-                
-                # Increase dynamic energy threshold for better detection
-                recognizer.dynamic_energy_threshold = True
-                recognizer.energy_threshold = 300  # Default is 300, increase if in noisy environment
-                
-                logger.info("Listening...")
-                print("Say something clearly! (Press Ctrl+C to stop)")
-                
-                try:
-                    # Increase timeout and phrase time for longer sentences
-                    audio = recognizer.listen(source, timeout=8, phrase_time_limit=15)
-                    logger.info("Audio captured, processing...")
-                except sr.WaitTimeoutError:
-                    logger.warning("No speech detected within timeout")
-                    print("No speech detected. Please try again or type your text:")
-                    text = input().strip()
-                    if text:
-                        logger.info(f"User typed: {text}")
-                        return text
-                    return None
+            listener = get_listener()
+            recognizer = listener.recognizer
         except Exception as e:
             logger.error(f"Error accessing microphone: {str(e)}")
             print(f"Error accessing microphone: {str(e)}")
@@ -71,6 +455,40 @@ def listen():
                 logger.info(f"User typed: {text}")
                 return text
             return None
+        
+        logger.info("Listening...")
+        print("Say something clearly! (Press Ctrl+C to stop)")
+        
+        # Phrases that ended before this turn (said while the last reply played or the user
+        # answered the prompt, or the tail of a phrase cut at LISTEN_PHRASE_LIMIT) are stale.
+        # Speech that started just before this call and is still going on is kept.
+        listener.clear()
+        audio = None
+        deadline = time.monotonic() + LISTEN_TIMEOUT
+        while audio is None:
+            phrase = listener.next_phrase(timeout=max(0.0, deadline - time.monotonic()))
+            if phrase is None or isinstance(phrase, sr.AudioData):
+                audio = phrase
+                break
+            # A streamed utterance: it's being recognized while the user speaks
+            text = _follow_utterance(phrase, on_partial)
+            if text:
+                return text
+            if phrase.cancelled:
+                # A cough that turned out to be noise, or a reply started playing; keep listening
+                logger.info("Utterance was dropped, waiting for the next one")
+                continue
+            # Nothing came of the chunks; try the whole phrase below
+            audio = phrase.audio
+        if audio is None:
+            logger.warning("No speech detected within timeout")
+            print("No speech detected. Please try again or type your text:")
+            text = input().strip()
+            if text:
+                logger.info(f"User typed: {text}")
+                return text
+            return None
+        logger.info("Audio captured, processing...")
                 
         try:
             # Try using multiple recognition services
@@ -138,3 +556,88 @@ def listen():
             logger.info(f"User typed: {text}")
             return text
         return None
+
+def _follow_utterance(utterance, on_partial=None):
+    """
+    Wait for a streamed utterance to be recognized, passing on its partial transcripts.
+    Waits no longer than the longest phrase plus one recognition request, so a hung
+    recognizer can't hold up the turn.
+    
+    Returns:
+        str: The final transcript, or None if nothing was recognized in time
+    """
+    deadline = utterance.started + LISTEN_PHRASE_LIMIT + LISTEN_RECOGNITION_TIMEOUT
+    for partial in utterance.partials(timeout=max(0.0, deadline - time.monotonic())):
+        logger.info(f"Heard so far: {partial}")
+        if on_partial:
+            try:
+                on_partial(partial)
+            except Exception as e:
+                logger.error(f"Error handling partial transcript: {str(e)}")
+    text = utterance.result(timeout=max(0.0, deadline - time.monotonic()))
+    if not utterance.done:
+        logger.warning(f"Recognition didn't finish within {LISTEN_RECOGNITION_TIMEOUT:.0f}s of the phrase limit")
+    stats = utterance.stats()
+    span = tracing.current_span()
+    if span is not None:
+        span.set_attribute('chunks', stats['chunks'])
+        if 'final_after_end_ms' in stats:
+            span.set_attribute('final_after_end_ms', stats['final_after_end_ms'])
+    if text:
+        logger.info(f"Recognized while speaking: {text} ({stats['chunks']} chunks, "
+                    f"final {stats.get('final_after_end_ms', 0):.0f}ms after the phrase ended)")
+    return text
+
+def recognition_locale(lang):
+    """
+    Get the speech recognition locale for a language code.
+
+    Args:
+        lang (str): Our language code (e.g. 'hi'); a full locale such as 'pt-BR' is passed through
+
+    Returns:
+        str: The locale (e.g. 'hi-IN'), or None if no language was given
+    """
+    if not lang:
+        return None
+    return RECOGNITION_LOCALES.get(lang.lower(), lang)
+
+def transcribe_file(path, language=None):
+    """
+    Transcribe a recorded utterance without any interaction, e.g. for batch runs.
+    
+    Args:
+        path (str): WAV, AIFF or FLAC file
+        language (str): Optional recognition language (e.g. 'hi-IN'); Google defaults to US English
+        
+    Returns:
+        str: The recognized text, or None if nothing could be recognized
+        
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    
+    recognizer = sr.Recognizer()
+    recognizer.operation_timeout = LISTEN_RECOGNITION_TIMEOUT
+    with sr.AudioFile(path) as source:
+        audio = recognizer.record(source)
+    
+    try:
+        if language:
+            return recognizer.recognize_google(audio, language=language)
+        return recognizer.recognize_google(audio)
+    except sr.UnknownValueError:
+        logger.warning(f"Google could not understand {path}")
+    except sr.RequestError as e:
+        logger.error(f"Could not request results from Google Speech Recognition: {str(e)}")
+    
+    try:
+        if language:
+            # Fails with a RequestError unless the language's Sphinx model is installed
+            return recognizer.recognize_sphinx(audio, language=language)
+        return recognizer.recognize_sphinx(audio)
+    except (sr.UnknownValueError, sr.RequestError, ImportError) as e:
+        logger.warning(f"Sphinx recognition failed for {path}: {str(e)}")
+        return None
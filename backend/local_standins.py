@@ -0,0 +1,399 @@
+"""
+Local stand-in servers for the external services the assistant calls.
+They speak the same HTTP APIs as the real services, so the pipeline can be
+exercised and measured without network access or API costs.
+
+Usage:
+    python backend/local_standins.py libretranslate --port 5000 --latency 0.05
+    python backend/local_standins.py groq --port 8765 --latency 0.2 --token-interval 0.02 --rate-limit-rate 0.05
+    python backend/local_standins.py tts --port 8766 --latency 0.1
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return None
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, status, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def send_chunk(self, data):
+        """Write one piece of a chunked body (an empty one ends it)"""
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        self.server.standin.handle_get(self)
+
+    def do_POST(self):
+        self.server.standin.handle_post(self)
+
+class StandinServer:
+    """
+    Base class for a stand-in HTTP server running on a background thread.
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to listen on (0 picks a free port)
+        latency (float): Seconds to wait before answering each request
+        error_rate (float): Share of requests answered with a 500 error
+        seed (int): Seed for the error injection
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """Add the command-line options specific to this stand-in"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _StandinHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"{type(self).__name__} listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _begin(self):
+        """Count the request, apply the latency and decide whether to inject an error"""
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        return fail
+
+    def handle_get(self, handler):
+        handler.send_json(404, {'error': 'Not found'})
+
+    def handle_post(self, handler):
+        handler.send_json(404, {'error': 'Not found'})
+
+class LibreTranslateStandin(StandinServer):
+    """
+    Stand-in for LibreTranslate's /translate endpoint.
+    "Translates" each segment by prefixing the target language, e.g. "[hi] Hello".
+    """
+
+    def handle_get(self, handler):
+        if handler.path.rstrip('/') == '/languages':
+            handler.send_json(200, [{'code': code, 'name': code} for code in ('en', 'hi', 'fr', 'es', 'de')])
+            return
+        super().handle_get(handler)
+
+    def handle_post(self, handler):
+        if handler.path.rstrip('/') != '/translate':
+            return super().handle_post(handler)
+        data = handler.read_json()
+        if self._begin():
+            return handler.send_json(500, {'error': 'Injected failure'})
+        if not data or 'q' not in data or 'target' not in data:
+            return handler.send_json(400, {'error': 'Invalid request'})
+        target = data['target']
+        if isinstance(data['q'], list):
+            translated = [f"[{target}] {segment}" for segment in data['q']]
+        else:
+            translated = f"[{target}] {data['q']}"
+        handler.send_json(200, {'translatedText': translated})
+
+class GroqStandin(StandinServer):
+    """
+    Stand-in for Groq's OpenAI-compatible chat/completions endpoint, plain and streamed (SSE).
+    The reply is a deterministic filler text that quotes the start of the last user
+    message. `latency` is the time to the first byte; streamed replies then send a
+    word every `token_interval` seconds. Set GROQ_BASE_URL to the stand-in's url.
+
+    Args:
+        token_interval (float): Seconds between streamed words
+        reply_words (int): Length of every reply in words
+        rate_limit_rate (float): Share of requests answered with a 429
+        retry_after (float): Retry-After seconds sent with every 429
+        rpm (int): Requests per minute allowed per API key (0 for no limit)
+        tpm (int): Tokens per minute allowed per API key (0 for no limit)
+        break_rate (float): Share of streamed replies that break off halfway, without [DONE]
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument("--token-interval", type=float, default=0.01, help="Seconds between streamed words")
+        parser.add_argument("--reply-words", type=int, default=40, help="Words in every reply")
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests that get a 429")
+        parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+        parser.add_argument("--rpm", type=int, default=0, help="Requests per minute per API key (0: unlimited)")
+        parser.add_argument("--tpm", type=int, default=0, help="Tokens per minute per API key (0: unlimited)")
+        parser.add_argument("--break-rate", type=float, default=0.0, help="Share of streams that break off halfway")
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, seed=None, token_interval=0.01,
+                 reply_words=40, rate_limit_rate=0.0, retry_after=1.0, rpm=0, tpm=0, break_rate=0.0):
+        super().__init__(host, port, latency, error_rate, seed)
+        self.token_interval = token_interval
+        self.reply_words = reply_words
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.tpm = tpm
+        self.break_rate = break_rate
+        self.rate_limited = 0
+        self.broken = 0
+        self._windows = {}  # API key -> deque of (time, tokens) over the last minute
+
+    def handle_get(self, handler):
+        if handler.path.rstrip('/').endswith('/models'):
+            models = ["llama3-70b-8192", "mixtral-8x7b-32768-instruct", "llama3-8b-8192"]
+            handler.send_json(200, {'object': 'list', 'data': [{'id': model, 'object': 'model'} for model in models]})
+            return
+        super().handle_get(handler)
+
+    def reply_for(self, messages):
+        """The filler reply for a conversation"""
+        user = next((message.get('content') or '' for message in reversed(messages) if message.get('role') == 'user'), '')
+        words = f"Stand-in reply to: {' '.join(user.split()[:12])}.".split()
+        sentence = 0
+        while len(words) < self.reply_words:
+            sentence += 1
+            words += f"Sentence {sentence} of the reply carries on here.".split()
+        return " ".join(words[:max(self.reply_words, 1)])
+
+    def _quota(self, api_key, tokens):
+        """
+        Count a request against its key's per-minute quota.
+
+        Returns:
+            tuple: (rate-limit headers, seconds to wait if the quota is used up, else None)
+        """
+        if not self.rpm and not self.tpm:
+            return {}, None
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(api_key, deque())
+            while window and now - window[0][0] >= 60:
+                window.popleft()
+            used_tokens = sum(cost for _, cost in window)
+            reset = 60 - (now - window[0][0]) if window else 0.0
+            if (self.rpm and len(window) >= self.rpm) or (self.tpm and used_tokens + tokens > self.tpm):
+                wait = reset
+            else:
+                window.append((now, tokens))
+                used_tokens += tokens
+                wait = None
+            headers = {}
+            if self.rpm:
+                headers.update({
+                    'x-ratelimit-limit-requests': str(self.rpm),
+                    'x-ratelimit-remaining-requests': str(max(0, self.rpm - len(window))),
+                    'x-ratelimit-reset-requests': f"{reset:.2f}s",
+                })
+            if self.tpm:
+                headers.update({
+                    'x-ratelimit-limit-tokens': str(self.tpm),
+                    'x-ratelimit-remaining-tokens': str(max(0, self.tpm - used_tokens)),
+                    'x-ratelimit-reset-tokens': f"{reset:.2f}s",
+                })
+        return headers, wait
+
+    def handle_post(self, handler):
+        if not handler.path.rstrip('/').endswith('/chat/completions'):
+            return super().handle_post(handler)
+        data = handler.read_json()
+        if not data or not isinstance(data.get('messages'), list):
+            return handler.send_json(400, {'error': {'message': 'Invalid request', 'type': 'invalid_request_error'}})
+
+        model = data.get('model', 'stand-in')
+        reply = self.reply_for(data['messages'])
+        prompt_tokens = sum(len(message.get('content') or '') for message in data['messages']) // 4
+        completion_tokens = len(reply.split())
+
+        api_key = (handler.headers.get('Authorization') or '').replace('Bearer ', '', 1)
+        headers, wait = self._quota(api_key, prompt_tokens + completion_tokens)
+        with self._lock:
+            injected = self._random.random() < self.rate_limit_rate
+        if wait is not None or injected:
+            with self._lock:
+                self.requests += 1
+                self.rate_limited += 1
+            headers['retry-after'] = f"{self.retry_after if wait is None else wait:.2f}"
+            return handler.send_json(429, {'error': {'message': f'Rate limit reached for model {model}',
+                                                     'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                                     headers=headers)
+
+        if self._begin():
+            return handler.send_json(500, {'error': {'message': 'Injected failure', 'type': 'internal_server_error'}})
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if not data.get('stream'):
+            return handler.send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens},
+            }, headers=headers)
+
+        def event(delta, finish_reason=None):
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+        with self._lock:
+            breaks = self._random.random() < self.break_rate
+            self.broken += breaks
+        try:
+            handler.start_chunked(200, 'text/event-stream', headers)
+            handler.send_chunk(event({'role': 'assistant', 'content': ''}))
+            words = reply.split(' ')
+            for i, word in enumerate(words):
+                if i and self.token_interval:
+                    time.sleep(self.token_interval)
+                if breaks and i == len(words) // 2:
+                    # Drop the connection mid-reply, as a crashed upstream would
+                    handler.close_connection = True
+                    return
+                handler.send_chunk(event({'content': word if i == 0 else ' ' + word}))
+            handler.send_chunk(event({}, 'stop'))
+            handler.send_chunk(b"data: [DONE]\n\n")
+            handler.send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, as it does when a stream is abandoned
+            handler.close_connection = True
+
+class TTSStandin(StandinServer):
+    """
+    Stand-in speech server for speak.py (set TTS_URL to its url).
+    POST /synthesize with {"text", "lang", "slow"} returns silent MP3 audio as long as
+    the text would take to say, after `latency` plus `per_char` seconds per character.
+
+    Args:
+        per_char (float): Extra seconds of latency per character of text
+        words_per_second (float): Speaking rate used for the audio length
+    """
+
+    # One MPEG-2 Layer III frame (24 kHz, 32 kbps, mono) of silence, like gTTS output
+    FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(92)
+    FRAME_SECONDS = 576 / 24000
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument("--per-char", type=float, default=0.0, help="Extra seconds per character of text")
+        parser.add_argument("--words-per-second", type=float, default=2.5, help="Speaking rate of the audio")
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, seed=None, per_char=0.0,
+                 words_per_second=2.5):
+        super().__init__(host, port, latency, error_rate, seed)
+        self.per_char = per_char
+        self.words_per_second = words_per_second
+
+    def audio_for(self, text, slow=False):
+        """Silent MP3 data lasting as long as `text` takes to say"""
+        seconds = max(len(text.split()), 1) / self.words_per_second * (1.5 if slow else 1.0)
+        return self.FRAME * math.ceil(seconds / self.FRAME_SECONDS)
+
+    def handle_post(self, handler):
+        if handler.path.rstrip('/') != '/synthesize':
+            return super().handle_post(handler)
+        data = handler.read_json()
+        if self._begin():
+            return handler.send_json(500, {'error': 'Injected failure'})
+        if not data or not isinstance(data.get('text'), str) or not data['text'].strip():
+            return handler.send_json(400, {'error': 'Invalid request'})
+        if self.per_char:
+            time.sleep(self.per_char * len(data['text']))
+        body = self.audio_for(data['text'], bool(data.get('slow')))
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'audio/mpeg')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+STANDINS = {
+    'libretranslate': LibreTranslateStandin,
+    'groq': GroqStandin,
+    'tts': TTSStandin,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in server")
+    services = parser.add_subparsers(dest="service", required=True)
+    for name, standin in sorted(STANDINS.items()):
+        service = services.add_parser(name, help=standin.__doc__.strip().splitlines()[0])
+        service.add_argument("--host", default='127.0.0.1')
+        service.add_argument("--port", type=int, default=0)
+        service.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+        service.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail with a 500")
+        service.add_argument("--seed", type=int, default=None)
+        standin.add_arguments(service)
+    args = vars(parser.parse_args())
+
+    logging.basicConfig(level=logging.INFO)
+    service = args.pop('service')
+    server = STANDINS[service](**args)
+    server.start()
+    print(f"{service} stand-in running at {server.url} (Ctrl+C to stop)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
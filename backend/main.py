@@ -1,9 +1,15 @@
-from listen import listen
+from listen import listen, stop_listener, LISTEN_MUTE_WHILE_SPEAKING
 from detect_language import detect_language
 from translate import translate_to_english
-from groq_chat import ask_groq
+from groq_chat import ask_groq, ask_groq_stream, get_groq_client, DIRECT_RESPONSE_LANGS
 from translate_back import translate_back_to_user
 from speak import speak
+from audio_player import get_audio_player
+from conversation_memory import Conversation
+from batch import run_batch, BATCH_CONCURRENCY
+import tracing
+import argparse
+import json
 import logging
 import os
 import time
@@ -15,10 +21,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Supported languages for direct Groq response (no translation needed)
-DIRECT_RESPONSE_LANGS = ['en', 'hi']
+def print_stream(tokens, prefix):
+    """Print a streamed reply as it arrives and return the full text"""
+    print(prefix, end="", flush=True)
+    reply = ""
+    for token in tokens:
+        print(token, end="", flush=True)
+        reply += token
+    print()
+    return reply
 
-def main():
+def main(conversation=None):
+    # One trace per turn, with a span for each stage
+    turn = tracing.start_span("turn", source="cli")
     try:
         # Create output directory if it doesn't exist
         if not os.path.exists("output"):
@@ -26,15 +41,30 @@ def main():
             
         # Step 1: Listen for voice
         logger.info("Listening for voice input...")
-        text = listen()
+        
+        def on_partial(partial):
+            # Runs while the user is still speaking; the final transcript is the last
+            # partial, so by the time it arrives its language is usually already cached
+            print(f"... {partial} [{detect_language(partial)}]")
+        
+        with tracing.span("listen"):
+            text = listen(on_partial=on_partial)
         if not text:
             logger.warning("No text detected or error in listening")
             speak("I didn't hear anything. Please try again.", "en")
             return
         
+        # The user started a new turn, so cut off any reply that is still playing. With
+        # LISTEN_MUTE_WHILE_SPEAKING nothing is captured during playback, so this can only
+        # happen when muting is off (e.g. with headphones, where the reply can't echo back in)
+        if not LISTEN_MUTE_WHILE_SPEAKING:
+            get_audio_player().stop()
+        
         # Step 2: Detect language
         logger.info("Detecting language...")
-        lang = detect_language(text)
+        with tracing.span("detect"):
+            lang = detect_language(text)
+        turn.set_attribute('lang', lang)
         if not lang:
             logger.error("Failed to detect language")
             speak("I couldn't detect the language. Please try again in a common language.", "en")
@@ -46,7 +76,12 @@ def main():
             'hi': 'Hindi',
             'fr': 'French',
             'es': 'Spanish',
-            'de': 'German'
+            'de': 'German',
+            'ja': 'Japanese',
+            'ko': 'Korean',
+            'zh-cn': 'Chinese',
+            'ar': 'Arabic',
+            'ru': 'Russian'
         }
         lang_name = lang_names.get(lang, lang)
         print(f"Detected language: {lang_name} ({lang})")
@@ -57,12 +92,14 @@ def main():
         if need_translation:
             # Step 3: Translate to English
             logger.info(f"Translating from {lang} to English...")
-            english_text = translate_to_english(text, lang)
+            with tracing.span("translate", lang=lang):
+                english_text = translate_to_english(text, lang)
             if not english_text:
                 logger.error("Translation to English failed")
                 # Try again with auto-detection
                 logger.info("Trying again with auto-detection...")
-                english_text = translate_to_english(text, "auto")
+                with tracing.span("translate", lang="auto"):
+                    english_text = translate_to_english(text, "auto")
                 if not english_text:
                     speak("I couldn't translate your message. Please try again.", "en")
                     return
@@ -72,11 +109,13 @@ def main():
             
             # Step 4: Get Groq response in English
             logger.info("Getting response from Groq in English...")
-            groq_reply = ask_groq(english_text, lang='en')
+            with tracing.span("chat"):
+                groq_reply = ask_groq(english_text, lang='en', history=conversation)
             
             # Step 5: Translate back to user's language
             logger.info(f"Translating response back to {lang}...")
-            final_reply = translate_back_to_user(groq_reply, lang)
+            with tracing.span("translate_back", lang=lang):
+                final_reply = translate_back_to_user(groq_reply, lang)
             if not final_reply:
                 logger.error("Translation back to user's language failed")
                 # If translation fails, use the English response
@@ -88,24 +127,30 @@ def main():
             logger.info(f"Getting direct response from Groq in {lang_name}...")
             # Print what the user said in their original language
             print(f"You said (in {lang_name}): {text}")
-            # Get response directly in the user's language
-            final_reply = ask_groq(text, lang=lang)
+            # Stream the response directly in the user's language
+            with tracing.span("chat", streamed=True):
+                final_reply = print_stream(ask_groq_stream(text, lang=lang, history=conversation),
+                                           f"Groq says (in {lang_name}): ")
         
-        # Print Groq's response
-        print(f"Groq says (in {lang_names.get(lang, lang)}): {final_reply}")
+        # Print Groq's response (direct responses were already printed while streaming)
+        if need_translation:
+            print(f"Groq says (in {lang_names.get(lang, lang)}): {final_reply}")
         
         # Step 6: Speak the final response
         logger.info(f"Speaking the response in {lang}...")
-        success = speak(final_reply, lang)
+        with tracing.span("tts", lang=lang):
+            success = speak(final_reply, lang, chunked=True)
         if not success:
             # If speaking in the detected language fails, try English
             logger.warning(f"Failed to speak in {lang}, trying English...")
             speak("I had trouble speaking in your language. Here's my response in English.", "en")
         
     except KeyboardInterrupt:
+        turn.set_status(tracing.CANCELLED)
         logger.info("Program interrupted by user")
         print("\nProgram interrupted. Exiting...")
     except Exception as e:
+        turn.record_error(e)
         logger.error(f"An error occurred: {str(e)}")
         print(f"An error occurred: {str(e)}")
         # Try to speak the error message
@@ -114,23 +159,56 @@ def main():
         except:
             pass
     finally:
+        turn.end()
         logger.info("Program execution completed")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multilingual voice assistant")
+    parser.add_argument("--batch", metavar="FILE", help="Process a JSONL or CSV file of utterances instead of listening")
+    parser.add_argument("--output", default=os.path.join("output", "batch_results.jsonl"),
+                        help="JSONL file for batch results")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Utterances processed at once")
+    parser.add_argument("--unordered", action="store_true", help="Write results as they finish instead of in input order")
+    parser.add_argument("--tts", action="store_true", help="Also synthesize speech for each reply")
+    parser.add_argument("--resume", action="store_true", help="Skip records that already have a successful result in the output file and retry the rest")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    
+    # Serve per-stage metrics for Prometheus if TRACE_METRICS_PORT is set
+    tracing.start_metrics_server()
+    
+    if args.batch:
+        logger.info(f"Running batch from {args.batch}...")
+        get_groq_client().warmup(connections=min(args.concurrency, 4))
+        summary = run_batch(args.batch, args.output, concurrency=args.concurrency, ordered=not args.unordered,
+                            tts=args.tts, resume=args.resume)
+        print(json.dumps(summary, indent=2))
+        raise SystemExit(0)
+    
     logger.info("Starting the application...")
     
+    # Open the Groq connection while the user is still speaking
+    get_groq_client().warmup(background=True)
+    
+    # Earlier questions and answers, so follow-up questions make sense
+    conversation = Conversation()
+    
     # Set up retry logic for the main loop
     max_retries = 3
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            main()
+            main(conversation)
             # Ask if the user wants to continue
             print("\nDo you want to ask another question? (yes/no)")
             choice = input().strip().lower()
             if choice != "yes" and choice != "y":
                 print("Thank you for using the application. Goodbye!")
+                # Let the last reply finish playing before exiting
+                get_audio_player().wait(timeout=30)
                 break
         except Exception as e:
             logger.error(f"Main loop error: {str(e)}")
@@ -142,3 +220,6 @@ if __name__ == "__main__":
                 logger.error("Too many errors. Exiting.")
                 print("Too many errors occurred. Please restart the application.")
                 break
+    
+    # Release the microphone, which stays open between turns
+    stop_listener()
@@ -0,0 +1,247 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Default breaker settings (can be tuned through environment variables)
+HEALTH_WINDOW_SIZE = int(os.getenv('GROQ_HEALTH_WINDOW_SIZE', '50'))
+HEALTH_WINDOW_SECONDS = float(os.getenv('GROQ_HEALTH_WINDOW_SECONDS', '300'))
+HEALTH_ERROR_THRESHOLD = float(os.getenv('GROQ_HEALTH_ERROR_THRESHOLD', '0.5'))
+HEALTH_MIN_REQUESTS = int(os.getenv('GROQ_HEALTH_MIN_REQUESTS', '5'))
+HEALTH_CONSECUTIVE_FAILURES = int(os.getenv('GROQ_HEALTH_CONSECUTIVE_FAILURES', '3'))
+HEALTH_COOLDOWN = float(os.getenv('GROQ_HEALTH_COOLDOWN', '30'))
+HEALTH_MAX_COOLDOWN = float(os.getenv('GROQ_HEALTH_MAX_COOLDOWN', '600'))
+
+class ModelHealth:
+    """Rolling outcomes and circuit breaker state for one model"""
+
+    def __init__(self, window_size):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window_size)
+        self.consecutive_failures = 0
+        self.cooldown = 0.0
+        self.opened_at = None
+        self.probe_started = None
+        self.total_requests = 0
+        self.total_failures = 0
+
+class ModelHealthRegistry:
+    """
+    Process-wide health registry for the Groq models.
+    Tracks a rolling error rate and latency per model and trips a circuit breaker,
+    so models that keep failing are skipped without a network round trip.
+
+    Args:
+        window_size (int): Maximum number of recent outcomes kept per model
+        window_seconds (float): Outcomes older than this are ignored
+        error_threshold (float): Error rate that opens the breaker
+        min_requests (int): Outcomes needed in the window before the error rate counts
+        consecutive_failures (int): Failures in a row that open the breaker
+        cooldown (float): Seconds an open breaker waits before letting a probe through
+        max_cooldown (float): Upper limit for the cooldown, which doubles on every failed probe
+    """
+
+    def __init__(self, window_size=HEALTH_WINDOW_SIZE, window_seconds=HEALTH_WINDOW_SECONDS,
+                 error_threshold=HEALTH_ERROR_THRESHOLD, min_requests=HEALTH_MIN_REQUESTS,
+                 consecutive_failures=HEALTH_CONSECUTIVE_FAILURES, cooldown=HEALTH_COOLDOWN,
+                 max_cooldown=HEALTH_MAX_COOLDOWN):
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.consecutive_failures = consecutive_failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model):
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = ModelHealth(self.window_size)
+        return health
+
+    def _recent(self, health, now):
+        return [outcome for outcome in health.outcomes if now - outcome[0] <= self.window_seconds]
+
+    def _open(self, model, health, now):
+        health.cooldown = min(self.max_cooldown, health.cooldown * 2 if health.cooldown else self.base_cooldown)
+        health.state = OPEN
+        health.opened_at = now
+        health.probe_started = None
+        logger.warning(f"Circuit opened for model {model} for {health.cooldown:.0f}s")
+
+    def allow_request(self, model):
+        """
+        Check whether a request may be sent to a model.
+        An open breaker lets a single probe request through once its cooldown has passed.
+
+        Args:
+            model (str): The model name
+
+        Returns:
+            bool: True if the request should be sent
+        """
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(model)
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN:
+                if now - health.opened_at < health.cooldown:
+                    return False
+                health.state = HALF_OPEN
+                logger.info(f"Circuit half-open for model {model}, sending a probe request")
+            # Half-open: only one probe at a time (a stuck probe is given up after the cooldown)
+            if health.probe_started is not None and now - health.probe_started < max(health.cooldown, self.base_cooldown):
+                return False
+            health.probe_started = now
+            return True
+
+    def is_available(self, model):
+        """Check whether a model would currently accept requests, without claiming a probe"""
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(model)
+            if health.state == OPEN:
+                return now - health.opened_at >= health.cooldown
+            if health.state == HALF_OPEN:
+                return health.probe_started is None
+            return True
+
+    def record_success(self, model, latency):
+        """
+        Record a successful request.
+
+        Args:
+            model (str): The model name
+            latency (float): Request duration in seconds
+        """
+        with self._lock:
+            health = self._get(model)
+            health.outcomes.append((time.monotonic(), True, latency))
+            health.total_requests += 1
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                logger.info(f"Circuit closed for model {model}")
+            health.state = CLOSED
+            health.cooldown = 0.0
+            health.opened_at = None
+            health.probe_started = None
+
+    def record_failure(self, model, latency=None):
+        """
+        Record a failed request, opening the breaker if the model looks unhealthy.
+
+        Args:
+            model (str): The model name
+            latency (float): Request duration in seconds, if known
+        """
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(model)
+            health.outcomes.append((now, False, latency))
+            health.total_requests += 1
+            health.total_failures += 1
+            health.consecutive_failures += 1
+
+            if health.state == HALF_OPEN:
+                # The probe failed, so back off for longer
+                self._open(model, health, now)
+                return
+            if health.state == OPEN:
+                return
+
+            recent = self._recent(health, now)
+            errors = sum(1 for _, ok, _ in recent if not ok)
+            error_rate = errors / len(recent) if recent else 0.0
+            if (health.consecutive_failures >= self.consecutive_failures
+                    or (len(recent) >= self.min_requests and error_rate >= self.error_threshold)):
+                self._open(model, health, now)
+
+    def record_client_error(self, model):
+        """
+        Record a request that failed for reasons outside the model, such as a 4xx or a rate limit.
+        It isn't counted as a failure, but frees the probe slot so the next request can probe again.
+
+        Args:
+            model (str): The model name
+        """
+        with self._lock:
+            health = self._get(model)
+            health.probe_started = None
+
+    def record_cancelled(self, model):
+        """Forget an in-flight probe that was cancelled before it finished"""
+        with self._lock:
+            health = self._get(model)
+            health.probe_started = None
+
+    def snapshot(self):
+        """
+        Get the current health of every known model, e.g. for a dashboard.
+
+        Returns:
+            dict: Per-model state, error rate, latency and request counts
+        """
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for model, health in self._models.items():
+                recent = self._recent(health, now)
+                latencies = sorted(latency for _, ok, latency in recent if ok and latency is not None)
+                errors = sum(1 for _, ok, _ in recent if not ok)
+                retry_in = None
+                if health.state == OPEN:
+                    retry_in = round(max(0.0, health.cooldown - (now - health.opened_at)), 2)
+                result[model] = {
+                    'state': health.state,
+                    'error_rate': round(errors / len(recent), 4) if recent else 0.0,
+                    'requests_in_window': len(recent),
+                    'avg_latency_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+                    'p95_latency_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2) if latencies else None,
+                    'consecutive_failures': health.consecutive_failures,
+                    'retry_in_seconds': retry_in,
+                    'total_requests': health.total_requests,
+                    'total_failures': health.total_failures,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._models.clear()
+
+_registry = ModelHealthRegistry()
+
+def get_model_health_registry():
+    """
+    Get the process-wide model health registry.
+
+    Returns:
+        ModelHealthRegistry: The shared registry
+    """
+    return _registry
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Zero-based retry number
+        base (float): Delay ceiling for the first retry in seconds
+        cap (float): Maximum delay in seconds
+
+    Returns:
+        float: Seconds to wait before the retry
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,350 @@
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Known quotas per API key and model, used until Groq's response headers report the real ones
+# (0: unthrottled until the headers or a 429's Retry-After say otherwise)
+GROQ_RATE_LIMIT_RPM = float(os.getenv('GROQ_RATE_LIMIT_RPM', '0'))
+GROQ_RATE_LIMIT_TPM = float(os.getenv('GROQ_RATE_LIMIT_TPM', '0'))
+# Longest a request waits in the queue for capacity before giving up
+GROQ_RATE_LIMIT_MAX_WAIT = float(os.getenv('GROQ_RATE_LIMIT_MAX_WAIT', '15'))
+
+# Request priorities, most urgent first
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITY_ORDER = {INTERACTIVE: 0, BATCH: 1}
+
+# Tokens we expect a reply to use, on top of the prompt, before the headers correct the bucket
+COMPLETION_TOKEN_ESTIMATE = 256
+
+# Groq reset durations look like "7.66s", "2m59.56s" or "120ms"
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+class RateLimitTimeout(Exception):
+    """Raised when no API key has capacity for a request within the wait limit"""
+
+def parse_duration(value):
+    """
+    Parse a rate-limit reset duration like "2m59.56s" into seconds.
+
+    Returns:
+        float: Seconds, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header, given either in seconds or as an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def estimate_tokens(payload):
+    """Rough token cost of a chat request: the prompt at ~4 characters a token plus an expected reply"""
+    characters = sum(len(message.get('content') or '') for message in payload.get('messages', []))
+    return characters // 4 + min(payload.get('max_tokens') or COMPLETION_TOKEN_ESTIMATE, COMPLETION_TOKEN_ESTIMATE)
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens a second, up to `capacity`.
+
+    Args:
+        capacity (float): Maximum number of tokens
+        rate (float): Tokens added per second
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost, now):
+        """Seconds until `cost` tokens are available (a cost above capacity only needs a full bucket)"""
+        self._refill(now)
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (needed - self.tokens) / self.rate
+
+    def take(self, cost, now):
+        self._refill(now)
+        self.tokens -= cost
+
+    def sync(self, limit, remaining, reset, now):
+        """Replace our estimate with the limit and remaining count reported by the server"""
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+            # Without a reset time, assume the limit refills over a minute
+            self.rate = (limit - remaining) / reset if reset and remaining < limit else limit / 60.0
+        self.tokens = min(self.capacity, remaining)
+
+class _ModelQuota:
+    """Request and token buckets for one API key and model (None while the quota is unknown)"""
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm, rpm / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self.blocked_until = 0.0
+        self.in_flight_tokens = 0
+
+    def wait_time(self, cost, now):
+        waits = [self.blocked_until - now, 0.0]
+        if self.requests is not None:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            waits.append(self.tokens.wait_time(cost, now))
+        return max(waits)
+
+    def take(self, cost, now):
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(cost, now)
+        self.in_flight_tokens += cost
+
+class _KeyState:
+    def __init__(self, index, api_key, rpm, tpm):
+        self.api_key = api_key
+        # Never show whole keys in logs and stats
+        self.label = f"key{index + 1}...{api_key[-4:]}" if len(api_key) > 8 else f"key{index + 1}"
+        self.rpm = rpm
+        self.tpm = tpm
+        self.models = {}
+        self.stats = {'requests': 0, 'rate_limited': 0}
+
+    def quota(self, model):
+        if model not in self.models:
+            self.models[model] = _ModelQuota(self.rpm, self.tpm)
+        return self.models[model]
+
+class Lease:
+    """Permission to send one request with `api_key`; hand it back with record() or release()"""
+
+    def __init__(self, api_key, model, cost, waited):
+        self.api_key = api_key
+        self.model = model
+        self.cost = cost
+        self.waited = waited
+        self.settled = False
+
+class RateLimitScheduler:
+    """
+    Rate-limit-aware scheduler for Groq requests.
+    Every API key gets a request bucket and a token bucket per model. Without
+    configured quotas a key starts unthrottled; its token bucket is created from
+    the x-ratelimit-* headers of the first response that has them and corrected
+    by every later one. A 429 blocks that key and model for exactly the
+    Retry-After time. Waiting requests are served by priority (interactive before
+    batch), then in arrival order, and round-robin across the keys.
+
+    Args:
+        api_keys (list): Groq API keys to spread requests over
+        rpm (float): Requests per minute allowed per key and model (0: no limit until headers or a 429)
+        tpm (float): Tokens per minute allowed per key and model until headers say otherwise (0: unknown)
+        max_wait (float): Seconds a request may wait for capacity
+    """
+
+    def __init__(self, api_keys, rpm=GROQ_RATE_LIMIT_RPM, tpm=GROQ_RATE_LIMIT_TPM, max_wait=GROQ_RATE_LIMIT_MAX_WAIT):
+        if not api_keys:
+            raise ValueError("RateLimitScheduler needs at least one API key")
+        self.max_wait = max_wait
+        self._keys = [_KeyState(index, api_key, rpm, tpm) for index, api_key in enumerate(api_keys)]
+        self._by_key = {state.api_key: state for state in self._keys}
+        self._next = 0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {'acquired': 0, 'queued': 0, 'timeouts': 0, 'rate_limited': 0, 'wait_seconds': 0.0}
+
+    def _pick(self, model, cost, now):
+        """Find the next key, round-robin, with capacity for the request. Returns (state, wait)"""
+        shortest = float('inf')
+        for offset in range(len(self._keys)):
+            index = (self._next + offset) % len(self._keys)
+            state = self._keys[index]
+            wait = state.quota(model).wait_time(cost, now)
+            if wait <= 0:
+                self._next = index + 1
+                return state, 0.0
+            shortest = min(shortest, wait)
+        return None, shortest
+
+    def _is_next(self, entry):
+        """A waiter may go once nobody ahead of it in the queue wants the same model"""
+        return not any(other < entry and other[2] == entry[2] for other in self._queue)
+
+    def acquire(self, model, cost, priority=INTERACTIVE, timeout=None):
+        """
+        Wait until some API key has capacity for a request, and reserve it.
+
+        Args:
+            model (str): The model the request is for
+            cost (int): Estimated tokens the request will use
+            priority (str): INTERACTIVE or BATCH
+            timeout (float): Seconds to wait at most (defaults to max_wait)
+
+        Returns:
+            Lease: The key to use
+
+        Raises:
+            RateLimitTimeout: If no key had capacity in time
+        """
+        start = time.monotonic()
+        deadline = start + (self.max_wait if timeout is None else timeout)
+        entry = (PRIORITY_ORDER.get(priority, len(PRIORITY_ORDER)), next(self._sequence), model)
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._is_next(entry):
+                        state, wait = self._pick(model, cost, now)
+                        if state is not None:
+                            state.quota(model).take(cost, now)
+                            state.stats['requests'] += 1
+                            waited = now - start
+                            self._stats['acquired'] += 1
+                            self._stats['wait_seconds'] += waited
+                            if waited > 0.001:
+                                self._stats['queued'] += 1
+                            return Lease(state.api_key, model, cost, waited)
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining and wait != float('inf')):
+                        self._stats['timeouts'] += 1
+                        raise RateLimitTimeout(f"No Groq API key has capacity for {model} within {self.max_wait:.0f}s")
+                    self._condition.wait(min(wait, remaining) if wait else remaining)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+
+    def record(self, lease, response):
+        """
+        Update the buckets from a response's rate-limit headers and hand the lease back.
+
+        Returns:
+            float: Seconds the key is blocked for if the response was a 429, otherwise None
+        """
+        headers = response.headers
+        now = time.monotonic()
+        blocked = None
+        with self._condition:
+            lease.settled = True
+            state = self._by_key[lease.api_key]
+            quota = state.quota(lease.model)
+            quota.in_flight_tokens = max(0, quota.in_flight_tokens - lease.cost)
+
+            limit_tokens = _header_number(headers, 'x-ratelimit-limit-tokens')
+            remaining_tokens = _header_number(headers, 'x-ratelimit-remaining-tokens')
+            if remaining_tokens is not None:
+                if quota.tokens is None:
+                    capacity = limit_tokens or remaining_tokens
+                    quota.tokens = TokenBucket(capacity, capacity / 60.0)
+                # The server hasn't seen the requests still in flight on this key yet
+                quota.tokens.sync(limit_tokens, remaining_tokens - quota.in_flight_tokens,
+                                  parse_duration(headers.get('x-ratelimit-reset-tokens')), now)
+
+            remaining_requests = _header_number(headers, 'x-ratelimit-remaining-requests')
+            if remaining_requests is not None and remaining_requests <= 0:
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                if reset:
+                    quota.blocked_until = max(quota.blocked_until, now + reset)
+
+            if response.status_code == 429:
+                blocked = parse_retry_after(headers.get('retry-after'))
+                if blocked is None:
+                    blocked = parse_duration(headers.get('x-ratelimit-reset-tokens')) or 1.0
+                quota.blocked_until = max(quota.blocked_until, now + blocked)
+                state.stats['rate_limited'] += 1
+                self._stats['rate_limited'] += 1
+                logger.warning(f"Groq rate limit hit on key {state.label} for {lease.model}, "
+                               f"blocked for {blocked:.2f}s")
+            self._condition.notify_all()
+        return blocked
+
+    def release(self, lease):
+        """Hand back a lease whose request failed before a response arrived"""
+        with self._condition:
+            if lease.settled:
+                return
+            lease.settled = True
+            quota = self._by_key[lease.api_key].quota(lease.model)
+            quota.in_flight_tokens = max(0, quota.in_flight_tokens - lease.cost)
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Get scheduler counters and the state of every key.
+
+        Returns:
+            dict: Totals, queue length, and per key and model the remaining requests and tokens
+        """
+        now = time.monotonic()
+        with self._condition:
+            stats = dict(self._stats)
+            stats['waiting'] = len(self._queue)
+            stats['average_wait_seconds'] = stats['wait_seconds'] / stats['acquired'] if stats['acquired'] else 0.0
+            keys = {}
+            for state in self._keys:
+                models = {}
+                for model, quota in state.models.items():
+                    for bucket in (quota.requests, quota.tokens):
+                        if bucket is not None:
+                            bucket._refill(now)
+                    # None while the quota is still unknown
+                    models[model] = {
+                        'requests_available': round(quota.requests.tokens, 2) if quota.requests else None,
+                        'tokens_available': round(quota.tokens.tokens, 1) if quota.tokens else None,
+                        'tokens_per_minute': round(quota.tokens.capacity) if quota.tokens else None,
+                        'blocked_for': round(max(0.0, quota.blocked_until - now), 2),
+                    }
+                keys[state.label] = dict(state.stats, models=models)
+            stats['keys'] = keys
+        return stats
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
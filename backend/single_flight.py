@@ -0,0 +1,209 @@
+import contextvars
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-flight upstream call and everything its callers need to share it"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.done = False
+        self.result = None
+        self.error = None
+        # Streaming flights
+        self.tokens = []
+        self.subscribers = 0
+        self.abandoned = False
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls.
+    The first caller for a key makes the upstream call; callers arriving with the
+    same key while it's in flight wait for it and get the same result, instead of
+    issuing a call of their own. Nothing is cached once the call finishes.
+
+    Args:
+        timeout (float): Seconds a follower waits for the shared call before making its own
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {'issued': 0, 'coalesced': 0, 'timeouts': 0, 'streams_abandoned': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _join(self, key, subscribe=False):
+        """Get the flight for a key, creating it if there is none. Returns (flight, is_leader)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._stats['issued'] += 1
+            else:
+                self._stats['coalesced'] += 1
+            if subscribe:
+                flight.subscribers += 1
+            return flight, leader
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.condition:
+            flight.done = True
+            flight.condition.notify_all()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Call fn(), or wait for the identical call already in flight.
+
+        Args:
+            key (str): Identifies identical calls
+            fn (callable): Makes the upstream call
+            timeout (float): Overrides the instance's wait timeout
+
+        Returns:
+            What fn() returned (exceptions are re-raised to every caller)
+        """
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                self._land(key, flight)
+            return flight.result
+
+        with flight.condition:
+            finished = flight.condition.wait_for(lambda: flight.done, self.timeout if timeout is None else timeout)
+        if not finished:
+            logger.warning("Timed out waiting for a coalesced request, issuing a new one")
+            self._count('timeouts')
+            self._count('issued')
+            return fn()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, key, fn, timeout=None):
+        """
+        Iterate over fn()'s items, or over those of the identical stream already in flight.
+        The upstream generator runs on its own thread and every caller, the first one
+        included, reads from a shared buffer, so a follower that joins late still
+        gets the whole stream. The upstream generator is closed once every caller
+        has stopped reading.
+
+        Args:
+            key (str): Identifies identical calls
+            fn (callable): Returns the upstream generator
+            timeout (float): Seconds a follower waits for the first item before making its own call
+
+        Yields:
+            The upstream generator's items
+
+        Returns:
+            The upstream generator's return value
+        """
+        flight, leader = self._join(key, subscribe=True)
+        if leader:
+            # The pump runs in the leader's context, so spans it opens belong to the leader's trace
+            threading.Thread(target=contextvars.copy_context().run, args=(self._pump, key, flight, fn), daemon=True,
+                             name="single-flight").start()
+        wait = None if leader else (self.timeout if timeout is None else timeout)
+
+        subscribed = True
+        position = 0
+        try:
+            while True:
+                with flight.condition:
+                    ready = flight.condition.wait_for(lambda: flight.done or len(flight.tokens) > position, wait)
+                    tokens = flight.tokens[position:]
+                    done = flight.done
+                if not ready:
+                    # The shared stream hasn't produced anything yet, so don't wait on it any longer
+                    logger.warning("Timed out waiting for a coalesced stream, issuing a new one")
+                    self._count('timeouts')
+                    self._count('issued')
+                    self._leave(key, flight)
+                    subscribed = False
+                    result = yield from fn()
+                    return result
+                wait = None
+                for token in tokens:
+                    yield token
+                position += len(tokens)
+                if done and position == len(flight.tokens):
+                    if flight.error is not None:
+                        raise flight.error
+                    return flight.result
+        finally:
+            if subscribed:
+                self._leave(key, flight)
+
+    def _leave(self, key, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is reading any more; later callers start a fresh flight
+                flight.abandoned = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _pump(self, key, flight, fn):
+        """Read the upstream generator into the flight's buffer"""
+        generator = None
+        try:
+            generator = fn()
+            while True:
+                if flight.abandoned:
+                    # Closing the generator cancels the upstream call
+                    self._count('streams_abandoned')
+                    generator.close()
+                    break
+                try:
+                    token = next(generator)
+                except StopIteration as stop:
+                    flight.result = stop.value
+                    break
+                with flight.condition:
+                    flight.tokens.append(token)
+                    flight.condition.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._land(key, flight)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self):
+        """
+        Get the coalescing counters.
+
+        Returns:
+            dict: Upstream calls issued, callers that shared a call, follower timeouts,
+                and the share of calls that were coalesced
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights)
+        calls = stats['issued'] + stats['coalesced'] - stats['timeouts']
+        stats['coalesced_ratio'] = round((stats['coalesced'] - stats['timeouts']) / calls, 4) if calls else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
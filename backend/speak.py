@@ -1,75 +1,181 @@
 from gtts import gTTS
 import os
+import requests
 import logging
-import platform
-import uuid
-import time
+from concurrent.futures import ThreadPoolExecutor
+from tts_cache import get_audio_cache
+from text_segments import split_sentences
+from audio_player import get_audio_player
+from audio_registry import AudioArtifact
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def speak(text, language='en'):
+# Speech server to use instead of gTTS (e.g. a local stand-in); unset uses gTTS
+TTS_URL = os.getenv('TTS_URL')
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', '30'))
+
+# Name of the TTS engine, part of the audio cache key
+TTS_ENGINE = 'http' if TTS_URL else 'gtts'
+
+# Keep-alive connections to the speech server
+_http_session = requests.Session()
+
+# Threads used to synthesize the sentences of a chunked reply in parallel
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '4'))
+_synth_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+def synthesize(text, language='en', slow=False):
     """
-    Convert text to speech using Google Text-to-Speech API
+    Get speech audio for text, reusing cached audio for text that was spoken before
     
     Args:
         text (str): The text to convert to speech
         language (str): Language code (e.g., 'en' for English, 'es' for Spanish)
+        slow (bool): Speak slowly
         
     Returns:
-        str: Path to the saved audio file
+        str: Path to the audio file
     """
+    cache = get_audio_cache()
+    key = cache.key(text, language, slow, TTS_ENGINE)
+    filepath = cache.get(key)
+    if filepath:
+        logger.info(f"Speech served from cache: {filepath}")
+        return filepath
+    
+    # Save to a temporary file, then move it into the cache
+    temp_path = cache.temp_path()
     try:
-        logger.info(f"Converting text to speech: '{text}' in language '{language}'")
+        _save_speech(text, language, slow, temp_path)
+        filepath = cache.put(key, temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    logger.info(f"Speech saved to {filepath}")
+    return filepath
+
+def _save_speech(text, language, slow, path):
+    """Synthesize text into an MP3 file with gTTS, or with the speech server at TTS_URL"""
+    if not TTS_URL:
+        gTTS(text=text, lang=language, slow=slow).save(path)
+        return
+    
+    response = _http_session.post(f"{TTS_URL.rstrip('/')}/synthesize",
+                                  json={'text': text, 'lang': language, 'slow': slow}, timeout=TTS_TIMEOUT)
+    response.raise_for_status()
+    with open(path, 'wb') as f:
+        f.write(response.content)
+
+def synthesize_chunked(text, language='en', slow=False, on_chunk=None):
+    """
+    Synthesize text sentence by sentence on a thread pool.
+    Each chunk is handed to `on_chunk` in order as soon as it (and every chunk before it)
+    is ready, so playback can start after the first sentence instead of the whole text.
+    
+    Args:
+        text (str): The text to convert to speech
+        language (str): Language code (e.g., 'en' for English, 'es' for Spanish)
+        slow (bool): Speak slowly
+        on_chunk (callable): Called with the path of each chunk, in order
         
-        # Create a unique filename for the audio
-        filename = f"speech_{uuid.uuid4()}.mp3"
-        filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio', filename)
+    Returns:
+        str: Path to a single audio file with all the chunks concatenated
+    """
+    cache = get_audio_cache()
+    key = cache.key(text, language, slow, TTS_ENGINE)
+    filepath = cache.get(key)
+    if filepath:
+        logger.info(f"Speech served from cache: {filepath}")
+        if on_chunk:
+            on_chunk(filepath)
+        return filepath
+    
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        filepath = synthesize(text, language, slow)
+        if on_chunk:
+            on_chunk(filepath)
+        return filepath
+    
+    logger.info(f"Synthesizing {len(sentences)} chunks in parallel")
+    futures = [_synth_executor.submit(synthesize, sentence, language, slow) for sentence in sentences]
+    
+    # MP3 frames can simply be concatenated, which is also how gTTS joins its own parts
+    temp_path = cache.temp_path()
+    try:
+        with open(temp_path, 'wb') as combined:
+            for future in futures:
+                chunk_path = future.result()
+                if on_chunk:
+                    on_chunk(chunk_path)
+                with open(chunk_path, 'rb') as chunk:
+                    combined.write(chunk.read())
+        filepath = cache.put(key, temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    logger.info(f"Speech saved to {filepath}")
+    return filepath
+
+def speak(text, language='en', slow=False, chunked=False):
+    """
+    Convert text to speech and play it.
+    Speech comes from gTTS, or from the speech server at TTS_URL when that is set,
+    and is served from the audio cache when the same text was spoken before.
+    
+    Args:
+        text (str): The text to convert to speech
+        language (str): Language code (e.g., 'en' for English, 'es' for Spanish)
+        slow (bool): Speak slowly
+        chunked (bool): Synthesize sentence by sentence in parallel and play each sentence as soon
+            as it is ready, instead of waiting for the whole text
         
-        # Ensure audio directory exists
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    Returns:
+        AudioArtifact: Handle to the audio of the whole text (path, bytes, duration, format); with
+        `chunked` the sentences are joined into one file. None if the speech couldn't be made
+    """
+    try:
+        logger.info(f"Converting text to speech: '{text}' in language '{language}'")
         
-        # Create gTTS object
-        tts = gTTS(text=text, lang=language, slow=False)
+        if chunked:
+            # Chunks are played as they become ready
+            return AudioArtifact(synthesize_chunked(text, language, slow, on_chunk=play_audio))
         
-        # Save the audio file
-        tts.save(filepath)
-        logger.info(f"Speech saved to {filepath}")
+        filepath = synthesize(text, language, slow)
         
         # Play the audio file based on the operating system
         play_audio(filepath)
         
-        return filepath
+        return AudioArtifact(filepath)
     
     except Exception as e:
         logger.error(f"Error in text-to-speech conversion: {str(e)}")
         return None
 
-def play_audio(filepath):
+def play_audio(filepath, block=False, on_complete=None):
     """
-    Play the audio file using the appropriate command for the OS
+    Queue the audio file on the background player
     
     Args:
         filepath (str): Path to the audio file
+        block (bool): Wait until the clip has finished playing
+        on_complete (callable): Called with the PlaybackItem once the clip has finished
+        
+    Returns:
+        PlaybackItem: Handle to wait on the clip, or None if it couldn't be queued
     """
     try:
-        system = platform.system()
-        
-        if system == 'Windows':
-            os.startfile(filepath)
-        elif system == 'Darwin':  # macOS
-            os.system(f"afplay {filepath}")
-        else:  # Linux and others
-            os.system(f"mpg123 {filepath}")
-            
-        # Give some time for the audio to play
-        time.sleep(0.5)
-        
-        logger.info(f"Playing audio: {filepath}")
+        item = get_audio_player().play(filepath, on_complete=on_complete)
+        if block:
+            item.wait()
+        return item
     except Exception as e:
         logger.error(f"Error playing audio: {str(e)}")
+        return None
 
 if __name__ == "__main__":
     # Simple test
     speak("This is a test of the text to speech system", "en")
+    get_audio_player().wait()
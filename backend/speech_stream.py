@@ -0,0 +1,536 @@
+"""
+Streaming speech recognition: recognize a phrase while it is still being spoken.
+
+The listener cuts each phrase into chunks at the short pauses between words and
+sends every chunk to a recognizer as soon as it is captured, so recognition
+runs alongside the user's speech instead of after it. A phrase is handed out as
+an Utterance the moment speech starts; its partial transcript grows chunk by
+chunk, and the final transcript is usually ready right when the phrase ends,
+because the last chunk was cut and sent during the closing pause.
+
+Recognizers are pluggable (see RECOGNIZERS). The simulated one needs no network
+and no models, so a recorded WAV can be replayed offline to check segmentation
+and timing:
+
+Usage:
+    python backend/speech_stream.py fixture.wav --recognizer simulated --realtime
+    python backend/speech_stream.py fixture.wav --recognizer google,sphinx --language fr-FR
+"""
+import abc
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from listen import LISTEN_RECOGNITION_TIMEOUT, BackgroundListener, PhraseSegmenter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Streaming recognition settings (can be tuned through environment variables)
+# Pause inside a phrase at which the audio so far is sent off for recognition
+STREAM_CHUNK_PAUSE_SECONDS = float(os.getenv('STREAM_CHUNK_PAUSE_SECONDS', '0.3'))
+# Longest chunk; speech without pauses is sent off after this many seconds
+STREAM_CHUNK_LIMIT_SECONDS = float(os.getenv('STREAM_CHUNK_LIMIT_SECONDS', '4'))
+# Recognizers tried in order for every chunk
+STREAM_RECOGNIZER = os.getenv('STREAM_RECOGNIZER', 'google,sphinx')
+# Chunks recognized at once
+STREAM_RECOGNITION_WORKERS = int(os.getenv('STREAM_RECOGNITION_WORKERS', '2'))
+# Recognition language, e.g. 'hi-IN' (unset: the recognizer's default, US English for Google)
+STREAM_LANGUAGE = os.getenv('STREAM_LANGUAGE') or None
+
+class SpeechRecognizer(abc.ABC):
+    """
+    Turns a piece of audio into text. Subclass it to plug in another engine.
+    Like speech_recognition, recognize() raises sr.UnknownValueError when there
+    is no speech to be understood and sr.RequestError when the engine fails.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def recognize(self, audio):
+        """
+        Args:
+            audio (sr.AudioData): The audio to transcribe
+
+        Returns:
+            str: The transcript
+        """
+
+class GoogleRecognizer(SpeechRecognizer):
+    """Google's web speech API (needs internet)"""
+
+    name = 'google'
+
+    def __init__(self, language=STREAM_LANGUAGE, operation_timeout=LISTEN_RECOGNITION_TIMEOUT):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+        # recognize_google reads its request timeout from the recognizer
+        self._recognizer.operation_timeout = operation_timeout
+
+    def recognize(self, audio):
+        if self.language:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        return self._recognizer.recognize_google(audio)
+
+class SphinxRecognizer(SpeechRecognizer):
+    """CMU Sphinx (offline, less accurate; needs pocketsphinx)"""
+
+    name = 'sphinx'
+
+    def __init__(self, language=STREAM_LANGUAGE):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        try:
+            if self.language:
+                return self._recognizer.recognize_sphinx(audio, language=self.language)
+            return self._recognizer.recognize_sphinx(audio)
+        except ImportError as e:
+            raise sr.RequestError(f"Sphinx is not available: {str(e)}")
+
+class SimulatedRecognizer(SpeechRecognizer):
+    """
+    Offline stand-in for a recognition service, for replaying WAV fixtures.
+    It takes `latency` seconds plus `per_second` for every second of audio, and
+    "recognizes" each chunk as a placeholder word giving its length.
+
+    Args:
+        latency (float): Seconds every request takes
+        per_second (float): Extra seconds per second of audio
+        language (str): Ignored; accepted like the real recognizers do
+    """
+
+    name = 'simulated'
+
+    def __init__(self, latency=0.3, per_second=0.1, language=None):
+        self.language = language
+        self.latency = latency
+        self.per_second = per_second
+
+    def recognize(self, audio):
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        time.sleep(self.latency + self.per_second * seconds)
+        return f"<{seconds:.2f}s>"
+
+class FallbackRecognizer(SpeechRecognizer):
+    """
+    Tries several recognizers in order until one understands the audio.
+
+    Args:
+        recognizers (list): SpeechRecognizer instances, best first
+    """
+
+    def __init__(self, recognizers):
+        if not recognizers:
+            raise ValueError("FallbackRecognizer needs at least one recognizer")
+        self.recognizers = recognizers
+        self.name = ','.join(recognizer.name or type(recognizer).__name__ for recognizer in recognizers)
+
+    def recognize(self, audio):
+        error = None
+        for recognizer in self.recognizers:
+            try:
+                return recognizer.recognize(audio)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                logger.debug(f"{recognizer.name} recognition failed: {str(e)}")
+                error = e
+        raise error
+
+RECOGNIZERS = {recognizer.name: recognizer for recognizer in (GoogleRecognizer, SphinxRecognizer, SimulatedRecognizer)}
+
+def get_speech_recognizer(names=STREAM_RECOGNIZER, language=STREAM_LANGUAGE):
+    """
+    Build a recognizer from a comma-separated list of RECOGNIZERS, tried in order.
+
+    Args:
+        names (str): Recognizer names, best first
+        language (str): Recognition language, e.g. 'hi-IN'
+
+    Returns:
+        SpeechRecognizer: The recognizer
+
+    Raises:
+        ValueError: If a name is unknown
+    """
+    recognizers = []
+    for name in names.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in RECOGNIZERS:
+            raise ValueError(f"Unknown recognizer {name!r} (choose from {', '.join(RECOGNIZERS)})")
+        recognizers.append(RECOGNIZERS[name](language=language))
+    return recognizers[0] if len(recognizers) == 1 else FallbackRecognizer(recognizers)
+
+class ChunkingSegmenter(PhraseSegmenter):
+    """
+    PhraseSegmenter that also cuts each phrase into chunks while it is captured:
+    at every pause of `chunk_pause_seconds` after some speech, or once a chunk
+    reaches `chunk_limit_seconds`. push() still returns the whole phrases.
+
+    Args:
+        sample_rate (int): Samples per second
+        sample_width (int): Bytes per sample
+        on_start (callable): Called when a phrase starts
+        on_chunk (callable): Called with the bytes of each chunk, in order; the last one
+            comes just before the phrase is returned
+        on_drop (callable): Called when a started phrase turns out to be noise and is dropped
+        chunk_pause_seconds (float): Pause that closes a chunk
+        chunk_limit_seconds (float): Longest chunk
+        **options: Passed on to PhraseSegmenter
+    """
+
+    def __init__(self, sample_rate, sample_width, on_start=None, on_chunk=None, on_drop=None,
+                 chunk_pause_seconds=STREAM_CHUNK_PAUSE_SECONDS, chunk_limit_seconds=STREAM_CHUNK_LIMIT_SECONDS,
+                 **options):
+        self.on_start = on_start
+        self.on_chunk = on_chunk
+        self.on_drop = on_drop
+        self.chunk_pause_seconds = chunk_pause_seconds
+        self.chunk_limit_seconds = chunk_limit_seconds
+        super().__init__(sample_rate, sample_width, **options)
+
+    def reset(self):
+        super().reset()
+        self._chunk_start = 0
+        self._chunk_voiced = False
+
+    def _cut(self):
+        # A chunk of nothing but pause isn't worth recognizing
+        if self._chunk_voiced and self.on_chunk:
+            self.on_chunk(b''.join(self._phrase[self._chunk_start:]))
+        self._chunk_start = len(self._phrase)
+        self._chunk_voiced = False
+
+    def _push_window(self, window):
+        in_phrase = self.in_phrase
+        phrase = super()._push_window(window)
+        if not in_phrase and self.in_phrase:
+            # The onset that started the phrase is speech
+            self._chunk_voiced = True
+            if self.on_start:
+                self.on_start()
+        elif in_phrase and phrase is None and not self.in_phrase and self.on_drop:
+            self.on_drop()
+        return phrase
+
+    def _extend(self, window, speech):
+        self._chunk_voiced = self._chunk_voiced or speech
+        phrase = super()._extend(window, speech)
+        if phrase is None:
+            chunk_seconds = (len(self._phrase) - self._chunk_start) * self.window_seconds
+            if (self._chunk_voiced and self._silence_seconds >= self.chunk_pause_seconds) or \
+                    chunk_seconds >= self.chunk_limit_seconds:
+                self._cut()
+        return phrase
+
+    def flush(self):
+        if self._phrase:
+            self._cut()
+        return super().flush()
+
+class Utterance:
+    """
+    One phrase, handed out as soon as speech starts and recognized chunk by chunk
+    while it is still being spoken. The partial transcript is the text of the
+    chunks recognized so far, in order; the final transcript is the whole of it.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        # Set when the phrase ends
+        self.ended = None
+        self.audio = None
+        # Set once the final transcript is known
+        self.finished = None
+        self.cancelled = False
+        # (seconds since the start, partial transcript) for every time the transcript grew
+        self.history = []
+        self._results = []
+        self._recognized = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _add_chunk(self):
+        """Make room for the result of the next chunk; returns its index"""
+        with self._condition:
+            self._results.append(None)
+            return len(self._results) - 1
+
+    def _set_result(self, index, text):
+        with self._condition:
+            self._results[index] = text if text is not None else ''
+            recognized = self._recognized
+            while self._recognized < len(self._results) and self._results[self._recognized] is not None:
+                self._recognized += 1
+            if self._recognized > recognized:
+                self.history.append((round(time.monotonic() - self.started, 3), self._text()))
+            self._settle()
+            self._condition.notify_all()
+
+    def _close(self, audio):
+        with self._condition:
+            self.audio = audio
+            self.ended = time.monotonic()
+            self._closed = True
+            self._settle()
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Give up on the phrase, e.g. because it was the assistant's own voice"""
+        with self._condition:
+            self.cancelled = True
+            self._closed = True
+            self._settle()
+            self._condition.notify_all()
+
+    def _text(self):
+        return ' '.join(text for text in self._results[:self._recognized] if text)
+
+    def _settle(self):
+        if self.finished is None and self._closed and (self.cancelled or self._recognized == len(self._results)):
+            self.finished = time.monotonic()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def partial(self):
+        """The transcript of the chunks recognized so far"""
+        with self._condition:
+            return self._text()
+
+    def partials(self, timeout=None):
+        """
+        Follow the transcript as it grows.
+
+        Args:
+            timeout (float): Seconds to wait at most for the whole phrase
+
+        Yields:
+            str: Each new partial transcript, the last one being the final transcript
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        seen = 0
+        while True:
+            with self._condition:
+                while len(self.history) == seen and not self.done:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                history = self.history[seen:]
+                seen = len(self.history)
+                done = self.done
+            for _, text in history:
+                if text:
+                    yield text
+            if done:
+                return
+
+    def result(self, timeout=None):
+        """
+        Wait for the final transcript.
+
+        Args:
+            timeout (float): Seconds to wait at most
+
+        Returns:
+            str: The transcript, or None if nothing was recognized, the phrase was
+            cancelled or the timeout expired
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.done, timeout)
+            if not self.done or self.cancelled:
+                return None
+            return self._text() or None
+
+    def stats(self):
+        """
+        Get the utterance's timings.
+
+        Returns:
+            dict: Phrase length, chunks, when each partial came, and how long after the
+            end of the phrase the final transcript was ready
+        """
+        with self._condition:
+            stats = {'chunks': len(self._results), 'partials': list(self.history), 'cancelled': self.cancelled}
+            if self.ended is not None:
+                stats['seconds'] = round(self.ended - self.started, 3)
+                if self.finished is not None:
+                    stats['final_after_end_ms'] = round(max(0.0, self.finished - self.ended) * 1000, 1)
+            return stats
+
+class StreamingListener(BackgroundListener):
+    """
+    BackgroundListener whose queue holds Utterances instead of finished phrases.
+    Each Utterance is queued as soon as speech starts, and the chunks of the phrase
+    are recognized on a small thread pool while the user keeps talking.
+
+    Args:
+        recognizer (SpeechRecognizer): Recognizes the chunks (defaults to STREAM_RECOGNIZER)
+        workers (int): Chunks recognized at once
+        chunk_pause_seconds (float): Pause that closes a chunk
+        chunk_limit_seconds (float): Longest chunk
+        **options: Passed on to BackgroundListener
+    """
+
+    def __init__(self, recognizer=None, workers=STREAM_RECOGNITION_WORKERS,
+                 chunk_pause_seconds=STREAM_CHUNK_PAUSE_SECONDS, chunk_limit_seconds=STREAM_CHUNK_LIMIT_SECONDS,
+                 **options):
+        super().__init__(**options)
+        self.speech_recognizer = recognizer or get_speech_recognizer()
+        self.chunk_pause_seconds = chunk_pause_seconds
+        self.chunk_limit_seconds = chunk_limit_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recognize")
+        self._utterance = None
+
+    def _make_segmenter(self):
+        return ChunkingSegmenter(self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH, on_start=self._start_utterance,
+                                 on_chunk=self._recognize_chunk, on_drop=self._drop_phrase,
+                                 chunk_pause_seconds=self.chunk_pause_seconds,
+                                 chunk_limit_seconds=self.chunk_limit_seconds, **self._segmenter_options)
+
+    def _start_utterance(self):
+        self._utterance = Utterance()
+        self._put(self._utterance)
+
+    def _recognize_chunk(self, data):
+        utterance = self._utterance
+        if utterance is None or utterance.cancelled:
+            return
+        index = utterance._add_chunk()
+        audio = sr.AudioData(data, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+        self._executor.submit(self._recognize, utterance, index, audio)
+
+    def _recognize(self, utterance, index, audio):
+        text = None
+        try:
+            text = self.speech_recognizer.recognize(audio)
+        except sr.UnknownValueError:
+            logger.debug(f"Chunk {index} had no recognizable speech")
+        except Exception as e:
+            logger.warning(f"Recognizing chunk {index} failed: {str(e)}")
+        utterance._set_result(index, text)
+
+    def _drop_phrase(self):
+        if self.segmenter.in_phrase:
+            self.segmenter.reset()
+        if self._utterance is not None:
+            self._utterance.cancel()
+            self._utterance = None
+
+    def _in_progress(self, phrase):
+        # Utterances are queued as soon as the user starts speaking
+        return phrase.ended is None and not phrase.cancelled
+
+    def _emit(self, data):
+        utterance = self._utterance
+        self._utterance = None
+        if utterance is None:
+            return
+        utterance._close(sr.AudioData(data, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH))
+        self._stats['phrases'] += 1
+        logger.info(f"Captured a {self.segmenter.seconds(data):.2f}s phrase in {len(utterance._results)} chunks")
+
+    def next_utterance(self, timeout=None):
+        """
+        Get the next phrase, waiting for the user to start speaking if nobody has yet.
+
+        Args:
+            timeout (float): Seconds to wait at most (None waits until capture stops)
+
+        Returns:
+            Utterance: The phrase, possibly still being spoken, or None on timeout or once capturing has stopped
+        """
+        return self.next_phrase(timeout)
+
+    def stop(self):
+        super().stop()
+        if self._utterance is not None:
+            self._utterance.cancel()
+        self._executor.shutdown(wait=False)
+
+class _PacedStream:
+    """Wraps an audio stream so reads come no faster than the audio plays"""
+
+    def __init__(self, stream, bytes_per_second):
+        self.stream = stream
+        self.bytes_per_second = bytes_per_second
+        self._start = None
+        self._bytes = 0
+
+    def read(self, size):
+        if self._start is None:
+            self._start = time.monotonic()
+        data = self.stream.read(size)
+        self._bytes += len(data)
+        delay = self._start + self._bytes / self.bytes_per_second - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return data
+
+class RealtimeAudioFile(sr.AudioFile):
+    """An sr.AudioFile that delivers its audio at the speed it plays, like a microphone"""
+
+    def __enter__(self):
+        source = super().__enter__()
+        self.stream = _PacedStream(self.stream, self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+        return source
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recording through the streaming recognizer")
+    parser.add_argument("audio", help="WAV, AIFF or FLAC file")
+    parser.add_argument("--recognizer", default=STREAM_RECOGNIZER,
+                        help=f"Comma-separated recognizers, tried in order ({', '.join(RECOGNIZERS)})")
+    parser.add_argument("--language", help="Recognition language, e.g. fr-FR")
+    parser.add_argument("--realtime", action="store_true", help="Replay at the speed of speech, like a microphone")
+    parser.add_argument("--calibration", type=float, default=0.5, help="Seconds at the start that are only noise")
+    parser.add_argument("--chunk-pause", type=float, default=STREAM_CHUNK_PAUSE_SECONDS)
+    parser.add_argument("--chunk-limit", type=float, default=STREAM_CHUNK_LIMIT_SECONDS)
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated recognizer seconds per request")
+    parser.add_argument("--per-second", type=float, default=0.1, help="Simulated recognizer seconds per second of audio")
+    parser.add_argument("--whole", action="store_true",
+                        help="Also recognize each whole phrase after it ends, as listen() used to, for comparison")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    try:
+        recognizers = [SimulatedRecognizer(args.latency, args.per_second) if name.strip() == 'simulated'
+                       else get_speech_recognizer(name, language=args.language) for name in args.recognizer.split(',')]
+    except ValueError as e:
+        parser.error(str(e))
+    recognizer = recognizers[0] if len(recognizers) == 1 else FallbackRecognizer(recognizers)
+
+    source = (RealtimeAudioFile if args.realtime else sr.AudioFile)(args.audio)
+    listener = StreamingListener(recognizer=recognizer, source=source, calibration_seconds=args.calibration,
+                                 chunk_pause_seconds=args.chunk_pause, chunk_limit_seconds=args.chunk_limit).start()
+    results = []
+    while True:
+        utterance = listener.next_utterance()
+        if utterance is None:
+            break
+        text = utterance.result()
+        result = {'text': text, **utterance.stats()}
+        if args.whole and utterance.audio is not None:
+            start = time.monotonic()
+            try:
+                result['whole_text'] = recognizer.recognize(utterance.audio)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                result['whole_text'] = None
+                logger.warning(f"Whole-phrase recognition failed: {str(e)}")
+            result['whole_after_end_ms'] = round((time.monotonic() - start) * 1000, 1)
+        results.append(result)
+    listener.stop()
+    print(json.dumps({'utterances': results, 'listener': listener.stats()}, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
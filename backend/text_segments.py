@@ -0,0 +1,43 @@
+import re
+
+# Sentence boundaries: Latin punctuation followed by whitespace, or a Devanagari
+# danda / CJK full stop, which often isn't followed by a space
+_BOUNDARY = re.compile(r'(?<=[.!?])\s+|(?<=[।॥。！？])\s*')
+
+# Places to break a sentence that is too long on its own
+_SOFT_BREAK = re.compile(r'[,;:،、，]\s*|\s+')
+
+def _split_long(sentence, max_chars):
+    """Split a sentence longer than max_chars at the last comma or space before the limit"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = 0
+        for match in _SOFT_BREAK.finditer(sentence, 0, max_chars):
+            cut = match.end()
+        if cut == 0:
+            cut = max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+def split_sentences(text, max_chars=200):
+    """
+    Split text into sentences, handling the Hindi danda (। and ॥) as well as . ! ?
+
+    Args:
+        text (str): The text to split
+        max_chars (int): Sentences longer than this are split further at commas or spaces
+
+    Returns:
+        list: The sentences, in order and without surrounding whitespace
+    """
+    if not text:
+        return []
+    sentences = []
+    for piece in _BOUNDARY.split(text):
+        piece = piece.strip()
+        if piece:
+            sentences.extend(_split_long(piece, max_chars))
+    return sentences
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class TieredCache:
+    """
+    Key/value cache with an in-memory LRU tier and an optional SQLite tier that survives restarts.
+    Values must be JSON-serializable.
+
+    Args:
+        max_entries (int): Maximum number of entries kept in memory
+        ttl (float): Seconds before an entry expires (None keeps entries until evicted)
+        db_path (str): Path to the SQLite file for the persistent tier (None disables it)
+        max_db_entries (int): Maximum number of entries kept on disk
+        table (str): SQLite table name, so several caches can share one file
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, db_path=None, max_db_entries=100000, table='cache'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self.table = table
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'sets': 0}
+        self._db = None
+        self._db_writes = 0
+
+        if db_path:
+            try:
+                directory = os.path.dirname(os.path.abspath(db_path))
+                os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Could not open cache database {db_path}: {str(e)}")
+                self._db = None
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _lookup(self, key, now):
+        """Find a key in memory and then on disk; returns (value, stat to count) with value None on a miss"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created = entry
+            if not self._expired(created, now):
+                self._memory.move_to_end(key)
+                return value, 'memory_hits'
+            del self._memory[key]
+            self._stats['expired'] += 1
+
+        if self._db is not None:
+            try:
+                row = self._db.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, value, row[1])
+                        return value, 'disk_hits'
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._stats['expired'] += 1
+            except sqlite3.Error as e:
+                logger.error(f"Cache database read failed: {str(e)}")
+        return None, 'misses'
+
+    def get(self, key):
+        """
+        Look up a key, checking memory first and then disk.
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            value, stat = self._lookup(key, time.time())
+            self._stats[stat] += 1
+            return value
+
+    def get_first(self, keys):
+        """
+        Look up alternative keys for the same value, e.g. one per model, in order of preference.
+        Counts as a single lookup: one hit if any key is found, otherwise one miss.
+
+        Returns:
+            tuple: The first key found and its value, or (None, None) on a miss
+        """
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                value, stat = self._lookup(key, now)
+                if value is not None:
+                    self._stats[stat] += 1
+                    return key, value
+            self._stats['misses'] += 1
+            return None, None
+
+    def get_many(self, keys):
+        """
+        Look up several keys at once.
+
+        Returns:
+            dict: The keys that were found, with their values
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value):
+        """Store a value in memory and, if enabled, on disk"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats['sets'] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                self._db_writes += 1
+                # Trim the disk tier now and then rather than on every write
+                if self._db_writes % 100 == 0:
+                    self._trim_db(now)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Cache database write failed: {str(e)}")
+
+    def _trim_db(self, now):
+        if self.ttl is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+        count = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_db_entries:
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_db_entries,)
+            )
+            self._stats['evictions'] += count - self.max_db_entries
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Get hit/miss counters for the cache.
+
+        Returns:
+            dict: Counters, current sizes and the overall hit ratio
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            if self._db is not None:
+                try:
+                    stats['disk_entries'] = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+                except sqlite3.Error:
+                    stats['disk_entries'] = None
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,453 @@
+"""
+Span-level tracing and metrics for the chat pipeline.
+
+Every chat turn is a trace: a root "turn" span with a child span per stage
+(listen, detect, translate, chat, translate_back, tts) and, under "chat", a span
+per Groq model attempt and per HTTP request, retries and rate-limit re-queues
+included. Finished spans feed latency histograms and counters that can be read
+in Prometheus text format; whole traces can be written as OTLP/JSON lines, which
+OpenTelemetry tooling (e.g. the collector's otlpjsonfile receiver) reads offline.
+
+Usage:
+    with tracing.span("turn", source="cli"):
+        with tracing.span("detect"):
+            lang = detect_language(text)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tracing settings (can be tuned through environment variables)
+TRACING_ENABLED = os.getenv('TRACING', '1').lower() in ('1', 'true', 'yes')
+# File finished traces are appended to as OTLP/JSON lines (unset: no trace export)
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+# Turns slower than this many milliseconds get their per-stage breakdown logged
+TRACE_SLOW_TURN_MS = float(os.getenv('TRACE_SLOW_TURN_MS', '3000'))
+# Port the CLI and web app serve /metrics on (0: don't serve)
+TRACE_METRICS_PORT = int(os.getenv('TRACE_METRICS_PORT', '0'))
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'lynqo')
+
+# Histogram buckets in seconds, from a cached detection to a slow Groq reply
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span statuses
+OK = 'ok'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+_current_span = ContextVar('current_span', default=None)
+
+class Span:
+    """
+    One timed operation in a trace.
+    Create spans with Tracer.span() or Tracer.start_span() rather than directly.
+    """
+
+    def __init__(self, tracer, name, parent=None, attributes=None, activate=True):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.status = OK
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._start = time.perf_counter()
+        self._duration = None
+        self._children = [] if parent is None else None
+        self._token = _current_span.set(self) if activate else None
+
+    @property
+    def duration_ms(self):
+        """Milliseconds from start to end (or to now while the span is open)"""
+        duration = self._duration if self._duration is not None else time.perf_counter() - self._start
+        return round(duration * 1000, 2)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_status(self, status, message=None):
+        self.status = status
+        self.status_message = message
+
+    def record_error(self, error):
+        """Mark the span as failed because of an exception or an error message"""
+        self.set_status(ERROR, str(error) if not isinstance(error, Exception) else f"{type(error).__name__}: {error}")
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self._duration = time.perf_counter() - self._start
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from another context (e.g. a generator resumed elsewhere); nothing to restore
+                pass
+            self._token = None
+        self.tracer._finish(self)
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled"""
+    name = None
+    attributes = {}
+    duration_ms = 0.0
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def set_status(self, status, message=None):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in sorted(labels.items())) + "}"
+
+class Metrics:
+    """
+    Counters and latency histograms, rendered in the Prometheus text format.
+
+    Args:
+        buckets (tuple): Upper bounds of the histogram buckets, in seconds
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self._counters = {}  # name -> {labels: value}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, seconds, **labels):
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def increment(self, name, amount=1, **labels):
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def render(self):
+        """
+        Get every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, ready to serve on /metrics
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(dict(key))} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, values in sorted(series.items()):
+                    labels = dict(key)
+                    for bound, count in zip(self.buckets, values):
+                        lines.append(f"{name}_bucket{_format_labels(dict(labels, le=repr(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {values[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {round(values[-2], 6)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+class OTLPFileExporter:
+    """
+    Appends finished traces to a file as OTLP/JSON, one ExportTraceServiceRequest per line.
+    Needs no network or OpenTelemetry packages; the files can be replayed into a
+    collector or any OTLP-compatible backend later.
+
+    Args:
+        path (str): File to append to
+        service_name (str): service.name resource attribute
+    """
+
+    _STATUS_CODES = {OK: 1, ERROR: 2, CANCELLED: 0}
+
+    def __init__(self, path, service_name=TRACE_SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def to_otlp(self, spans):
+        """Convert spans to an OTLP/JSON ExportTraceServiceRequest"""
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns),
+                'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+                'status': {'code': self._STATUS_CODES.get(span.status, 0)},
+            }
+            if span.parent is not None:
+                otlp_span['parentSpanId'] = span.parent.span_id
+            if span.status_message:
+                otlp_span['status']['message'] = span.status_message
+            otlp_spans.append(otlp_span)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': otlp_spans}],
+        }]}
+
+    def export(self, spans):
+        line = json.dumps(self.to_otlp(spans), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+class Tracer:
+    """
+    Creates spans, keeps the current one per thread/context, and hands finished
+    spans to the metrics and finished traces to the exporters.
+
+    Args:
+        metrics (Metrics): Where span durations and counts are recorded
+        exporters (list): Objects with an export(spans) method, called once per finished trace
+        slow_turn_ms (float): Log the stage breakdown of root spans slower than this
+        enabled (bool): If False, spans are no-ops
+    """
+
+    def __init__(self, metrics=None, exporters=(), slow_turn_ms=TRACE_SLOW_TURN_MS, enabled=TRACING_ENABLED):
+        self.metrics = metrics or Metrics()
+        self.exporters = list(exporters)
+        self.slow_turn_ms = slow_turn_ms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.metrics.describe('lynqo_span_duration_seconds', "Duration of pipeline spans (turns, stages, Groq attempts)")
+        self.metrics.describe('lynqo_groq_responses_total', "Groq HTTP responses by model and status code")
+        self.metrics.describe('lynqo_slow_turns_total', "Turns slower than TRACE_SLOW_TURN_MS")
+
+    def start_span(self, name, activate=True, **attributes):
+        """
+        Start a span as a child of the current one (or as a new trace); call end() on it.
+
+        Args:
+            name (str): Span name, e.g. "detect" or "groq.attempt"
+            activate (bool): Make it the current span until it ends. Spans held open
+                across a yield should not be activated, or they leak into the caller
+            **attributes: Span attributes
+
+        Returns:
+            Span: The started span
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes, activate)
+
+    @contextmanager
+    def span(self, name, activate=True, **attributes):
+        """Context manager around start_span(); an exception marks the span as failed"""
+        span = self.start_span(name, activate, **attributes)
+        try:
+            yield span
+        except GeneratorExit:
+            span.set_status(CANCELLED)
+            raise
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            span.end()
+
+    def _finish(self, span):
+        labels = {'span': span.name, 'status': span.status}
+        if 'model' in span.attributes:
+            labels['model'] = span.attributes['model']
+        self.metrics.observe('lynqo_span_duration_seconds', span._duration, **labels)
+        if 'http.status_code' in span.attributes:
+            self.metrics.increment('lynqo_groq_responses_total', model=span.attributes.get('model', ''),
+                                   code=span.attributes['http.status_code'])
+
+        root = span.root
+        if span is not root:
+            with self._lock:
+                finished_root = root.end_ns is not None
+                if not finished_root:
+                    root._children.append(span)
+            if finished_root:
+                # Outlived its trace (e.g. an abandoned stream), so it goes out on its own
+                self._export([span])
+            return
+
+        with self._lock:
+            spans = root._children + [root]
+            root._children = []
+        if root.name == 'turn' and root.duration_ms >= self.slow_turn_ms:
+            self.metrics.increment('lynqo_slow_turns_total')
+            status = f", {root.status}" if root.status != OK else ""
+            logger.warning(f"Slow turn ({root.duration_ms:.0f} ms{status}): {breakdown(spans)}")
+        self._export(spans)
+
+    def _export(self, spans):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.error(f"Error exporting trace with {type(exporter).__name__}: {str(e)}")
+
+def breakdown(spans):
+    """Describe where a trace's time went, e.g. "detect 3 ms, chat 1200 ms (groq.attempt llama3-70b-8192: error)" """
+    children = {}
+    for span in spans:
+        if span.parent is not None:
+            children.setdefault(span.parent.span_id, []).append(span)
+
+    def describe(span):
+        text = f"{span.name}"
+        if 'model' in span.attributes:
+            text += f" {span.attributes['model']}"
+        text += f" {span.duration_ms:.0f} ms"
+        if span.status != OK:
+            text += f" {span.status}"
+        nested = sorted(children.get(span.span_id, []), key=lambda child: child.start_ns)
+        if nested:
+            text += f" ({', '.join(describe(child) for child in nested)})"
+        return text
+
+    roots = [span for span in spans if span.parent is None or span.parent not in spans]
+    parts = []
+    for root in roots:
+        parts.extend(describe(child) for child in sorted(children.get(root.span_id, []), key=lambda s: s.start_ns))
+    return ", ".join(parts) or "no stages recorded"
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer():
+    """
+    Get the process-wide tracer, creating it on first use.
+    Traces are exported to TRACE_EXPORT_PATH if it's set.
+
+    Returns:
+        Tracer: The shared tracer
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                exporters = [OTLPFileExporter(TRACE_EXPORT_PATH)] if TRACE_EXPORT_PATH else []
+                _tracer = Tracer(exporters=exporters)
+    return _tracer
+
+def span(name, activate=True, **attributes):
+    """Open a span on the shared tracer (see Tracer.span)"""
+    return get_tracer().span(name, activate, **attributes)
+
+def start_span(name, activate=True, **attributes):
+    """Start a span on the shared tracer (see Tracer.start_span)"""
+    return get_tracer().start_span(name, activate, **attributes)
+
+def current_span():
+    """The span that is current in this thread/context, or None"""
+    return _current_span.get()
+
+def render_metrics():
+    """The shared tracer's metrics in Prometheus text format"""
+    return get_tracer().metrics.render()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_metrics_server = None
+
+def start_metrics_server(port=TRACE_METRICS_PORT, host='0.0.0.0'):
+    """
+    Serve /metrics for Prometheus to scrape, on a background thread.
+    Does nothing if the port is 0 or the server is already running.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None
+    """
+    global _metrics_server
+    if not port:
+        return None
+    with _tracer_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.error(f"Could not serve metrics on port {port}: {str(e)}")
+                return None
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="metrics").start()
+            logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return _metrics_server
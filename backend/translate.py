@@ -1,6 +1,5 @@
 import logging
-import requests
-import json
+from translation_backend import get_translation_backend, NullBackend, TranslationError
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,11 +22,16 @@ def translate_to_english(text, src_lang):
             logger.info("Text already in English or auto-detect, skipping translation")
             return text
             
-        # Use a fallback translation service
-        logger.info(f"Translating from {src_lang} to English")
+        backend = get_translation_backend()
+        if not isinstance(backend, NullBackend):
+            logger.info(f"Translating from {src_lang} to English with {backend.name}")
+            try:
+                return backend.translate(text, src_lang, 'en')
+            except TranslationError as e:
+                logger.error(f"Translation failed: {str(e)}")
         
-        # Fallback mechanism - since we have issues with translation APIs
-        # For now, just return the original text and inform the user
+        # Fallback mechanism - no translation service configured or it failed
+        # Return the original text and inform the model
         logger.warning("Translation not performed - using original text")
         return f"{text} [Note: Translation was not performed due to API limitations]"
         
@@ -1,6 +1,5 @@
 import logging
-import requests
-import json
+from translation_backend import get_translation_backend, NullBackend, TranslationError
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,11 +22,15 @@ def translate_back_to_user(response, target_lang):
             logger.info("Target language is English or auto-detect, skipping translation")
             return response
             
-        # Use a fallback translation service
-        logger.info(f"Translating from English to {target_lang}")
+        backend = get_translation_backend()
+        if not isinstance(backend, NullBackend):
+            logger.info(f"Translating from English to {target_lang} with {backend.name}")
+            try:
+                return backend.translate(response, 'en', target_lang)
+            except TranslationError as e:
+                logger.error(f"Translation failed: {str(e)}")
         
-        # Fallback mechanism - since we have issues with translation APIs
-        # For now, just return the original text and inform the user
+        # Fallback mechanism - no translation service configured or it failed
         logger.warning("Translation not performed - using original response")
         return response
         
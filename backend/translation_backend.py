@@ -0,0 +1,227 @@
+import abc
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from text_segments import split_sentences
+from translation_memory import get_translation_memory
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Translation settings (can be tuned through environment variables)
+LIBRETRANSLATE_URL = os.getenv('LIBRETRANSLATE_URL')
+LIBRETRANSLATE_API_KEY = os.getenv('LIBRETRANSLATE_API_KEY')
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', '10'))
+TRANSLATION_BATCH_SIZE = int(os.getenv('TRANSLATION_BATCH_SIZE', '16'))
+TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', '4'))
+
+# Our language codes that LibreTranslate spells differently
+LIBRETRANSLATE_CODES = {
+    'zh-cn': 'zh',
+}
+
+# Languages written without spaces between sentences
+UNSPACED_LANGS = ('zh', 'ja')
+
+class TranslationError(Exception):
+    """Raised when a translation backend couldn't translate"""
+
+def split_segments(text):
+    """
+    Split text into translatable segments, keeping track of line breaks.
+
+    Returns:
+        tuple: The segments, and the number of segments on each line (to rebuild the text)
+    """
+    segments = []
+    layout = []
+    for line in text.split('\n'):
+        sentences = split_sentences(line)
+        segments.extend(sentences)
+        layout.append(len(sentences))
+    return segments, layout
+
+def join_segments(segments, layout, lang=None):
+    """
+    Put translated segments back together line by line.
+
+    Args:
+        segments (list): The translated segments
+        layout (list): The number of segments on each line, from split_segments
+        lang (str): Language of the segments; Chinese and Japanese sentences are joined without spaces
+
+    Returns:
+        str: The text
+    """
+    separator = "" if lang and lang.split('-')[0] in UNSPACED_LANGS else " "
+    lines = []
+    position = 0
+    for count in layout:
+        lines.append(separator.join(segments[position:position + count]))
+        position += count
+    return "\n".join(lines)
+
+class TranslationBackend(abc.ABC):
+    """
+    Base class for translation engines.
+    Subclasses implement translate_batch; translate() handles segmentation and
+    the translation memory.
+    """
+
+    name = 'base'
+    # TranslationMemory consulted before calling the engine (None disables it)
+    memory = None
+
+    @abc.abstractmethod
+    def translate_batch(self, segments, source, target):
+        """
+        Translate a list of segments.
+
+        Args:
+            segments (list): The segments to translate
+            source (str): Source language code
+            target (str): Target language code
+
+        Returns:
+            list: The translated segments, in the same order
+
+        Raises:
+            TranslationError: If the segments couldn't be translated
+        """
+
+    def translate(self, text, source, target):
+        """
+        Translate text, sending its sentences to translate_batch.
+        Sentences found in the translation memory aren't sent, and repeated
+        sentences are only sent once.
+
+        Returns:
+            str: The translated text
+
+        Raises:
+            TranslationError: If the text couldn't be translated
+        """
+        segments, layout = split_segments(text)
+        if not segments:
+            return text
+        if self.memory is None:
+            return join_segments(self.translate_batch(segments, source, target), layout, target)
+
+        translated = self.memory.lookup(segments, source, target, self.name)
+        missing = list(dict.fromkeys(segment for i, segment in enumerate(segments) if i not in translated))
+        if missing:
+            results = self.translate_batch(missing, source, target)
+            self.memory.store(missing, results, source, target, self.name)
+            by_segment = dict(zip(missing, results))
+            for i, segment in enumerate(segments):
+                if i not in translated:
+                    translated[i] = by_segment[segment]
+        return join_segments([translated[i] for i in range(len(segments))], layout, target)
+
+class NullBackend(TranslationBackend):
+    """Backend used when no translation engine is configured; leaves text unchanged"""
+
+    name = 'none'
+
+    def translate_batch(self, segments, source, target):
+        return list(segments)
+
+class LibreTranslateBackend(TranslationBackend):
+    """
+    Client for a LibreTranslate-compatible /translate endpoint.
+    Segments are sent in batches (LibreTranslate accepts a list for `q`), and the
+    batches of a long text go out concurrently over a pooled session, so latency
+    doesn't grow with the number of sentences.
+
+    Args:
+        url (str): Base URL of the LibreTranslate server
+        api_key (str): Optional API key
+        timeout (float): Request timeout in seconds
+        batch_size (int): Segments per request
+        workers (int): Requests in flight at once
+        memory (TranslationMemory): Translation memory to use (defaults to the shared one)
+    """
+
+    name = 'libretranslate'
+
+    def __init__(self, url=LIBRETRANSLATE_URL, api_key=LIBRETRANSLATE_API_KEY, timeout=TRANSLATION_TIMEOUT,
+                 batch_size=TRANSLATION_BATCH_SIZE, workers=TRANSLATION_WORKERS, memory=None):
+        self.url = f"{url.rstrip('/')}/translate"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.memory = memory if memory is not None else get_translation_memory()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+
+    def _post(self, segments, source, target):
+        data = {
+            "q": segments,
+            "source": LIBRETRANSLATE_CODES.get(source, source),
+            "target": LIBRETRANSLATE_CODES.get(target, target),
+            "format": "text",
+        }
+        if self.api_key:
+            data["api_key"] = self.api_key
+        try:
+            response = self.session.post(self.url, json=data, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            raise TranslationError(f"LibreTranslate timed out after {self.timeout}s")
+        except requests.exceptions.RequestException as e:
+            raise TranslationError(f"LibreTranslate request failed: {str(e)}")
+
+        if response.status_code != 200:
+            try:
+                error = response.json().get('error', response.text)
+            except ValueError:
+                error = response.text
+            raise TranslationError(f"LibreTranslate error {response.status_code}: {error}")
+
+        translated = response.json().get('translatedText')
+        if isinstance(translated, str):
+            translated = [translated]
+        if not isinstance(translated, list) or len(translated) != len(segments):
+            raise TranslationError("LibreTranslate returned an unexpected response")
+        return translated
+
+    def translate_batch(self, segments, source, target):
+        batches = [segments[i:i + self.batch_size] for i in range(0, len(segments), self.batch_size)]
+        if len(batches) == 1:
+            return self._post(batches[0], source, target)
+        futures = [self._executor.submit(self._post, batch, source, target) for batch in batches]
+        return [segment for future in futures for segment in future.result()]
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_translation_backend():
+    """
+    Get the process-wide translation backend.
+    Uses LibreTranslate when LIBRETRANSLATE_URL is set, otherwise the NullBackend.
+
+    Returns:
+        TranslationBackend: The shared backend
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if LIBRETRANSLATE_URL:
+                    _backend = LibreTranslateBackend()
+                else:
+                    _backend = NullBackend()
+    return _backend
+
+def set_translation_backend(backend):
+    """Replace the shared backend, e.g. with one pointing at a local stand-in server"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
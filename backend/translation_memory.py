@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from tiered_cache import TieredCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Translation memory settings (can be tuned through environment variables)
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY', '1').lower() in ('1', 'true', 'yes')
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '4096'))
+TRANSLATION_MEMORY_DB = os.getenv('TRANSLATION_MEMORY_DB')
+TRANSLATION_MEMORY_MAX_DB_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_DB_ENTRIES', '200000'))
+
+class TranslationMemory:
+    """
+    Segment-level translation memory.
+    Stores translated sentences keyed on (segment, source, target, engine), so
+    repeated greetings, system phrases and reply sentences are only sent to the
+    translation engine once.
+
+    Args:
+        max_entries (int): Segments kept in memory
+        db_path (str): SQLite file for the persistent tier (None keeps it in memory only)
+        max_db_entries (int): Segments kept on disk
+    """
+
+    def __init__(self, max_entries=TRANSLATION_MEMORY_MAX_ENTRIES, db_path=TRANSLATION_MEMORY_DB,
+                 max_db_entries=TRANSLATION_MEMORY_MAX_DB_ENTRIES):
+        self._cache = TieredCache(
+            max_entries=max_entries,
+            db_path=db_path,
+            max_db_entries=max_db_entries,
+            table='translation_memory'
+        )
+        self._lock = threading.Lock()
+        self._pairs = {}
+
+    @staticmethod
+    def key(segment, source, target, engine):
+        parts = [engine, source, target, segment.strip()]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def lookup(self, segments, source, target, engine):
+        """
+        Look up translations for a list of segments.
+
+        Returns:
+            dict: Index in `segments` -> remembered translation, for the segments that hit
+        """
+        found = {}
+        for i, segment in enumerate(segments):
+            translation = self._cache.get(self.key(segment, source, target, engine))
+            if translation is not None:
+                found[i] = translation
+        with self._lock:
+            counts = self._pairs.setdefault(f"{source}->{target}", {'hits': 0, 'misses': 0})
+            counts['hits'] += len(found)
+            counts['misses'] += len(segments) - len(found)
+        return found
+
+    def store(self, segments, translations, source, target, engine):
+        """Remember the translations of a list of segments"""
+        for segment, translation in zip(segments, translations):
+            self._cache.set(self.key(segment, source, target, engine), translation)
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            self._pairs.clear()
+
+    def stats(self):
+        """
+        Get hit ratios for the translation memory.
+
+        Returns:
+            dict: The cache counters, plus segment hits, misses and hit ratio for each language pair
+        """
+        stats = self._cache.stats()
+        with self._lock:
+            pairs = {pair: dict(counts) for pair, counts in self._pairs.items()}
+        for counts in pairs.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / total, 4) if total else 0.0
+        stats['pairs'] = pairs
+        return stats
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_translation_memory():
+    """
+    Get the process-wide translation memory, creating it on first use.
+
+    Returns:
+        TranslationMemory: The shared memory, or None if TRANSLATION_MEMORY is off
+    """
+    global _memory
+    if not TRANSLATION_MEMORY_ENABLED:
+        return None
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
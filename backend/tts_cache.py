@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache settings (can be tuned through environment variables)
+TTS_CACHE_DIR = os.getenv(
+    'TTS_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio', 'cache')
+)
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+class AudioCache:
+    """
+    Content-addressed cache for synthesized speech.
+    Files are named after a hash of everything that affects the audio, so repeated
+    phrases are served from disk. The least recently used files are evicted once
+    the directory grows past `max_bytes`.
+
+    Args:
+        directory (str): Directory holding the cached audio files
+        max_bytes (int): Maximum total size of the cache on disk
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU order from the files already on disk (oldest access first)"""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.mp3') or name.startswith('tmp_'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[:-len('.mp3')], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def key(text, language, slow=False, engine='gtts'):
+        """Hash of everything that affects the synthesized audio"""
+        return hashlib.sha256(f"{engine}\0{language}\0{int(bool(slow))}\0{text}".encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def temp_path(self):
+        """Path to write a new file to before it is added with put()"""
+        return os.path.join(self.directory, f"tmp_{uuid.uuid4()}.mp3")
+
+    def get(self, key):
+        """
+        Look up cached audio.
+
+        Returns:
+            str: Path to the audio file, or None on a miss
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries:
+                if os.path.exists(path):
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    # The modification time doubles as the last-access time across restarts
+                    try:
+                        os.utime(path, (time.time(), time.time()))
+                    except OSError:
+                        pass
+                    return path
+                # Deleted from outside the cache
+                self._total_bytes -= self._entries.pop(key)
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, temp_path):
+        """
+        Move a freshly written audio file into the cache.
+
+        Args:
+            key (str): Cache key from AudioCache.key
+            temp_path (str): The file to move in (usually from temp_path())
+
+        Returns:
+            str: Path to the cached file
+        """
+        path = self.path_for(key)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._total_bytes -= size
+            self._stats['evictions'] += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                logger.warning(f"Could not remove cached audio {key}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['files'] = len(self._entries)
+            stats['bytes'] = self._total_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_audio_cache():
+    """
+    Get the process-wide TTS audio cache, creating it on first use.
+
+    Returns:
+        AudioCache: The shared cache
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AudioCache()
+    return _cache
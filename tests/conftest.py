@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other by plain module name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+# Settings are read at import time; keep every cache and side effect off unless a test turns it on
+os.environ.update({
+    'GROQ_CACHE': '0',
+    'FAQ_INDEX': '0',
+    'TRANSLATION_MEMORY': '0',
+    'GROQ_RATE_LIMIT': '0',
+    'LISTEN_MUTE_WHILE_SPEAKING': '0',
+})
+for name in ('GROQ_API_KEY', 'GROQ_API_KEYS', 'GROQ_CACHE_DB', 'FAQ_INDEX_PATH', 'TRACE_EXPORT_PATH',
+             'TRACE_METRICS_PORT', 'LIBRETRANSLATE_URL', 'TTS_URL'):
+    os.environ.pop(name, None)
+
+@pytest.fixture
+def health(monkeypatch):
+    """A fresh model health registry, so circuit state doesn't leak between tests"""
+    import model_health
+    registry = model_health.ModelHealthRegistry()
+    monkeypatch.setattr(model_health, '_registry', registry)
+    return registry
+
+@pytest.fixture
+def groq_standin(monkeypatch, health):
+    """
+    Start a Groq stand-in and point the shared Groq client at it.
+    Yields the stand-in; tweak its attributes (latency, break_rate, ...) in the test.
+    """
+    import groq_chat
+    from local_standins import GroqStandin
+
+    standin = GroqStandin(token_interval=0.0, reply_words=12, seed=1).start()
+    client = groq_chat.GroqClient(api_key='test-key', base_url=standin.url, rate_limit=False, timeout=5)
+    monkeypatch.setattr(groq_chat, '_client', client)
+    yield standin
+    client.close()
+    standin.stop()
+
+@pytest.fixture
+def audio_cache(monkeypatch, tmp_path):
+    """A fresh speech cache in a temporary directory"""
+    import tts_cache
+    cache = tts_cache.AudioCache(directory=str(tmp_path / 'audio'))
+    monkeypatch.setattr(tts_cache, '_cache', cache)
+    return cache
+
+@pytest.fixture
+def fake_gtts(monkeypatch):
+    """Replace gTTS with an offline fake that writes the text as the 'audio'; yields the texts synthesized"""
+    import speak
+    synthesized = []
+
+    class FakeTTS:
+        def __init__(self, text, lang='en', slow=False):
+            self.text = text
+            synthesized.append(text)
+
+        def save(self, path):
+            with open(path, 'wb') as f:
+                f.write(self.text.encode('utf-8'))
+
+    monkeypatch.setattr(speak, 'gTTS', FakeTTS)
+    return synthesized
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+import api_server
+
+@pytest.fixture
+def server_state(monkeypatch):
+    state = api_server.ServerState(workers=2, max_queue=2)
+    monkeypatch.setattr(api_server, 'state', state)
+    yield state
+    state.executor.shutdown(wait=False)
+
+@pytest.fixture
+def client(server_state):
+    # Without the lifespan, so no warmup against the real API
+    return TestClient(api_server.app)
+
+def _events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+def test_chat_answers_with_the_pipeline_result(client, server_state, groq_standin):
+    response = client.post('/v1/chat', json={'text': "What is the capital of France?", 'lang': 'en'})
+    assert response.status_code == 200
+    result = response.json()
+    assert result['status'] == 'ok'
+    assert result['reply'] == groq_standin.reply_for([{'role': 'user', 'content': "What is the capital of France?"}])
+    assert server_state.stats['completed'] == 1
+
+def test_chat_validates_the_request(client):
+    assert client.post('/v1/chat', content=b'not json').status_code == 400
+    assert client.post('/v1/chat', json={'text': "  "}).status_code == 400
+    assert client.post('/v1/chat', json={'text': "x" * (api_server.API_MAX_TEXT_CHARS + 1)}).status_code == 413
+
+def test_failed_turns_are_a_bad_gateway(client, server_state, groq_standin, monkeypatch):
+    groq_standin.error_rate = 1.0
+    monkeypatch.setattr('groq_chat.backoff_delay', lambda attempt: 0)
+    response = client.post('/v1/chat', json={'text': "Hello?", 'lang': 'en'})
+    assert response.status_code == 502
+    assert response.json()['status'] == 'error'
+    assert server_state.stats['failed'] == 1
+
+def test_full_queue_is_turned_away(client, server_state):
+    server_state.max_queue = 0
+    response = client.post('/v1/chat', json={'text': "Hello?"})
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '1'
+    assert client.post('/v1/chat/stream', json={'text': "Hello?"}).status_code == 503
+    assert server_state.stats['rejected'] == 2
+
+def test_stream_sends_tokens_then_done(client, groq_standin):
+    response = client.post('/v1/chat/stream', json={'text': "Tell me about the weather", 'lang': 'en'})
+    assert response.status_code == 200
+    events = _events(response.text)
+    assert events[0][0] == 'meta' and events[-1][0] == 'done'
+    tokens = ''.join(data['text'] for event, data in events if event == 'token')
+    assert tokens == groq_standin.reply_for([{'role': 'user', 'content': "Tell me about the weather"}])
+
+def test_health_and_stats(client, groq_standin):
+    assert client.get('/healthz').json() == {'status': 'ok'}
+    assert client.get('/readyz').status_code == 200
+    assert client.get('/v1/stats').json()['server']['workers'] == 2
+    assert client.get('/v1/audio/unknown').status_code == 404
+
+def test_metrics_include_the_turn_stages(client, groq_standin, monkeypatch):
+    import tracing
+    monkeypatch.setattr(tracing, '_tracer', tracing.Tracer(enabled=True))
+    assert client.post('/v1/chat', json={'text': "Hello", 'lang': 'en'}).status_code == 200
+
+    response = client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'lynqo_span_duration_seconds_count{span="turn",status="ok"} 1' in response.text
+    assert 'span="chat"' in response.text
+
+def _run_turn(text):
+    events = []
+    ok = api_server._stream_turn(text, 'en', False, lambda event, data: events.append((event, data)),
+                                 threading.Event())
+    return ok, [event for event, _ in events]
+
+def test_stream_turn_completes(groq_standin):
+    ok, events = _run_turn("Tell me about the weather")
+    assert ok is True
+    assert events[0] == 'meta' and events[-1] == 'done'
+    assert 'error' not in events
+
+def test_stream_turn_reports_broken_stream(groq_standin):
+    groq_standin.break_rate = 1.0
+    ok, events = _run_turn("Tell me about the weather")
+    assert ok is False
+    assert 'token' in events
+    assert events[-1] == 'error'
+    assert 'done' not in events
+
+def test_drain_waits_for_requests_in_flight(server_state, groq_standin):
+    async def scenario():
+        server_state.in_flight = 1
+        drained = asyncio.ensure_future(api_server.drain(delay=0, grace=5))
+        await asyncio.sleep(0.3)
+        # Still serving the request in flight, but no longer ready for new ones
+        assert not drained.done()
+        assert server_state.draining
+        response = await api_server.readyz(None)
+        assert response.status_code == 503
+        assert b'"accepting":false' in response.body and b'"api_key":true' in response.body
+        server_state.in_flight = 0
+        await asyncio.wait_for(drained, 1)
+
+    asyncio.run(scenario())
+
+def test_drain_gives_up_after_grace(server_state):
+    server_state.in_flight = 1
+    asyncio.run(asyncio.wait_for(api_server.drain(delay=0, grace=0.2), 2))
+    assert server_state.draining
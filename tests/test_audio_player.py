@@ -0,0 +1,38 @@
+import sys
+import time
+
+import audio_player
+from audio_player import AudioPlayer
+
+def _sleeping_player(monkeypatch, seconds):
+    """Stand in for mpg123 with a process that 'plays' for `seconds`"""
+    command = [sys.executable, '-c', f'import time; time.sleep({seconds})']
+    monkeypatch.setattr(audio_player, '_player_command', lambda filepath: command)
+
+def test_clips_play_in_order_without_blocking(monkeypatch):
+    _sleeping_player(monkeypatch, 0.05)
+    player = AudioPlayer()
+    finished = []
+    start = time.perf_counter()
+    items = [player.play(name, on_complete=lambda item: finished.append(item.filepath)) for name in ('a', 'b')]
+    assert time.perf_counter() - start < 0.05
+
+    assert player.wait(timeout=10)
+    assert finished == ['a', 'b']
+    assert [item.returncode for item in items] == [0, 0]
+    assert not player.is_playing()
+
+def test_stop_cuts_off_the_current_clip_and_drops_the_queue(monkeypatch):
+    _sleeping_player(monkeypatch, 10)
+    player = AudioPlayer()
+    current = player.play('a')
+    queued = player.play('b')
+    while not player._process:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    player.stop()
+    assert current.wait(timeout=5) and queued.wait(timeout=5)
+    assert time.perf_counter() - start < 5
+    assert current.cancelled and queued.cancelled
+    assert queued.returncode is None
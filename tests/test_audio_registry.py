@@ -0,0 +1,67 @@
+import os
+
+import speak
+from audio_registry import AudioArtifact, AudioRegistry, mp3_duration
+from tts_cache import AudioCache
+
+# MPEG-1 Layer III frame header at 128 kbps, so 16000 bytes is one second
+_FRAME_HEADER = b'\xff\xfb\x90\x00'
+
+def test_mp3_duration_from_the_frame_header():
+    assert mp3_duration(_FRAME_HEADER + b'\0' * 15996) == 1.0
+    # An ID3 tag in front of the audio doesn't count
+    tag = b'ID3\x04\x00\x00\x00\x00\x00\x0a' + b'\0' * 10
+    assert mp3_duration(tag + _FRAME_HEADER + b'\0' * 7996) == 0.5
+    assert mp3_duration(b'not audio') is None
+
+def test_artifact_works_as_a_path(tmp_path):
+    path = tmp_path / 'reply.mp3'
+    path.write_bytes(_FRAME_HEADER + b'\0' * 31996)
+    artifact = AudioArtifact(str(path))
+    assert os.fspath(artifact) == str(path)
+    assert os.path.exists(artifact)
+    assert artifact.duration == 2.0
+    assert artifact.mime_type == 'audio/mpeg'
+    # The bytes are kept after the first read
+    path.unlink()
+    assert len(artifact.data) == 32000
+
+def test_registry_drops_the_oldest_mappings(tmp_path):
+    registry = AudioRegistry(max_entries=2)
+    for message_id in ('a', 'b', 'c'):
+        path = tmp_path / f"{message_id}.mp3"
+        path.write_bytes(b"audio")
+        assert registry.register(message_id, AudioArtifact(str(path)))
+    assert registry.get('a') is None
+    assert str(registry.get('c')) == str(tmp_path / 'c.mp3')
+    registry.remove('c')
+    assert len(registry) == 1
+    assert not registry.register('d', AudioArtifact(str(tmp_path / 'missing.mp3')))
+
+def test_registry_keeps_the_bytes_within_its_budget(tmp_path):
+    registry = AudioRegistry(max_bytes=250)
+    for message_id in ('a', 'b', 'c'):
+        path = tmp_path / f"{message_id}.mp3"
+        path.write_bytes(message_id.encode() * 100)
+        registry.register(message_id, AudioArtifact(str(path)))
+    assert registry.get('a') is None
+    assert len(registry) == 2
+
+def test_registered_audio_survives_cache_eviction(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=150)
+    registry = AudioRegistry()
+    for text in ("first", "second"):
+        temp = cache.temp_path()
+        with open(temp, 'wb') as f:
+            f.write(text.encode() * 20)
+        registry.register(text, AudioArtifact(cache.put(AudioCache.key(text, 'en'), temp)))
+
+    # The cache evicted the first file, but its message still has the audio
+    assert not os.path.exists(registry.get("first").path)
+    assert registry.get("first").data == b"first" * 20
+
+def test_speak_returns_an_artifact(audio_cache, fake_gtts, monkeypatch):
+    monkeypatch.setattr(speak, 'play_audio', lambda filepath: None)
+    artifact = speak.speak("Hello there", 'en')
+    assert isinstance(artifact, AudioArtifact)
+    assert artifact.data == b"Hello there"
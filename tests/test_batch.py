@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+
+import speech_recognition as sr
+
+import batch
+from batch import completed_ids, process_record, run_batch
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'two_phrases.wav')
+
+def _results(path):
+    results = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                pass
+    return results
+
+def test_csv_records_are_answered_in_input_order(groq_standin, tmp_path):
+    input_path = tmp_path / 'input.csv'
+    input_path.write_text("id,text,lang\n" + ''.join(f"q{i},Question {i}?,en\n" for i in range(10)),
+                          encoding='utf-8')
+    output_path = tmp_path / 'output.jsonl'
+
+    summary = run_batch(str(input_path), str(output_path), concurrency=4, progress_interval=60)
+
+    results = _results(output_path)
+    assert [result['id'] for result in results] == [f"q{i}" for i in range(10)]
+    assert all(result['status'] == 'ok' for result in results)
+    assert results[3]['reply'] == groq_standin.reply_for([{'role': 'user', 'content': "Question 3?"}])
+    assert (summary['processed'], summary['errors']) == (10, 0)
+    assert set(summary['stages']) == {'chat'}
+    assert groq_standin.requests == 10
+
+def test_unordered_mode_writes_every_result(groq_standin, tmp_path):
+    input_path = tmp_path / 'input.jsonl'
+    input_path.write_text(''.join(json.dumps({'text': f"Question {i}?", 'lang': 'en'}) + '\n' for i in range(6)),
+                          encoding='utf-8')
+    output_path = tmp_path / 'output.jsonl'
+    run_batch(str(input_path), str(output_path), concurrency=3, ordered=False, progress_interval=60)
+    # Records without an id are numbered by position
+    assert sorted(result['id'] for result in _results(output_path)) == [str(i) for i in range(6)]
+
+def test_ordered_mode_stops_reading_behind_a_slow_record(tmp_path, monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def fake_process_record(record, tts=False, priority=None):
+        started.append(record['id'])
+        if record['id'] == '0':
+            release.wait(5)
+        return {'id': record['id'], 'status': 'ok', 'timings_ms': {}}
+
+    monkeypatch.setattr(batch, 'process_record', fake_process_record)
+    input_path = tmp_path / 'input.jsonl'
+    input_path.write_text(''.join(json.dumps({'id': str(i), 'text': "Hi"}) + '\n' for i in range(20)),
+                          encoding='utf-8')
+    output_path = tmp_path / 'output.jsonl'
+    runner = threading.Thread(target=run_batch, args=(str(input_path), str(output_path)),
+                              kwargs={'concurrency': 2, 'progress_interval': 60})
+    runner.start()
+    time.sleep(0.3)
+    # Results finished behind record 0 count toward the window of twice the concurrency
+    assert len(started) == 4
+    release.set()
+    runner.join(5)
+    assert [result['id'] for result in _results(output_path)] == [str(i) for i in range(20)]
+
+def test_failed_records_are_reported(groq_standin, tmp_path, monkeypatch):
+    groq_standin.error_rate = 1.0
+    monkeypatch.setattr('groq_chat.backoff_delay', lambda attempt: 0)
+    input_path = tmp_path / 'input.jsonl'
+    input_path.write_text(json.dumps({'id': 'a', 'text': "Hello?", 'lang': 'en'}) + '\n'
+                          + json.dumps({'id': 'b', 'lang': 'en'}) + '\n', encoding='utf-8')
+    output_path = tmp_path / 'output.jsonl'
+
+    summary = run_batch(str(input_path), str(output_path), progress_interval=60)
+
+    assert summary['errors'] == 2
+    results = _results(output_path)
+    assert [result['status'] for result in results] == ['error', 'error']
+    assert "no text" in results[1]['error']
+    assert completed_ids(str(output_path)) == set()
+
+def test_resume_skips_completed_records(groq_standin, tmp_path):
+    input_path = tmp_path / 'input.jsonl'
+    input_path.write_text(''.join(json.dumps({'id': str(i), 'text': f"Question {i}?", 'lang': 'en'}) + '\n'
+                                  for i in range(4)), encoding='utf-8')
+    # 0 succeeded, 1 failed, and the run died while writing 2
+    output_path = tmp_path / 'output.jsonl'
+    output_path.write_text(json.dumps({'id': '0', 'status': 'ok'}) + '\n'
+                           + json.dumps({'id': '1', 'status': 'error'}) + '\n'
+                           + '{"id": "2", "sta', encoding='utf-8')
+    assert completed_ids(str(output_path)) == {'0'}
+
+    summary = run_batch(str(input_path), str(output_path), concurrency=2, resume=True, progress_interval=60)
+
+    assert (summary['processed'], summary['skipped'], summary['errors']) == (3, 1, 0)
+    assert groq_standin.requests == 3
+    assert completed_ids(str(output_path)) == {'0', '1', '2', '3'}
+    # The failed and the cut-off lines were replaced, not appended to
+    assert [result['id'] for result in _results(output_path)] == ['0', '1', '2', '3']
+    assert all(result['status'] == 'ok' for result in _results(output_path))
+
+    # Nothing is left to do
+    summary = run_batch(str(input_path), str(output_path), resume=True, progress_interval=60)
+    assert (summary['processed'], summary['skipped']) == (0, 4)
+    assert groq_standin.requests == 3
+
+def test_audio_is_transcribed_in_the_record_language(groq_standin, monkeypatch):
+    languages = []
+
+    def recognize_google(self, audio, language='en-US', **kwargs):
+        languages.append(language)
+        return "नमस्ते, आप कैसे हैं?"
+
+    monkeypatch.setattr(sr.Recognizer, 'recognize_google', recognize_google)
+    result = process_record({'id': '1', 'audio': FIXTURE, 'lang': 'hi'})
+
+    assert result['status'] == 'ok'
+    assert result['transcript'] == "नमस्ते, आप कैसे हैं?"
+    assert languages == ['hi-IN']
@@ -0,0 +1,57 @@
+import groq_chat
+from conversation_memory import Conversation, count_message_tokens, count_tokens, extractive_summary
+
+_SYSTEM = {'role': 'system', 'content': "You are a helpful assistant."}
+
+def test_token_estimate_errs_high():
+    assert count_tokens("") == 0
+    # The real tokenizers use 1-2 tokens for these
+    assert count_tokens("conversation") == 3
+    assert count_tokens("1234567") == 3
+    assert count_tokens("नमस्ते") == 6
+
+def test_recent_turns_are_replayed_verbatim():
+    conversation = Conversation(budget=1000, summarizer=extractive_summary, background=False)
+    conversation.add_turn("My name is Asha.", "Nice to meet you, Asha.")
+    messages = conversation.with_context([_SYSTEM, {'role': 'user', 'content': "What is my name?"}])
+    assert [message['role'] for message in messages] == ['system', 'user', 'assistant', 'user']
+    assert messages[1]['content'] == "My name is Asha."
+
+def test_long_conversations_stay_within_the_budget():
+    conversation = Conversation(budget=400, summary_tokens=100, summarizer=extractive_summary, background=False)
+    for i in range(50):
+        conversation.add_turn(f"Question {i}: tell me something about the weather today.",
+                              f"Answer {i}. It is sunny with a light breeze and no rain expected.")
+        messages = conversation.with_context([_SYSTEM, {'role': 'user', 'content': "And tomorrow?"}])
+        assert count_message_tokens(messages) <= 400
+
+    stats = conversation.stats()
+    assert stats['summaries'] > 0
+    assert stats['summarized_turns'] + stats['verbatim_turns'] == 50
+    assert "Question 49" in messages[-3]['content']
+    assert "Summary of the conversation so far" in messages[0]['content']
+
+def test_ask_groq_adds_the_exchange_to_the_history(groq_standin):
+    conversation = Conversation(summarizer=extractive_summary, background=False)
+    reply = groq_chat.ask_groq("My name is Asha.", retry_count=0, history=conversation)
+    assert conversation.stats()['turns'] == 1
+    messages = conversation.with_context([_SYSTEM, {'role': 'user', 'content': "What is my name?"}])
+    assert messages[2]['content'] == reply
+
+def test_failed_replies_are_not_remembered(groq_standin):
+    groq_standin.error_rate = 1.0
+    conversation = Conversation(summarizer=extractive_summary, background=False)
+    groq_chat.ask_groq("My name is Asha.", retry_count=0, history=conversation)
+    assert conversation.empty
+
+def test_streamed_reply_is_remembered_only_once_read_to_the_end(groq_standin):
+    conversation = Conversation(summarizer=extractive_summary, background=False)
+    tokens = groq_chat.process_chat_stream("My name is Asha.", history=conversation)
+    next(tokens)
+    # The caller gave up on the reply, e.g. because its job was discarded
+    tokens.close()
+    assert conversation.empty
+
+    reply = ''.join(groq_chat.process_chat_stream("My name is Asha.", history=conversation))
+    assert conversation.stats()['turns'] == 1
+    assert reply == groq_standin.reply_for([{'role': 'user', 'content': "My name is Asha."}])
@@ -0,0 +1,48 @@
+import detect_language
+from detect_language import classify_script, script_candidates
+
+def test_script_settles_hindi_japanese_and_korean():
+    assert classify_script("नमस्ते, आप कैसे हैं?") == 'hi'
+    assert classify_script("今日は良い天気ですね") == 'ja'
+    assert classify_script("안녕하세요") == 'ko'
+    # Several languages share these scripts
+    assert classify_script("你好，今天天气很好") is None
+    assert classify_script("مرحبا كيف حالك") is None
+    assert classify_script("Привет, как дела?") is None
+
+def test_shared_scripts_are_detected_among_their_languages():
+    assert script_candidates("Привет, как дела?") == ('ru', 'uk', 'bg')
+    assert detect_language.detect_language("Привет, как дела?") == 'ru'
+    assert detect_language.detect_language("Привіт, як справи?") == 'uk'
+    assert detect_language.detect_language("مرحبا كيف حالك") == 'ar'
+    assert detect_language.detect_language("سلام، حال شما چطور است؟") == 'fa'
+    assert detect_language.detect_language("你好，今天天气很好") == 'zh-cn'
+    # Short texts stay within the script's languages
+    assert detect_language.detect_language("Да") in ('ru', 'uk', 'bg')
+
+def test_latin_text_is_left_to_langdetect():
+    assert classify_script("Hello, how are you?") is None
+    # A stray foreign word doesn't outweigh the Latin text around it
+    assert classify_script("The word for hello in Russian is привет") is None
+    assert script_candidates("The word for hello in Russian is привет") is None
+
+def test_detection_is_memoized():
+    detect_language._detect_language_cached.cache_clear()
+    assert detect_language.detect_language("Bonjour, comment allez-vous aujourd'hui ?") == 'fr'
+    assert detect_language.detect_language("Bonjour, comment allez-vous aujourd'hui ?") == 'fr'
+    assert detect_language._detect_language_cached.cache_info().hits == 1
+
+def test_invalid_input_falls_back_to_english():
+    assert detect_language.detect_language("") == 'en'
+    assert detect_language.detect_language(None) == 'en'
+
+_BATCH = ["Hello, how are you today?", "नमस्ते, आप कैसे हैं?", "Bonjour, comment allez-vous aujourd'hui ?",
+          "Hello, how are you today?", "", None, "¿Dónde está la estación de tren más cercana?"]
+
+def test_batch_matches_one_at_a_time():
+    expected = [detect_language.detect_language(text) for text in _BATCH]
+    assert detect_language.detect_languages(_BATCH) == expected == ['en', 'hi', 'fr', 'en', 'en', 'en', 'es']
+
+def test_batch_over_a_process_pool_keeps_the_order():
+    expected = [detect_language.detect_language(text) for text in _BATCH]
+    assert detect_language.detect_languages(_BATCH, processes=2, chunksize=2) == expected
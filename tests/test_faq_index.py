@@ -0,0 +1,105 @@
+import groq_chat
+from faq_index import FaqIndex
+
+def test_reworded_question_reuses_the_reply():
+    index = FaqIndex(threshold=0.8)
+    index.add("What time does the store open?", 'en', "At nine.")
+    assert index.lookup("what time does the store open", 'en') == "At nine."
+    assert index.lookup("what time does the store open today", 'en') == "At nine."
+    assert index.lookup("How do solar panels work?", 'en') is None
+    # Each language has its own index
+    assert index.lookup("What time does the store open?", 'hi') is None
+    assert index.stats()['hits'] == 2
+
+def test_entries_are_persisted(tmp_path):
+    path = str(tmp_path / 'faq.db')
+    index = FaqIndex(db_path=path)
+    index.add_many([("What time does the store open?", 'en', "At nine."),
+                    ("How do solar panels work?", 'en', "With photovoltaic cells.")])
+    index.close()
+
+    reloaded = FaqIndex(db_path=path)
+    assert reloaded.stats()['entries'] == {'en': 2}
+    assert reloaded.lookup("how do solar panels work", 'en') == "With photovoltaic cells."
+    reloaded.close()
+
+def test_process_chat_answers_near_duplicates_from_the_index(groq_standin, monkeypatch):
+    index = FaqIndex()
+    monkeypatch.setattr(groq_chat, 'get_faq_index', lambda: index)
+    first = groq_chat.process_chat("What is the capital of France?", use_faq=True)
+    again = groq_chat.process_chat("what is the capital of france", use_faq=True)
+    assert first == again == groq_standin.reply_for([{'role': 'user', 'content': "What is the capital of France?"}])
+    assert groq_standin.requests == 1
+
+def test_failure_messages_are_not_indexed(groq_standin, monkeypatch):
+    groq_standin.error_rate = 1.0
+    index = FaqIndex()
+    monkeypatch.setattr(groq_chat, 'get_faq_index', lambda: index)
+    monkeypatch.setattr(groq_chat, 'backoff_delay', lambda attempt: 0)
+    groq_chat.process_chat("What is the capital of France?", use_faq=True)
+    assert index.stats()['added'] == 0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / 'faq.db')
+    index = FaqIndex(threshold=0.8, db_path=path, max_entries=2)
+    index.add("What time does the store open?", 'en', "At nine.")
+    index.add("How do solar panels work?", 'en', "With photovoltaic cells.")
+    # A hit makes the first entry the most recently used one
+    assert index.lookup("what time does the store open", 'en') == "At nine."
+    index.add("Where is the nearest station?", 'en', "Two streets away.")
+
+    assert index.lookup("How do solar panels work?", 'en') is None
+    assert index.lookup("What time does the store open?", 'en') == "At nine."
+    assert index.stats()['evicted'] == 1
+    assert index.stats()['entries'] == {'en': 2}
+    index.close()
+
+    # Evicted entries are gone from the database too
+    reloaded = FaqIndex(threshold=0.8, db_path=path, max_entries=2)
+    assert reloaded.stats()['entries'] == {'en': 2}
+    assert reloaded.lookup("How do solar panels work?", 'en') is None
+    reloaded.close()
+
+def test_freed_slots_are_reused():
+    index = FaqIndex(max_entries=1)
+    for i in range(50):
+        index.add(f"Question number {i} about the weather", 'en', f"Reply {i}")
+    assert index.lookup("Question number 49 about the weather", 'en') == "Reply 49"
+    # Eviction runs right after each insert, so the index never grows past one spare slot
+    assert index._indexes['en'].slots == 2
+
+def _consume(stream):
+    pieces = []
+    while True:
+        try:
+            pieces.append(next(stream))
+        except StopIteration as stop:
+            return ''.join(pieces), stop.value
+
+def test_complete_stream_is_added_to_faq(groq_standin, monkeypatch):
+    index = FaqIndex()
+    monkeypatch.setattr(groq_chat, 'get_faq_index', lambda: index)
+    reply, finished = _consume(groq_chat.process_chat_stream("What is the capital of France?", use_faq=True,
+                                                             use_cache=False))
+    assert finished is True
+    assert reply == groq_standin.reply_for([{'role': 'user', 'content': "What is the capital of France?"}])
+    assert index.stats()['added'] == 1
+
+def test_broken_stream_is_not_added_to_faq(groq_standin, monkeypatch):
+    groq_standin.break_rate = 1.0
+    index = FaqIndex()
+    monkeypatch.setattr(groq_chat, 'get_faq_index', lambda: index)
+    reply, finished = _consume(groq_chat.process_chat_stream("What is the capital of France?", use_faq=True,
+                                                             use_cache=False))
+    assert finished is False
+    assert reply and groq_standin.broken == 1
+    assert index.stats()['added'] == 0
+
+def test_paraphrases_in_other_words_are_not_matched():
+    index = FaqIndex(threshold=0.8)
+    index.add("What time are you open?", 'en', "From nine to five.")
+    assert index.lookup("What are your hours?", 'en') is None
+    assert index.similarity("What time are you open?", "What are your hours?") < 0.5
+    # Surface rewordings still are
+    assert index.lookup("what time are you open", 'en') == "From nine to five."
@@ -0,0 +1,23 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from audio_registry import AudioArtifact, get_audio_registry
+
+FRONTEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'frontend.py')
+
+def test_chat_audio_is_served_as_media_not_inlined(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clip = tmp_path / 'reply.mp3'
+    clip.write_bytes(b'\xff\xfb' + b'\0' * 4096)
+
+    get_audio_registry().register('reply', AudioArtifact(str(clip)))
+    app = AppTest.from_file(FRONTEND)
+    app.session_state['messages'] = [{'id': 'reply', 'role': 'assistant', 'content': "Hello!", 'language': 'en'}]
+    app.run()
+    get_audio_registry().remove('reply')
+
+    assert not app.exception
+    audio = app.get('audio')
+    assert len(audio) == 1 and '/media/' in audio[0].proto.url
+    assert not any('base64' in markdown.value for markdown in app.markdown)
@@ -0,0 +1,63 @@
+import time
+
+import groq_chat
+
+def _connections_opened(client):
+    pools = client.session.get_adapter(client.url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+def test_requests_reuse_one_keep_alive_connection(groq_standin):
+    client = groq_chat.get_groq_client()
+    payload = {'model': groq_chat.GROQ_MODELS[0], 'messages': [{'role': 'user', 'content': "Hi"}]}
+    timings = [client.post_chat(payload).timings for _ in range(3)]
+
+    assert _connections_opened(client) == 1
+    assert {'connect_ms', 'ttfb_ms', 'total_ms'} <= set(timings[0])
+    assert timings[1]['connect_ms'] == timings[2]['connect_ms'] == 0.0
+
+def test_warmup_opens_connections_ahead_of_time(groq_standin):
+    client = groq_chat.get_groq_client()
+    client.warmup(connections=2)
+    # Warmup requests that finish before the next one starts share a connection
+    assert 1 <= _connections_opened(client) <= 2
+    assert groq_standin.requests == 0
+
+    payload = {'model': groq_chat.GROQ_MODELS[0], 'messages': [{'role': 'user', 'content': "Hi"}]}
+    assert client.post_chat(payload).timings['connect_ms'] == 0.0
+
+def test_ask_groq_uses_the_shared_client(groq_standin):
+    for question in ("What is the capital of France?", "And of Spain?"):
+        reply = groq_chat.ask_groq(question, retry_count=0)
+        assert reply == groq_standin.reply_for([{'role': 'user', 'content': question}])
+    assert groq_standin.requests == 2
+    assert _connections_opened(groq_chat.get_groq_client()) == 1
+
+def test_every_model_is_tried_before_giving_up(groq_standin):
+    groq_standin.error_rate = 1.0
+    reply = groq_chat.ask_groq("Hello?", retry_count=0)
+    assert "couldn't get a response" in reply
+    assert groq_standin.requests == len(groq_chat.GROQ_MODELS)
+
+def test_missing_api_key(monkeypatch):
+    monkeypatch.setattr(groq_chat, '_client', groq_chat.GroqClient(api_key=None))
+    assert "API key" in groq_chat.ask_groq("Hello?")
+
+def test_stream_yields_tokens_as_they_arrive(groq_standin):
+    groq_standin.token_interval = 0.05
+    groq_standin.reply_words = 8
+    start = time.perf_counter()
+    tokens = []
+    for token in groq_chat.ask_groq_stream("one two three four five", retry_count=0):
+        if not tokens:
+            first_token = time.perf_counter() - start
+        tokens.append(token)
+    total = time.perf_counter() - start
+
+    assert "".join(tokens) == groq_standin.reply_for([{'role': 'user', 'content': "one two three four five"}])
+    assert len(tokens) == 8
+    assert first_token < 0.2 < total
+
+def test_stream_falls_back_to_the_failure_message(groq_standin):
+    groq_standin.error_rate = 1.0
+    assert list(groq_chat.ask_groq_stream("Hello?", retry_count=0)) == [groq_chat._failure_message('en')]
+    assert groq_standin.requests == len(groq_chat.GROQ_MODELS)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import groq_chat
+import groq_hedge
+
+def test_ask_groq_hedges_a_slow_model(groq_standin, monkeypatch):
+    groq_standin.latency = 0.3
+    monkeypatch.setattr(groq_hedge, 'DEFAULT_POLICY', groq_hedge.HedgePolicy(budget=0.05, max_parallel=2))
+    groq_hedge.reset_hedge_stats()
+
+    reply = groq_chat.ask_groq("Why is the sky blue?", hedge=True)
+    assert reply == groq_standin.reply_for([{'role': 'user', 'content': "Why is the sky blue?"}])
+
+    stats = groq_hedge.get_hedge_stats()
+    assert stats['requests'] == 1
+    assert stats['hedges_fired'] == 1
+    assert stats['primary_wins'] + stats['hedge_wins'] == 1
+    assert groq_standin.requests == 2
+
+def test_ask_groq_without_hedging_asks_one_model(groq_standin):
+    groq_standin.latency = 0.1
+    groq_hedge.reset_hedge_stats()
+
+    reply = groq_chat.ask_groq("Why is the sky blue?", hedge=False)
+    assert reply == groq_standin.reply_for([{'role': 'user', 'content': "Why is the sky blue?"}])
+    assert groq_hedge.get_hedge_stats()['requests'] == 0
+    assert groq_standin.requests == 1
+
+def test_fast_primary_is_not_hedged(groq_standin):
+    groq_hedge.reset_hedge_stats()
+    policy = groq_hedge.HedgePolicy(budget=1.0, retry_count=0)
+
+    reply = asyncio.run(groq_hedge.ask_groq_hedged("Hi", policy=policy))
+    assert reply == groq_standin.reply_for([{'role': 'user', 'content': "Hi"}])
+    stats = groq_hedge.get_hedge_stats()
+    assert (stats['hedges_fired'], stats['primary_wins']) == (0, 1)
+    assert groq_standin.requests == 1
+
+def test_failed_models_fall_back_to_the_next_one(groq_standin):
+    groq_standin.error_rate = 1.0
+    groq_hedge.reset_hedge_stats()
+    policy = groq_hedge.HedgePolicy(budget=1.0, retry_count=0)
+
+    assert groq_hedge.ask_groq_hedged_sync("Hi", policy=policy) == groq_chat._failure_message('en')
+    assert groq_standin.requests == len(groq_chat.GROQ_MODELS)
+    assert groq_hedge.get_hedge_stats()['failures'] == 1
+
+def test_cancelled_hedge_is_not_a_model_failure(groq_standin, health, monkeypatch):
+    groq_standin.latency = 0.3
+    monkeypatch.setattr(groq_hedge, 'DEFAULT_POLICY', groq_hedge.HedgePolicy(budget=0.05, max_parallel=2))
+
+    assert groq_chat.ask_groq("Why is the sky blue?", hedge=True, retry_count=0)
+    # Let the loser's worker thread get its (closed) response back
+    time.sleep(0.5)
+    assert groq_standin.requests == 2
+    assert all(model['total_failures'] == 0 for model in health.snapshot().values())
+
+def test_ask_groq_inside_an_event_loop_tries_models_in_order(groq_standin):
+    groq_hedge.reset_hedge_stats()
+
+    async def handler():
+        # Blocking code called straight from a coroutine
+        return groq_chat.ask_groq("Hi", hedge=True), groq_hedge.ask_groq_hedged_sync("Hi there")
+
+    replies = asyncio.run(handler())
+    assert replies == (groq_standin.reply_for([{'role': 'user', 'content': "Hi"}]),
+                       groq_standin.reply_for([{'role': 'user', 'content': "Hi there"}]))
+    assert groq_hedge.get_hedge_stats()['requests'] == 0
+
+def test_ask_groq_hedged_can_be_awaited_from_a_running_loop(groq_standin):
+    groq_hedge.reset_hedge_stats()
+    policy = groq_hedge.HedgePolicy(budget=1.0, retry_count=0)
+
+    async def handler():
+        return await asyncio.gather(*(groq_hedge.ask_groq_hedged(f"Question {i}", policy=policy, use_cache=False)
+                                      for i in range(3)))
+
+    replies = asyncio.run(handler())
+    assert replies == [groq_standin.reply_for([{'role': 'user', 'content': f"Question {i}"}]) for i in range(3)]
+    assert groq_hedge.get_hedge_stats()['requests'] == 3
+
+def test_ask_model_records_the_outcome(groq_standin, health):
+    client = groq_chat.get_groq_client()
+    messages = groq_chat._build_messages("Hello", 'en')
+    model = groq_chat.GROQ_MODELS[0]
+    assert groq_chat.ask_model(client, model, messages) == groq_standin.reply_for(messages)
+
+    groq_standin.error_rate = 1.0
+    assert groq_chat.ask_model(client, model, messages) is None
+    assert (health.snapshot()[model]['total_requests'], health.snapshot()[model]['total_failures']) == (2, 1)
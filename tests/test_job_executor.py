@@ -0,0 +1,74 @@
+import threading
+import time
+
+from job_executor import DONE, FAILED, JobExecutor
+
+def _wait_until_finished(executor, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = executor.poll(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} didn't finish")
+
+def test_submit_returns_at_once_and_progress_can_be_polled():
+    executor = JobExecutor(max_workers=2)
+    release = threading.Event()
+
+    def work(job):
+        job.update(stage="working", partial_response="Hel")
+        release.wait(5)
+        return "Hello"
+
+    job_id = executor.submit(work, name="turn")
+    deadline = time.time() + 5
+    while executor.poll(job_id)['progress'].get('stage') != "working" and time.time() < deadline:
+        time.sleep(0.01)
+    job = executor.poll(job_id)
+    assert (job['name'], job['status'], job['progress']['partial_response']) == ("turn", 'running', "Hel")
+
+    release.set()
+    job = _wait_until_finished(executor, job_id)
+    assert (job['status'], job['result'], job['error']) == (DONE, "Hello", None)
+
+    executor.discard(job_id)
+    assert executor.poll(job_id) is None
+
+def test_failures_are_reported_not_raised():
+    executor = JobExecutor(max_workers=1)
+
+    def work(job, text):
+        raise ValueError(f"bad input: {text}")
+
+    job = _wait_until_finished(executor, executor.submit(work, "hi"))
+    assert (job['status'], job['error']) == (FAILED, "bad input: hi")
+    assert executor.stats()[FAILED] == 1
+
+def test_finished_jobs_expire_after_the_retention_period():
+    executor = JobExecutor(max_workers=1, retention=0)
+    first = executor.submit(lambda job: 1)
+    _wait_until_finished(executor, first)
+    executor.submit(lambda job: 2)
+    assert executor.poll(first) is None
+
+def test_discarded_jobs_stop_at_their_next_check():
+    executor = JobExecutor(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    reached = []
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        reached.append("second stage")
+
+    running = executor.submit(work)
+    queued = executor.submit(lambda job: reached.append("queued job"))
+    started.wait(5)
+    executor.discard(running)
+    executor.discard(queued)
+    release.set()
+    # One worker, so once this job has run the two before it are over
+    _wait_until_finished(executor, executor.submit(lambda job: None))
+    assert reached == []
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import speech_recognition as sr
+
+import listen
+from listen import BackgroundListener, PhraseSegmenter
+
+# Synthetic recording, 8 kHz: 1s of noise, a phrase of three word groups 0.4s apart,
+# a 0.05s click, and a phrase of one word group, each followed by 1.5s of noise
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'two_phrases.wav')
+
+RATE = 8000
+
+def _pcm(*parts):
+    """16-bit PCM from (seconds, amplitude) parts of noise at that level"""
+    rng = np.random.default_rng(0)
+    samples = [rng.normal(0, amplitude, int(seconds * RATE)) for seconds, amplitude in parts]
+    return np.concatenate(samples).clip(-32768, 32767).astype(np.int16).tobytes()
+
+def _phrases(**options):
+    listener = BackgroundListener(source=sr.AudioFile(FIXTURE), calibration_seconds=0.5, **options).start()
+    phrases = []
+    while True:
+        phrase = listener.next_phrase(timeout=10)
+        if phrase is None:
+            break
+        phrases.append(phrase)
+    listener.stop()
+    return listener, phrases
+
+def test_listener_cuts_the_recording_into_phrases():
+    listener, phrases = _phrases()
+    # The click between the phrases doesn't make a phrase of its own
+    assert len(phrases) == 2
+    assert all(isinstance(phrase, sr.AudioData) for phrase in phrases)
+    assert len(phrases[0].frame_data) > len(phrases[1].frame_data)
+    assert listener.stats()['phrases'] == 2
+    assert listener.stats()['queued'] == 0
+
+def test_muted_audio_is_dropped():
+    listener, phrases = _phrases(mute_while=lambda: True)
+    assert phrases == []
+    assert listener.stats()['muted_seconds'] > 9
+
+def test_oldest_phrases_are_dropped_when_nobody_collects_them():
+    listener = BackgroundListener(source=sr.AudioFile(FIXTURE), calibration_seconds=0.5, max_queued=2).start()
+    listener._thread.join(timeout=10)
+    # Two phrases and the end-of-capture marker went through a queue of two
+    assert listener.stats()['dropped'] == 1
+    assert len(listener.next_phrase(timeout=1).frame_data) < len(_phrases()[1][0].frame_data)
+    assert listener.next_phrase(timeout=1) is None
+
+def test_segmenter_keeps_the_onset_and_ends_on_silence():
+    segmenter = PhraseSegmenter(RATE, 2, pause_seconds=0.3, pre_roll_seconds=0.2)
+    segmenter.calibrate([_pcm((0.5, 50))])
+    phrases = segmenter.push(_pcm((0.5, 50), (0.6, 3000), (0.5, 50)))
+
+    assert len(phrases) == 1
+    seconds = segmenter.seconds(phrases[0])
+    # Speech, plus the pre-roll before it and the pause after it
+    assert 0.6 + 0.3 <= seconds <= 0.6 + 0.2 + 0.3 + 0.35
+
+def test_segmenter_ignores_clicks():
+    segmenter = PhraseSegmenter(RATE, 2)
+    segmenter.calibrate([_pcm((0.5, 50))])
+    assert segmenter.push(_pcm((0.5, 50), (0.03, 5000), (1.5, 50))) == []
+    assert not segmenter.in_phrase
+
+def test_segmenter_raises_the_floor_for_steady_noise():
+    segmenter = PhraseSegmenter(RATE, 2, steady_seconds=1.0)
+    segmenter.calibrate([_pcm((0.5, 50))])
+    # A fan switches on and stays on: no phrase, and the floor follows it up
+    segmenter.push(_pcm((3.0, 1000)))
+    assert segmenter.noise_floor > 500
+    assert segmenter.flush() is None
+
+def test_listen_ignores_phrases_from_before_the_turn(monkeypatch):
+    listener = BackgroundListener(source=sr.AudioFile(FIXTURE), calibration_seconds=0.5).start()
+    listener._thread.join(timeout=10)
+    assert listener.stats()['queued'] == 2
+
+    monkeypatch.setattr(listen, 'PYAUDIO_AVAILABLE', True)
+    monkeypatch.setattr(listen, 'get_listener', lambda: listener)
+    monkeypatch.setattr('builtins.input', lambda *args: "typed")
+    assert listen.listen() == "typed"
+    assert listener.stats()['stale'] == 2
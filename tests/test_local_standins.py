@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import requests
+
+import bench_pipeline
+import speak
+from local_standins import GroqStandin, TTSStandin
+
+BENCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'bench_pipeline.py')
+
+def _chat(standin, text="Hello there", key='key-a', stream=False):
+    return requests.post(f"{standin.url}/openai/v1/chat/completions", timeout=5, stream=stream,
+                         headers={'Authorization': f'Bearer {key}'},
+                         json={'model': 'm', 'messages': [{'role': 'user', 'content': text}], 'stream': stream})
+
+def test_groq_standin_answers_like_groq():
+    with GroqStandin(token_interval=0.0, reply_words=10) as standin:
+        response = _chat(standin)
+        assert response.status_code == 200
+        assert response.json()['choices'][0]['message']['content'] == \
+            standin.reply_for([{'role': 'user', 'content': "Hello there"}])
+
+        events = [line for line in _chat(standin, stream=True).text.splitlines() if line.startswith('data: ')]
+        assert events[-1] == 'data: [DONE]'
+        words = [json.loads(line[6:])['choices'][0]['delta'].get('content', '') for line in events[:-1]]
+        assert "".join(words) == standin.reply_for([{'role': 'user', 'content': "Hello there"}])
+
+def test_groq_standin_injects_429s_and_errors():
+    with GroqStandin(rate_limit_rate=1.0, retry_after=0.5) as standin:
+        response = _chat(standin)
+        assert response.status_code == 429
+        assert response.headers['retry-after'] == "0.50"
+        assert standin.rate_limited == 1
+
+    with GroqStandin(error_rate=1.0) as standin:
+        assert _chat(standin).status_code == 500
+        assert standin.rate_limited == 0
+
+def test_groq_standin_breaks_streams_off_halfway():
+    with GroqStandin(token_interval=0.0, reply_words=10, break_rate=1.0) as standin:
+        response = _chat(standin, stream=True)
+        lines = []
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            for line in response.iter_lines():
+                lines.append(line)
+        assert b'data: [DONE]' not in lines
+        assert 0 < len([line for line in lines if line.startswith(b'data: ')]) < 10
+        assert standin.broken == 1
+
+def test_groq_standin_enforces_a_quota_per_key():
+    with GroqStandin(rpm=2) as standin:
+        first, second, third = (_chat(standin) for _ in range(3))
+        assert first.headers['x-ratelimit-remaining-requests'] == '1'
+        assert second.headers['x-ratelimit-remaining-requests'] == '0'
+        assert third.status_code == 429
+        assert 0 < float(third.headers['retry-after']) <= 60
+        # Every key has its own quota
+        assert _chat(standin, key='key-b').status_code == 200
+
+def test_speech_goes_to_the_tts_standin(audio_cache, monkeypatch):
+    with TTSStandin(words_per_second=2.0) as standin:
+        monkeypatch.setattr(speak, 'TTS_URL', standin.url)
+        path = speak.synthesize("One two three four", 'en')
+        with open(path, 'rb') as f:
+            assert f.read() == standin.audio_for("One two three four")
+        assert standin.requests == 1
+
+def test_bench_pipeline_reports_json(tmp_path):
+    output = tmp_path / 'bench.json'
+    env = {name: value for name, value in os.environ.items() if not name.startswith(('GROQ_', 'TTS_'))}
+    command = [sys.executable, BENCH, '--users', '2', '--turns', '2', '--languages', 'en,fr',
+               '--groq-latency', '0', '--token-interval', '0', '--translate-latency', '0', '--output', str(output)]
+    run = subprocess.run(command, capture_output=True, text=True, env=env, timeout=120)
+    assert run.returncode == 0, run.stderr
+
+    results = json.loads(run.stdout)
+    assert json.loads(output.read_text()) == results
+    assert {'config', 'turns', 'errors', 'seconds', 'stages', 'standins', 'coalescing', 'rate_limit'} <= set(results)
+    assert (results['turns'], results['errors']) == (4, 0)
+    assert results['standins']['groq']['requests'] >= 1
+    assert all(stage['count'] for stage in results['stages'].values())
+
+
+def test_bench_compare_flags_slower_stages():
+    results = {'stages': {'groq': {'p95_ms': 130.0}, 'translate': {'p95_ms': 10.0}}, 'turns_per_second': 5.0}
+    baseline = {'stages': {'groq': {'p95_ms': 100.0}, 'translate': {'p95_ms': 10.0}}, 'turns_per_second': 5.0}
+
+    comparison, regressions = bench_pipeline.compare(results, baseline, tolerance=0.2)
+    assert regressions == ['groq']
+    assert comparison['groq']['change'] == 0.3
+    assert bench_pipeline.compare(results, baseline, tolerance=0.5)[1] == []
@@ -0,0 +1,98 @@
+import time
+
+import requests
+
+import groq_chat
+import groq_hedge
+import model_health
+from model_health import CLOSED, HALF_OPEN, OPEN, ModelHealthRegistry
+
+def test_breaker_opens_probes_and_closes():
+    registry = ModelHealthRegistry(consecutive_failures=3, cooldown=0.05, max_cooldown=1.0)
+    for _ in range(2):
+        registry.record_failure('m', 0.1)
+    assert registry.allow_request('m')
+    registry.record_failure('m', 0.1)
+    assert registry.snapshot()['m']['state'] == OPEN
+    assert not registry.allow_request('m')
+
+    time.sleep(0.06)
+    # One probe after the cooldown, and only one
+    assert registry.allow_request('m')
+    assert registry.snapshot()['m']['state'] == HALF_OPEN
+    assert not registry.allow_request('m')
+
+    # A failed probe doubles the cooldown
+    registry.record_failure('m', 0.1)
+    time.sleep(0.06)
+    assert not registry.allow_request('m')
+    time.sleep(0.05)
+    assert registry.allow_request('m')
+
+    registry.record_success('m', 0.1)
+    assert registry.snapshot()['m']['state'] == CLOSED
+    assert registry.allow_request('m')
+
+def test_breaker_opens_on_error_rate():
+    registry = ModelHealthRegistry(consecutive_failures=100, min_requests=4, error_threshold=0.5)
+    for ok in (True, False, True):
+        registry.record_success('m', 0.1) if ok else registry.record_failure('m', 0.1)
+    assert registry.allow_request('m')
+    registry.record_failure('m', 0.1)
+    assert not registry.allow_request('m')
+
+def test_cancelled_probe_frees_the_slot():
+    registry = ModelHealthRegistry(consecutive_failures=1, cooldown=0.0)
+    registry.record_failure('m')
+    assert registry.allow_request('m')
+    registry.record_cancelled('m')
+    assert registry.allow_request('m')
+
+def test_failing_models_are_skipped_without_a_request(groq_standin, monkeypatch):
+    registry = ModelHealthRegistry(consecutive_failures=1, cooldown=60)
+    monkeypatch.setattr(model_health, '_registry', registry)
+    groq_standin.error_rate = 1.0
+
+    assert groq_chat.ask_groq("Hello?", retry_count=0) == groq_chat._failure_message('en')
+    assert groq_standin.requests == len(groq_chat.GROQ_MODELS)
+    assert all(health['state'] == OPEN for health in registry.snapshot().values())
+
+    groq_chat.ask_groq("Hello?", retry_count=0)
+    assert groq_standin.requests == len(groq_chat.GROQ_MODELS)
+
+def test_client_error_frees_the_probe_without_counting():
+    registry = ModelHealthRegistry(consecutive_failures=1, cooldown=0.0)
+    registry.record_failure('m')
+    assert registry.allow_request('m')
+    registry.record_client_error('m')
+    assert registry.snapshot()['m']['total_failures'] == 1
+    assert registry.allow_request('m')
+
+def test_only_server_errors_timeouts_and_connection_failures_count():
+    assert groq_chat._is_model_fault(status_code=503)
+    assert groq_chat._is_model_fault(requests.exceptions.ReadTimeout())
+    assert groq_chat._is_model_fault(requests.exceptions.ConnectionError())
+    assert groq_chat._is_model_fault(groq_chat.GroqAPIError(502, "Bad gateway"))
+    for status in (400, 401, 429):
+        assert not groq_chat._is_model_fault(status_code=status)
+    # What post_chat raises when no key had rate-limit capacity in time
+    assert not groq_chat._is_model_fault(groq_chat.GroqAPIError(429, "Timed out waiting for capacity"))
+    assert not groq_chat._is_model_fault(ValueError("Malformed reply"))
+
+def test_rate_limited_models_stay_closed(groq_standin, health, monkeypatch):
+    monkeypatch.setattr(groq_chat, 'GROQ_RATE_LIMIT_RETRIES', 0)
+    groq_standin.rate_limit_rate = 1.0
+
+    for _ in range(model_health.HEALTH_CONSECUTIVE_FAILURES + 1):
+        assert groq_chat.ask_groq("Hello?", retry_count=0) == groq_chat._failure_message('en')
+    snapshot = health.snapshot()
+    assert all(model['state'] == CLOSED and model['total_failures'] == 0 for model in snapshot.values())
+
+def test_rate_limited_hedges_are_not_model_failures(groq_standin, health, monkeypatch):
+    monkeypatch.setattr(groq_chat, 'GROQ_RATE_LIMIT_RETRIES', 0)
+    groq_standin.rate_limit_rate = 1.0
+    policy = groq_hedge.HedgePolicy(budget=0.01, max_parallel=2, retry_count=0)
+
+    assert groq_hedge.ask_groq_hedged_sync("Hello?", policy=policy) == groq_chat._failure_message('en')
+    assert groq_standin.rate_limited >= len(groq_chat.GROQ_MODELS)
+    assert all(model['total_failures'] == 0 for model in health.snapshot().values())
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import groq_chat
+from rate_limiter import BATCH, INTERACTIVE, RateLimitScheduler, RateLimitTimeout
+
+MODEL = groq_chat.GROQ_MODELS[0]
+
+def _response(status_code, **headers):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+def test_429_blocks_the_key_for_retry_after():
+    scheduler = RateLimitScheduler(['key'], rpm=1000, tpm=100000)
+    lease = scheduler.acquire(MODEL, 10)
+    assert scheduler.record(lease, _response(429, **{'retry-after': '0.2'})) == 0.2
+
+    start = time.monotonic()
+    scheduler.acquire(MODEL, 10)
+    assert time.monotonic() - start >= 0.18
+    stats = scheduler.stats()
+    assert stats['rate_limited'] == 1
+    assert stats['queued'] == 1
+
+def test_429_moves_requests_to_the_next_key():
+    scheduler = RateLimitScheduler(['first', 'second'], rpm=1000, tpm=100000)
+    lease = scheduler.acquire(MODEL, 10)
+    assert lease.api_key == 'first'
+    scheduler.record(lease, _response(429, **{'retry-after': '30'}))
+    for _ in range(3):
+        lease = scheduler.acquire(MODEL, 10, timeout=0.1)
+        assert lease.api_key == 'second'
+        scheduler.record(lease, _response(200))
+
+def test_gives_up_when_blocked_for_longer_than_the_wait():
+    scheduler = RateLimitScheduler(['key'], max_wait=0.1)
+    scheduler.record(scheduler.acquire(MODEL, 10), _response(429, **{'retry-after': '30'}))
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire(MODEL, 10)
+    assert scheduler.stats()['timeouts'] == 1
+
+def test_interactive_requests_go_before_batch():
+    scheduler = RateLimitScheduler(['key'], rpm=1000, tpm=100000)
+    scheduler.record(scheduler.acquire(MODEL, 10), _response(429, **{'retry-after': '0.2'}))
+    order = []
+
+    def acquire(priority):
+        scheduler.acquire(MODEL, 10, priority)
+        order.append(priority)
+
+    batch = threading.Thread(target=acquire, args=(BATCH,))
+    batch.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert order == [INTERACTIVE, BATCH]
+
+def test_client_requeues_after_a_429_from_the_standin(groq_standin):
+    groq_standin.rate_limit_rate = 1.0
+    groq_standin.retry_after = 0.1
+    client = groq_chat.GroqClient(api_key='test-key', base_url=groq_standin.url, rate_limit=True, timeout=5)
+    payload = groq_chat._build_payload(MODEL, [{'role': 'user', 'content': "Hello?"}])
+
+    start = time.perf_counter()
+    response = client.post_chat(payload)
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    attempts = groq_chat.GROQ_RATE_LIMIT_RETRIES + 1
+    assert response.status_code == 429
+    assert groq_standin.rate_limited == attempts
+    assert client.scheduler.stats()['rate_limited'] == attempts
+    # Every re-queue waited out the Retry-After
+    assert elapsed >= 0.1 * (attempts - 1)
+
+def test_unknown_quota_is_not_throttled():
+    scheduler = RateLimitScheduler(['key'], rpm=0, tpm=0)
+    start = time.monotonic()
+    for _ in range(200):
+        scheduler.record(scheduler.acquire(MODEL, 5000, timeout=0.05), _response(200))
+    assert time.monotonic() - start < 1.0
+    stats = scheduler.stats()
+    assert stats['queued'] == 0
+    assert stats['keys']['key1']['models'][MODEL]['tokens_per_minute'] is None
+
+def test_headers_start_the_token_bucket():
+    scheduler = RateLimitScheduler(['key'], rpm=0, tpm=0)
+    headers = {'x-ratelimit-limit-tokens': '6000', 'x-ratelimit-remaining-tokens': '0',
+               'x-ratelimit-reset-tokens': '60s'}
+    scheduler.record(scheduler.acquire(MODEL, 10), _response(200, **headers))
+    assert scheduler.stats()['keys']['key1']['models'][MODEL]['tokens_per_minute'] == 6000
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire(MODEL, 500, timeout=0.1)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import groq_chat
+from single_flight import SingleFlight
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def _run(threads):
+    for thread in threads:
+        thread.start()
+    return threads
+
+def test_identical_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        return "reply"
+
+    results = []
+    threads = _run([threading.Thread(target=lambda: results.append(flights.do('key', upstream)))
+                    for _ in range(5)])
+    _wait_for(lambda: flights.stats()['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["reply"] * 5
+    assert flights.in_flight() == 0
+    # Nothing is cached once the call finished
+    assert flights.do('key', lambda: "fresh") == "fresh"
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def upstream():
+        release.wait(2)
+        raise RuntimeError("upstream failed")
+
+    errors = []
+
+    def call():
+        try:
+            flights.do('key', upstream)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = _run([threading.Thread(target=call) for _ in range(3)])
+    _wait_for(lambda: flights.stats()['coalesced'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ["upstream failed"] * 3
+
+def test_follower_gives_up_after_the_timeout():
+    flights = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = _run([threading.Thread(target=flights.do, args=('key', lambda: release.wait(2)))])[0]
+    _wait_for(lambda: flights.in_flight() == 1)
+
+    assert flights.do('key', lambda: "own call") == "own call"
+    assert flights.stats()['timeouts'] == 1
+    release.set()
+    leader.join()
+
+def test_late_follower_gets_the_whole_stream():
+    flights = SingleFlight()
+    gate = threading.Event()
+
+    def upstream():
+        yield "a"
+        gate.wait(2)
+        yield "b"
+        return True
+
+    def consume(stream):
+        tokens = []
+        while True:
+            try:
+                tokens.append(next(stream))
+            except StopIteration as stop:
+                return tokens, stop.value
+
+    leader = flights.stream('key', upstream)
+    assert next(leader) == "a"
+    follower = flights.stream('key', upstream)
+    gate.set()
+
+    assert consume(follower) == (["a", "b"], True)
+    assert consume(leader) == (["b"], True)
+    assert flights.stats()['issued'] == 1
+
+def test_abandoned_stream_closes_the_upstream():
+    flights = SingleFlight()
+    closed = threading.Event()
+
+    def upstream():
+        try:
+            while True:
+                yield "token"
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    stream = flights.stream('key', upstream)
+    assert next(stream) == "token"
+    stream.close()
+    assert closed.wait(2)
+    _wait_for(lambda: flights.stats()['streams_abandoned'] == 1)
+    assert flights.in_flight() == 0
+
+def test_concurrent_identical_questions_make_one_request(groq_standin):
+    groq_standin.latency = 0.2
+    results = []
+    ask = lambda: results.append(groq_chat.ask_groq("What is the capital of France?", retry_count=0, coalesce=True))
+    for thread in _run([threading.Thread(target=ask) for _ in range(4)]):
+        thread.join()
+
+    assert results == [groq_standin.reply_for([{'role': 'user', 'content': "What is the capital of France?"}])] * 4
+    assert groq_standin.requests == 1
+
+def test_different_languages_are_not_coalesced(groq_standin):
+    groq_standin.latency = 0.2
+    ask = lambda lang: groq_chat.ask_groq("Hello", retry_count=0, lang=lang, coalesce=True)
+    for thread in _run([threading.Thread(target=ask, args=(lang,)) for lang in ('en', 'hi')]):
+        thread.join()
+    assert groq_standin.requests == 2
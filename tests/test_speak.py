@@ -0,0 +1,22 @@
+import speak
+
+def test_chunks_are_played_in_order_and_joined(audio_cache, fake_gtts):
+    played = []
+    path = speak.synthesize_chunked("First one. Second one. Third one.", 'en', on_chunk=played.append)
+
+    assert sorted(fake_gtts) == ["First one.", "Second one.", "Third one."]
+    assert [open(chunk, 'rb').read() for chunk in played] == [b"First one.", b"Second one.", b"Third one."]
+    assert open(path, 'rb').read() == b"First one.Second one.Third one."
+
+def test_chunked_reply_is_cached_whole(audio_cache, fake_gtts):
+    first = speak.synthesize_chunked("First one. Second one.", 'en')
+    played = []
+    assert speak.synthesize_chunked("First one. Second one.", 'en', on_chunk=played.append) == first
+    assert played == [first]
+    assert len(fake_gtts) == 2
+
+def test_speak_plays_the_chunks(audio_cache, fake_gtts, monkeypatch):
+    played = []
+    monkeypatch.setattr(speak, 'play_audio', played.append)
+    assert speak.speak("First one. Second one.", 'en', chunked=True)
+    assert len(played) == 2
@@ -0,0 +1,140 @@
+import os
+import time
+
+import pytest
+import speech_recognition as sr
+
+import listen
+from speech_stream import (FallbackRecognizer, SimulatedRecognizer, SpeechRecognizer, StreamingListener,
+                           Utterance, get_speech_recognizer)
+
+# Synthetic recording, 8 kHz: 1s of noise, a phrase of three word groups 0.4s apart,
+# a 0.05s click, and a phrase of one word group, each followed by 1.5s of noise
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'two_phrases.wav')
+
+def _utterances(**options):
+    listener = StreamingListener(recognizer=SimulatedRecognizer(latency=0, per_second=0), workers=1,
+                                 source=sr.AudioFile(FIXTURE), calibration_seconds=0.5, **options).start()
+    utterances = []
+    while True:
+        utterance = listener.next_utterance(timeout=10)
+        if utterance is None:
+            break
+        utterance.result(timeout=10)
+        utterances.append(utterance)
+    listener.stop()
+    return utterances
+
+def test_phrases_are_recognized_chunk_by_chunk():
+    first, second = _utterances()
+
+    assert first.stats()['chunks'] == 3
+    partials = [text for _, text in first.stats()['partials']]
+    assert partials == ['<1.65s>', '<1.65s> <1.32s>', '<1.65s> <1.32s> <1.53s>']
+    assert first.result() == partials[-1]
+
+    # The click between the phrases doesn't make a phrase of its own
+    assert second.stats()['chunks'] == 1
+    assert second.result() == '<1.65s>'
+    assert not first.cancelled and not second.cancelled
+    assert 'final_after_end_ms' in first.stats()
+
+def test_muting_cancels_the_utterance_in_progress():
+    # AudioFile reads 4096 samples (0.512s) at a time; mute two reads in the middle of the first phrase
+    reads = iter(range(1000))
+    utterances = _utterances(mute_while=lambda: next(reads) in (4, 5))
+    assert utterances[0].cancelled
+    assert utterances[0].result() is None
+    assert not utterances[-1].cancelled
+
+def test_partials_follow_chunks_in_order():
+    utterance = Utterance()
+    first, second = utterance._add_chunk(), utterance._add_chunk()
+    # The second chunk is recognized first, but the transcript only grows in order
+    utterance._set_result(second, "there")
+    assert utterance.partial() == ""
+    utterance._set_result(first, "hello")
+    utterance._close(sr.AudioData(b'\0\0' * 800, 8000, 2))
+
+    assert list(utterance.partials(timeout=1)) == ["hello there"]
+    assert utterance.result(timeout=1) == "hello there"
+
+def test_recognizer_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SpeechRecognizer()
+
+def test_fallback_recognizer_tries_the_next_one():
+    class Deaf(SpeechRecognizer):
+        name = 'deaf'
+
+        def recognize(self, audio):
+            raise sr.UnknownValueError()
+
+    audio = sr.AudioData(b'\0\0' * 800, 8000, 2)
+    assert FallbackRecognizer([Deaf(), SimulatedRecognizer(0, 0)]).recognize(audio) == '<0.10s>'
+    with pytest.raises(sr.UnknownValueError):
+        FallbackRecognizer([Deaf()]).recognize(audio)
+
+def test_recognizers_are_built_by_name():
+    assert isinstance(get_speech_recognizer('simulated'), SimulatedRecognizer)
+    assert get_speech_recognizer('google,sphinx').name == 'google,sphinx'
+    with pytest.raises(ValueError):
+        get_speech_recognizer('whisper')
+
+class _FakeListener:
+    recognizer = sr.Recognizer()
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+
+    def next_phrase(self, timeout=None):
+        return self.phrases.pop(0) if self.phrases else None
+
+    def clear(self):
+        # The phrases stand for speech that comes in after the turn started
+        pass
+
+def test_listen_skips_cancelled_utterances(monkeypatch):
+    dropped = Utterance()
+    dropped.cancel()
+    spoken = Utterance()
+    spoken._set_result(spoken._add_chunk(), "hello there")
+    spoken._close(sr.AudioData(b'\0\0' * 800, 8000, 2))
+
+    monkeypatch.setattr(listen, 'PYAUDIO_AVAILABLE', True)
+    monkeypatch.setattr(listen, 'get_listener', lambda: _FakeListener([dropped, spoken]))
+    monkeypatch.setattr('builtins.input', lambda *args: pytest.fail("fell back to typed input"))
+    partials = []
+    assert listen.listen(on_partial=partials.append) == "hello there"
+    assert partials == ["hello there"]
+
+def test_clear_drops_finished_phrases_only():
+    listener = StreamingListener(recognizer=SimulatedRecognizer(0, 0))
+    finished = Utterance()
+    finished._close(sr.AudioData(b'\0\0' * 800, 8000, 2))
+    dropped = Utterance()
+    dropped.cancel()
+    speaking = Utterance()
+    for utterance in (finished, dropped, speaking):
+        listener._put(utterance)
+
+    listener.clear()
+    assert listener.next_utterance(timeout=0) is speaking
+    assert listener.next_utterance(timeout=0) is None
+    assert listener.stats()['stale'] == 2
+
+def test_google_requests_time_out():
+    recognizer = get_speech_recognizer('google')
+    assert recognizer._recognizer.operation_timeout == listen.LISTEN_RECOGNITION_TIMEOUT
+
+def test_follow_utterance_gives_up_on_a_hung_recognizer(monkeypatch):
+    monkeypatch.setattr(listen, 'LISTEN_PHRASE_LIMIT', 0.0)
+    monkeypatch.setattr(listen, 'LISTEN_RECOGNITION_TIMEOUT', 0.2)
+    utterance = Utterance()
+    # The chunk's recognition never comes back
+    utterance._add_chunk()
+    utterance._close(sr.AudioData(b'\0\0' * 800, 8000, 2))
+
+    start = time.monotonic()
+    assert listen._follow_utterance(utterance) is None
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,17 @@
+from text_segments import split_sentences
+
+def test_splits_latin_punctuation():
+    assert split_sentences("Hello there. How are you? Fine!") == ["Hello there.", "How are you?", "Fine!"]
+
+def test_splits_on_danda_and_cjk_full_stops():
+    assert split_sentences("नमस्ते। आप कैसे हैं॥ ठीक") == ["नमस्ते।", "आप कैसे हैं॥", "ठीक"]
+    assert split_sentences("你好。今天天气很好！") == ["你好。", "今天天气很好！"]
+
+def test_long_sentences_break_at_commas_or_spaces():
+    pieces = split_sentences("one, two three four five six", max_chars=12)
+    assert pieces == ["one, two", "three four", "five six"]
+    assert all(len(piece) <= 12 for piece in pieces)
+
+def test_empty_text():
+    assert split_sentences("") == []
+    assert split_sentences("   ") == []
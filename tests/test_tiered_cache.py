@@ -0,0 +1,68 @@
+import time
+
+import groq_chat
+from tiered_cache import TieredCache
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TieredCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = TieredCache(db_path=path)
+    cache.set('question', {'reply': "answer"})
+    cache.close()
+
+    cache = TieredCache(db_path=path)
+    assert cache.get('question') == {'reply': "answer"}
+    assert cache.get('question') == {'reply': "answer"}
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['disk_entries']) == (1, 1, 1)
+    cache.close()
+
+def test_entries_expire(tmp_path, monkeypatch):
+    cache = TieredCache(ttl=10, db_path=str(tmp_path / 'cache.db'))
+    cache.set('a', 1)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    # Expired in memory and then on disk
+    assert (stats['expired'], stats['misses'], stats['disk_entries']) == (2, 1, 0)
+    cache.close()
+
+def test_repeated_question_is_served_from_the_cache(groq_standin, monkeypatch):
+    monkeypatch.setattr(groq_chat, '_response_cache', TieredCache())
+    first = groq_chat.ask_groq("What is the capital of France?", retry_count=0, use_cache=True)
+    again = groq_chat.ask_groq("  what is the capital of FRANCE? ", retry_count=0, use_cache=True)
+    assert first == again == groq_standin.reply_for([{'role': 'user', 'content': "What is the capital of France?"}])
+    assert groq_standin.requests == 1
+
+
+def test_get_first_counts_one_lookup():
+    cache = TieredCache()
+    assert cache.get_first(['a', 'b', 'c']) == (None, None)
+    cache.set('c', "three")
+    assert cache.get_first(['a', 'b', 'c']) == ('c', "three")
+
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses']) == (1, 1)
+    assert stats['hit_ratio'] == 0.5
+
+def test_cached_reply_is_one_lookup_across_models(monkeypatch):
+    cache = TieredCache()
+    monkeypatch.setattr(groq_chat, '_response_cache', cache)
+    messages = [{'role': 'user', 'content': "What is the capital of France?"}]
+
+    assert groq_chat._cached_reply(messages, 'en') is None
+    groq_chat._store_reply(groq_chat.GROQ_MODELS[-1], messages, 'en', "Paris.")
+    assert groq_chat._cached_reply(messages, 'en') == "Paris."
+
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses']) == (1, 1)
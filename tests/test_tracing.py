@@ -0,0 +1,99 @@
+import json
+import logging
+
+import pytest
+
+import groq_chat
+import tracing
+
+class Collector:
+    """Exporter that keeps the finished traces"""
+
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+@pytest.fixture
+def collector(monkeypatch):
+    collector = Collector()
+    monkeypatch.setattr(tracing, '_tracer', tracing.Tracer(exporters=[collector], slow_turn_ms=60000, enabled=True))
+    return collector
+
+def test_spans_nest_and_export_once_per_trace(collector):
+    with tracing.span("turn") as turn:
+        with tracing.span("detect") as detect:
+            assert tracing.current_span() is detect
+        with pytest.raises(ValueError):
+            with tracing.span("translate"):
+                raise ValueError("no server")
+        assert tracing.current_span() is turn
+    assert tracing.current_span() is None
+
+    [spans] = collector.traces
+    assert [span.name for span in spans] == ["detect", "translate", "turn"]
+    assert {span.trace_id for span in spans} == {turn.trace_id}
+    assert spans[1].status == tracing.ERROR
+    assert spans[1].status_message == "ValueError: no server"
+    assert tracing.breakdown(spans).startswith("detect ")
+    assert "translate" in tracing.breakdown(spans) and "error" in tracing.breakdown(spans)
+
+def test_disabled_tracer_hands_out_noop_spans():
+    tracer = tracing.Tracer(enabled=False)
+    with tracer.span("turn") as span:
+        span.set_attribute('lang', 'en')
+    assert span is tracing._NOOP_SPAN
+    assert tracer.metrics.render().strip() == ""
+
+def test_metrics_render_prometheus_histograms_and_counters():
+    metrics = tracing.Metrics(buckets=(0.1, 1.0))
+    metrics.describe('latency_seconds', "Latency")
+    metrics.observe('latency_seconds', 0.05, span='chat')
+    metrics.observe('latency_seconds', 0.5, span='chat')
+    metrics.increment('responses_total', code=429)
+    lines = metrics.render().splitlines()
+
+    assert 'responses_total{code="429"} 1' in lines
+    assert '# HELP latency_seconds Latency' in lines
+    assert 'latency_seconds_bucket{le="0.1",span="chat"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0",span="chat"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf",span="chat"} 2' in lines
+    assert 'latency_seconds_count{span="chat"} 2' in lines
+
+def test_otlp_exporter_appends_one_request_per_trace(tmp_path):
+    path = tmp_path / 'traces' / 'traces.jsonl'
+    tracer = tracing.Tracer(exporters=[tracing.OTLPFileExporter(str(path))], enabled=True)
+    for _ in range(2):
+        with tracer.span("turn", source="test"):
+            with tracer.span("chat", model="m"):
+                pass
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    chat, turn = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert chat['parentSpanId'] == turn['spanId'] and chat['traceId'] == turn['traceId']
+    assert {'key': 'source', 'value': {'stringValue': 'test'}} in turn['attributes']
+    assert int(turn['endTimeUnixNano']) >= int(turn['startTimeUnixNano'])
+
+def test_slow_turns_are_logged_with_their_breakdown(caplog):
+    tracer = tracing.Tracer(slow_turn_ms=0, enabled=True)
+    with caplog.at_level(logging.WARNING, logger='tracing'):
+        with tracer.span("turn"):
+            with tracer.span("chat"):
+                pass
+    assert "Slow turn" in caplog.text and "chat" in caplog.text
+    assert 'lynqo_slow_turns_total 1' in tracer.metrics.render()
+
+def test_groq_attempts_and_requests_are_traced(collector, groq_standin):
+    groq_standin.error_rate = 1.0
+    with tracing.span("turn"):
+        groq_chat.ask_groq("Hello", retry_count=0)
+
+    [spans] = collector.traces
+    requests = [span for span in spans if span.name == 'groq.request']
+    attempts = [span for span in spans if span.name == 'groq.attempt']
+    assert attempts and all(span.status == tracing.ERROR for span in attempts)
+    assert {span.attributes['http.status_code'] for span in requests} == {500}
+    assert {span.parent.name for span in requests} == {'groq.attempt'}
+    assert 'lynqo_groq_responses_total{code="500",model="llama3-70b-8192"} 1' in tracing.render_metrics()
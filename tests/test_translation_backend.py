@@ -0,0 +1,69 @@
+import pytest
+
+import translation_backend
+from local_standins import LibreTranslateStandin
+from translate import translate_to_english
+from translate_back import translate_back_to_user
+from translation_backend import (LibreTranslateBackend, NullBackend,
+                                 TranslationBackend, TranslationError,
+                                 join_segments, split_segments)
+
+@pytest.fixture
+def libretranslate():
+    with LibreTranslateStandin() as standin:
+        yield standin
+
+@pytest.fixture
+def shared_backend(libretranslate, monkeypatch):
+    """Point translate.py and translate_back.py at the stand-in"""
+    backend = LibreTranslateBackend(url=libretranslate.url)
+    monkeypatch.setattr(translation_backend, '_backend', backend)
+    return backend
+
+def test_sentences_are_batched_and_keep_the_layout(libretranslate):
+    backend = LibreTranslateBackend(url=libretranslate.url, batch_size=2,
+                                    workers=2)
+    translated = backend.translate("One. Two. Three.\nFour.", 'en', 'hi')
+    assert translated == "[hi] One. [hi] Two. [hi] Three.\n[hi] Four."
+    assert libretranslate.requests == 2
+
+def test_server_errors_raise_translation_error(libretranslate):
+    libretranslate.error_rate = 1.0
+    backend = LibreTranslateBackend(url=libretranslate.url)
+    with pytest.raises(TranslationError):
+        backend.translate("One.", 'en', 'hi')
+
+def test_translate_and_translate_back_use_the_shared_backend(shared_backend):
+    assert translate_to_english("Bonjour.", 'fr') == "[en] Bonjour."
+    assert translate_back_to_user("Hello.", 'fr') == "[fr] Hello."
+    assert translate_to_english("Hello.", 'en') == "Hello."
+
+def test_failed_translation_falls_back_to_the_original_text(libretranslate,
+                                                            shared_backend):
+    libretranslate.error_rate = 1.0
+    translated = translate_to_english("Bonjour.", 'fr')
+    assert translated.startswith(
+        "Bonjour. [Note: Translation was not performed")
+    assert translate_back_to_user("Hello.", 'fr') == "Hello."
+
+def test_null_backend_passes_text_through():
+    assert NullBackend().translate("One. Two.", 'en', 'hi') == "One. Two."
+
+def test_backend_must_implement_translate_batch():
+    with pytest.raises(TypeError):
+        TranslationBackend()
+
+def test_join_follows_the_target_language():
+    segments, layout = split_segments("Hello there. How are you?\nFine.")
+    joined = join_segments(segments, layout, 'fr')
+    assert joined == "Hello there. How are you?\nFine."
+    chinese = ["你好。", "你好吗？", "很好。"]
+    assert join_segments(chinese, layout, 'zh-cn') == "你好。你好吗？\n很好。"
+    japanese = ["こんにちは。", "元気ですか？", "元気です。"]
+    assert join_segments(japanese, layout, 'ja') == \
+        "こんにちは。元気ですか？\n元気です。"
+
+def test_sentences_are_joined_by_target_language(libretranslate):
+    backend = LibreTranslateBackend(url=libretranslate.url, batch_size=1,
+                                    workers=2)
+    assert backend.translate("One. Two.", 'en', 'ja') == "[ja] One.[ja] Two."
@@ -0,0 +1,28 @@
+from local_standins import LibreTranslateStandin
+from translation_backend import LibreTranslateBackend
+from translation_memory import TranslationMemory
+
+def test_only_new_sentences_go_to_the_engine():
+    memory = TranslationMemory()
+    with LibreTranslateStandin() as standin:
+        backend = LibreTranslateBackend(url=standin.url, batch_size=1, workers=1, memory=memory)
+        assert backend.translate("Hello. Hello. Thanks.", 'en', 'hi') == "[hi] Hello. [hi] Hello. [hi] Thanks."
+        # Repeated sentences are only sent once
+        assert standin.requests == 2
+        assert backend.translate("Thanks. Goodbye.", 'en', 'hi') == "[hi] Thanks. [hi] Goodbye."
+        assert standin.requests == 3
+
+    pair = memory.stats()['pairs']['en->hi']
+    assert (pair['hits'], pair['misses'], pair['hit_ratio']) == (1, 4, 0.2)
+
+def test_memory_is_keyed_on_the_language_pair_and_engine():
+    memory = TranslationMemory()
+    memory.store(["Hello."], ["[hi] Hello."], 'en', 'hi', 'libretranslate')
+    assert memory.lookup(["Hello.", "Bye."], 'en', 'hi', 'libretranslate') == {0: "[hi] Hello."}
+    assert memory.lookup(["Hello."], 'en', 'fr', 'libretranslate') == {}
+    assert memory.lookup(["Hello."], 'en', 'hi', 'other') == {}
+
+def test_memory_persists_to_disk(tmp_path):
+    path = str(tmp_path / 'memory.db')
+    TranslationMemory(db_path=path).store(["Hello."], ["[hi] Hello."], 'en', 'hi', 'libretranslate')
+    assert TranslationMemory(db_path=path).lookup(["Hello."], 'en', 'hi', 'libretranslate') == {0: "[hi] Hello."}
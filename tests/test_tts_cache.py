@@ -0,0 +1,40 @@
+import os
+
+import speak
+from tts_cache import AudioCache
+
+def _put(cache, key, size):
+    temp_path = cache.temp_path()
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * size)
+    return cache.put(key, temp_path)
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=250)
+    first = _put(cache, 'a', 100)
+    _put(cache, 'b', 100)
+    assert cache.get('a') == first
+    _put(cache, 'c', 100)
+
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert sorted(os.listdir(tmp_path)) == ['a.mp3', 'c.mp3']
+    assert cache.stats()['evictions'] == 1
+
+def test_files_on_disk_are_picked_up_after_a_restart(tmp_path):
+    _put(AudioCache(directory=str(tmp_path)), 'a', 100)
+    cache = AudioCache(directory=str(tmp_path))
+    assert cache.get('a') == str(tmp_path / 'a.mp3')
+    assert cache.stats()['bytes'] == 100
+
+def test_key_covers_everything_that_changes_the_audio():
+    keys = {AudioCache.key("Hello", 'en'), AudioCache.key("Hello", 'hi'), AudioCache.key("Hello", 'en', slow=True),
+            AudioCache.key("Hello", 'en', engine='other'), AudioCache.key("Hello!", 'en')}
+    assert len(keys) == 5
+
+def test_repeated_phrase_is_synthesized_once(audio_cache, fake_gtts):
+    first = speak.synthesize("Hello there", 'en')
+    again = speak.synthesize("Hello there", 'en')
+    assert first == again and os.path.exists(first)
+    assert fake_gtts == ["Hello there"]
+    assert [name for name in os.listdir(audio_cache.directory) if name.startswith('tmp_')] == []